@@ -0,0 +1,68 @@
+"""Generates synthetic video files for the benchmarks.
+
+Title words and tags are drawn from Zipf distributions, like real
+catalogues where a few tags and words are on most videos and a long tail
+is on very few.
+
+Run from the python directory with:
+    python -m benchmarks.catalogue number_of_videos videos.txt
+"""
+
+import itertools
+import random
+import sys
+
+WORDS = 5000
+TAGS = 1000
+
+
+def zipf_weights(count, exponent=1.1):
+    """Returns the cumulative Zipf weights of ranks 1 to count."""
+    return list(itertools.accumulate(
+        1 / rank ** exponent for rank in range(1, count + 1)))
+
+
+_LETTERS = "aeioubcdfghklmnprstvwz"
+# Skips the one and two letter words, which are substrings of too many.
+_FIRST_WORD = len(_LETTERS) + len(_LETTERS) ** 2
+
+
+def word(rank):
+    """Returns the synthetic word of a rank, e.g. "aaa" for rank 0."""
+    letters = _LETTERS
+    text = ""
+    rank += _FIRST_WORD + 1
+    while rank:
+        rank, digit = divmod(rank - 1, len(letters))
+        text = letters[digit] + text
+    return text
+
+
+def tag(rank):
+    """Returns the synthetic tag of a rank, e.g. "#tag0"."""
+    return f"#tag{rank}"
+
+
+def write_catalogue(count, path, seed=0):
+    """Writes a pipe-delimited video file of count synthetic videos.
+
+    Every video has 2 to 6 title words and 0 to 4 tags. The output only
+    depends on count and seed.
+    """
+    rng = random.Random(seed)
+    word_weights = zipf_weights(WORDS)
+    tag_weights = zipf_weights(TAGS)
+    words = [word(rank) for rank in range(WORDS)]
+    tags = [tag(rank) for rank in range(TAGS)]
+    with open(path, "w") as file:
+        for i in range(count):
+            title = " ".join(rng.choices(words, cum_weights=word_weights,
+                                         k=rng.randint(2, 6)))
+            video_tags = set(rng.choices(tags, cum_weights=tag_weights,
+                                         k=rng.randint(0, 4)))
+            file.write(f"{title.title()} {i} | video_{i}_id | "
+                       f"{' , '.join(sorted(video_tags))}\n")
+
+
+if __name__ == "__main__":
+    write_catalogue(int(sys.argv[1]), sys.argv[2])
@@ -0,0 +1,191 @@
+"""Times the VideoLibrary and VideoPlayer hot paths and gates regressions.
+
+Every operation is run against synthetic catalogues of each size, see
+benchmarks.catalogue. The median time per call and the peak memory
+allocated by one call are recorded. With --save they become the
+baselines; with --check any operation slower or hungrier than its baseline
+by more than the tolerance, or without a baseline at all, is reported and
+the exit status is 1.
+
+Run from the python directory with:
+    python -m benchmarks.hot_paths --sizes 1000 100000 --save
+    python -m benchmarks.hot_paths --sizes 1000 100000 --check
+"""
+
+from pathlib import Path
+import argparse
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.catalogue import tag, word, write_catalogue
+from src.output_sink import NullSink
+from src.video_library import VideoLibrary
+from src.video_player import VideoPlayer
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+DEFAULT_BASELINES = Path(__file__).parent / "baselines.json"
+
+
+def catalogue_file(count, data_dir):
+    """Returns the synthetic video file of count videos, writing it once."""
+    path = Path(data_dir) / f"videos_{count}.txt"
+    if not path.exists():
+        write_catalogue(count, path)
+    return path
+
+
+def _operations(player, count, rng):
+    """Returns the operation name -> callable pairs benchmarked per size."""
+    player.create_playlist("bench")
+
+    def add_to_playlist():
+        player.add_to_playlist("bench", f"video_{rng.randrange(count)}_id")
+
+    return {
+        "show_all_videos": player.show_all_videos,
+        # Rank 0 words and tags are on the most videos, rank 50 on few.
+        "search_videos_popular": lambda: player.search_videos(word(0)),
+        "search_videos_rare": lambda: player.search_videos(word(50)),
+        "search_videos_tag_popular": lambda: player.search_videos_tag(tag(0)),
+        "search_videos_tag_rare": lambda: player.search_videos_tag(tag(50)),
+        "play_random_video": player.play_random_video,
+        "add_to_playlist": add_to_playlist,
+    }
+
+
+def _traced(function):
+    """Calls function once under tracemalloc.
+
+    Returns:
+        The result, the seconds taken and the peak bytes allocated.
+    """
+    tracemalloc.start()
+    try:
+        started = time.perf_counter()
+        result = function()
+        seconds = time.perf_counter() - started
+        return result, seconds, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def _peak_bytes(function):
+    return _traced(function)[2]
+
+
+def _median_seconds(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def measure(count, data_dir, repeat=5):
+    """Measures every operation on a catalogue of count videos.
+
+    The catalogue is loaded once, under tracemalloc, so the load time
+    includes the tracing overhead.
+
+    Returns:
+        A dict of operation name to {"seconds", "peak_bytes"}.
+    """
+    path = catalogue_file(count, data_dir)
+    library, seconds, peak_bytes = _traced(
+        lambda: VideoLibrary(path, use_snapshot=False))
+    results = {"load": {"seconds": seconds, "peak_bytes": peak_bytes}}
+
+    player = VideoPlayer(output=NullSink(), library=library,
+                         defer_prompts=True)
+    rng = random.Random(0)
+    for name, function in _operations(player, count, rng).items():
+        function()  # Warm up lazily built structures.
+        results[name] = {"seconds": _median_seconds(function, repeat),
+                         "peak_bytes": _peak_bytes(function)}
+    return results
+
+
+def find_regressions(results, baselines, time_tolerance=0.25,
+                     memory_tolerance=0.10):
+    """Compares results to baselines, both keyed by size then operation.
+
+    Returns:
+        A list of messages, one per metric beyond its tolerance and one per
+        operation without a baseline.
+    """
+    regressions = []
+    for size, operations in results.items():
+        for name, current in operations.items():
+            baseline = baselines.get(size, {}).get(name)
+            if baseline is None:
+                regressions.append(f"{size} videos {name}: no baseline")
+                continue
+            for metric, tolerance in (("seconds", time_tolerance),
+                                      ("peak_bytes", memory_tolerance)):
+                limit = baseline[metric] * (1 + tolerance)
+                if current[metric] > limit:
+                    regressions.append(
+                        f"{size} videos {name}: {metric} {current[metric]:.6g}"
+                        f" > {baseline[metric]:.6g} + {tolerance:.0%}")
+    return regressions
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--sizes", type=int, nargs="+",
+                            default=DEFAULT_SIZES,
+                            help="catalogue sizes, up to 10000000")
+    arg_parser.add_argument("--repeat", type=int, default=5,
+                            help="timed calls per operation")
+    arg_parser.add_argument("--data-dir", default=tempfile.gettempdir(),
+                            help="where the synthetic catalogues are kept")
+    arg_parser.add_argument("--baselines", default=DEFAULT_BASELINES,
+                            help="the baseline JSON file")
+    arg_parser.add_argument("--save", action="store_true",
+                            help="store the results as the new baselines")
+    arg_parser.add_argument("--check", action="store_true",
+                            help="exit with status 1 on any regression or "
+                                 "missing baseline")
+    arg_parser.add_argument("--time-tolerance", type=float, default=0.25)
+    arg_parser.add_argument("--memory-tolerance", type=float, default=0.10)
+    args = arg_parser.parse_args(argv)
+
+    results = {}
+    for size in args.sizes:
+        results[str(size)] = measure(size, args.data_dir, args.repeat)
+        for name, result in results[str(size)].items():
+            print(f"{size:>9} {name:<26} {result['seconds'] * 1000:10.3f} ms"
+                  f" {result['peak_bytes'] / 1024:10.1f} KiB")
+
+    baselines_path = Path(args.baselines)
+    status = 0
+    if args.check:
+        baselines = {}
+        if baselines_path.exists():
+            baselines = json.loads(baselines_path.read_text())
+        else:
+            print(f"REGRESSION no baselines file {baselines_path}, "
+                  f"create it with --save")
+        regressions = find_regressions(results, baselines,
+                                       args.time_tolerance,
+                                       args.memory_tolerance)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        status = 1 if regressions or not baselines else 0
+    if args.save:
+        baselines = {}
+        if baselines_path.exists():
+            baselines = json.loads(baselines_path.read_text())
+        baselines.update(results)
+        baselines_path.write_text(json.dumps(baselines, indent=2) + "\n")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
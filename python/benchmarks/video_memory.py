@@ -0,0 +1,57 @@
+"""Measures the memory used per Video object.
+
+Run from the python directory with:
+    python -m benchmarks.video_memory [number_of_videos]
+"""
+
+import random
+import sys
+import tracemalloc
+
+from src.video import Video
+
+TAGS = ["#animal", "#cat", "#dog", "#google", "#career", "#music", "#news",
+        "#sport", "#travel", "#food"]
+
+
+class DictVideo:
+    """The Video layout before __slots__ and tag interning."""
+
+    def __init__(self, video_title, video_id, video_tags):
+        self._title = video_title
+        self._video_id = video_id
+        self._tags = tuple(video_tags)
+
+
+def _rows(count):
+    rng = random.Random(0)
+    for i in range(count):
+        # Build fresh tag strings as a file parser would.
+        tags = ["".join(tag) for tag in rng.sample(TAGS, rng.randint(0, 3))]
+        yield f"Video number {i}", f"video_{i}_id", tags
+
+
+def bytes_per_video(video_class, count):
+    """Returns the average number of bytes retained per video.
+
+    Rows are consumed as they are generated, so the figure includes the
+    title, id and tag strings each video keeps alive.
+    """
+    tracemalloc.start()
+    videos = [video_class(*row) for row in _rows(count)]
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return retained / len(videos)
+
+
+def main(count=100_000):
+    before = bytes_per_video(DictVideo, count)
+    after = bytes_per_video(Video, count)
+    print(f"videos:  {count}")
+    print(f"before:  {before:.1f} bytes/video")
+    print(f"after:   {after:.1f} bytes/video")
+    print(f"saved:   {100 * (1 - after / before):.1f}%")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,68 @@
+"""Parallel ingestion of a catalogue split into many video files."""
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import glob
+import time
+
+
+def is_sharded(source):
+    """Returns True if source names a directory or a glob of video files."""
+    return Path(source).is_dir() or glob.has_magic(str(source))
+
+
+def shard_paths(source):
+    """Returns the video files of a directory or glob, sorted by path.
+
+    A directory contributes every *.txt file directly inside it.
+    """
+    if Path(source).is_dir():
+        paths = Path(source).glob("*.txt")
+    else:
+        paths = (Path(path) for path in glob.glob(str(source)))
+    return sorted(path for path in paths if path.is_file())
+
+
+def ingest(paths, parse_file, workers=None):
+    """Parses video files in parallel and merges them into one dict.
+
+    Files are merged in the order given, so when several files hold the
+    same video_id the last file wins, exactly as a later row wins within
+    one file. The result does not depend on which worker finishes first.
+
+    Args:
+        paths: The video files, in merge order.
+        parse_file: A module-level function parsing one file into a dict
+            of video_id to Video and the number of rows read. It must be
+            picklable.
+        workers: The number of worker processes. None uses one per CPU;
+            0 or 1 parses in this process.
+
+    Returns:
+        The merged dict and a dict of ingest statistics: "files", "rows",
+        "duplicates", "seconds" and "rows_per_second".
+    """
+    started = time.perf_counter()
+    if len(paths) <= 1 or (workers is not None and workers <= 1):
+        videos, rows = _merge(map(parse_file, paths))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # map() yields in submission order whatever the finish order.
+            videos, rows = _merge(pool.map(parse_file, paths))
+    seconds = time.perf_counter() - started
+    return videos, {
+        "files": len(paths),
+        "rows": rows,
+        "duplicates": rows - len(videos),
+        "seconds": seconds,
+        "rows_per_second": rows / seconds if seconds else 0.0,
+    }
+
+
+def _merge(parsed):
+    videos = {}
+    rows = 0
+    for shard, shard_rows in parsed:
+        rows += shard_rows
+        videos.update(shard)
+    return videos, rows
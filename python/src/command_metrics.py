@@ -0,0 +1,189 @@
+"""Per-command metrics classes."""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import os
+import threading
+
+# Each power of two of microseconds is split into this many buckets, so a
+# recorded latency is off by at most 1 / _SUB_BUCKETS of its value.
+_SUB_BUCKET_BITS = 3
+_SUB_BUCKETS = 1 << _SUB_BUCKET_BITS
+
+
+def _bucket_index(micros):
+    if micros < _SUB_BUCKETS:
+        return micros
+    shift = micros.bit_length() - _SUB_BUCKET_BITS - 1
+    return (shift + 1) * _SUB_BUCKETS + (micros >> shift) - _SUB_BUCKETS
+
+
+def _bucket_upper_bound(index):
+    """Returns the smallest latency, in microseconds, above bucket index."""
+    if index < _SUB_BUCKETS:
+        return index + 1
+    shift = index // _SUB_BUCKETS - 1
+    return (index % _SUB_BUCKETS + _SUB_BUCKETS + 1) << shift
+
+
+class LatencyHistogram:
+    """A class used to count latencies in log-linear buckets.
+
+    Like an HDR histogram, the buckets double in width with every power of
+    two, each split in equal parts, so recording is a couple of integer
+    operations and a list increment whatever the range of latencies.
+    """
+
+    __slots__ = ("counts", "count", "total")
+
+    def __init__(self):
+        self.counts = []
+        self.count = 0
+        self.total = 0.0
+
+    def record(self, seconds):
+        """Counts one latency, given in seconds."""
+        index = _bucket_index(int(seconds * 1e6))
+        counts = self.counts
+        if index >= len(counts):
+            counts.extend([0] * (index + 1 - len(counts)))
+        counts[index] += 1
+        self.count += 1
+        self.total += seconds
+
+    def percentile(self, fraction):
+        """Returns the latency in seconds below which fraction of them fall.
+
+        The answer is the upper bound of the bucket holding it, 0.0 if no
+        latency was recorded.
+        """
+        rank = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                return _bucket_upper_bound(index) / 1e6
+        return 0.0
+
+    def buckets(self):
+        """Yields (upper bound in seconds, cumulative count) pairs."""
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count:
+                seen += count
+                yield _bucket_upper_bound(index) / 1e6, seen
+
+
+class _CommandStats:
+    __slots__ = ("errors", "latency")
+
+    def __init__(self):
+        self.errors = 0
+        self.latency = LatencyHistogram()
+
+
+class CommandMetrics:
+    """A class used to collect the count, errors and latency per command.
+
+    Pass one to CommandParser to turn instrumentation on. It can be shared
+    by the parsers of several sessions.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._commands = {}
+
+    def record(self, name, seconds, error=False):
+        """Records one execution of command name.
+
+        Args:
+            name: The upper case command name.
+            seconds: How long the command took.
+            error: True if the command failed.
+        """
+        with self._lock:
+            stats = self._commands.get(name)
+            if stats is None:
+                stats = self._commands[name] = _CommandStats()
+            stats.latency.record(seconds)
+            if error:
+                stats.errors += 1
+
+    def summary(self):
+        """Returns a printable table of the metrics of every command."""
+        lines = [f"{'command':<24}{'count':>9}{'errors':>8}{'mean us':>11}"
+                 f"{'p50 us':>11}{'p99 us':>11}"]
+        with self._lock:
+            for name, stats in sorted(self._commands.items()):
+                latency = stats.latency
+                lines.append(
+                    f"{name:<24}{latency.count:>9}{stats.errors:>8}"
+                    f"{latency.total / latency.count * 1e6:>11.1f}"
+                    f"{latency.percentile(0.50) * 1e6:>11.0f}"
+                    f"{latency.percentile(0.99) * 1e6:>11.0f}")
+        return "\n".join(lines)
+
+    def prometheus_text(self):
+        """Returns the metrics in the Prometheus text exposition format."""
+        lines = [
+            "# HELP youtube_commands_total Commands executed.",
+            "# TYPE youtube_commands_total counter",
+        ]
+        errors = [
+            "# HELP youtube_command_errors_total Commands that failed.",
+            "# TYPE youtube_command_errors_total counter",
+        ]
+        latency = [
+            "# HELP youtube_command_seconds Command latency.",
+            "# TYPE youtube_command_seconds histogram",
+        ]
+        with self._lock:
+            for name, stats in sorted(self._commands.items()):
+                label = f'command="{name}"'
+                lines.append(
+                    f"youtube_commands_total{{{label}}} {stats.latency.count}")
+                errors.append(
+                    f"youtube_command_errors_total{{{label}}} {stats.errors}")
+                for bound, count in stats.latency.buckets():
+                    latency.append(f'youtube_command_seconds_bucket'
+                                   f'{{{label},le="{bound:g}"}} {count}')
+                latency.append(f'youtube_command_seconds_bucket'
+                               f'{{{label},le="+Inf"}} {stats.latency.count}')
+                latency.append(f"youtube_command_seconds_sum{{{label}}} "
+                               f"{stats.latency.total:.9f}")
+                latency.append(f"youtube_command_seconds_count{{{label}}} "
+                               f"{stats.latency.count}")
+        return "\n".join(lines + errors + latency) + "\n"
+
+    def write_prometheus(self, path):
+        """Writes prometheus_text to path, replacing it atomically."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as file:
+            file.write(self.prometheus_text())
+        os.replace(tmp_path, path)
+
+    def serve_prometheus(self, host="127.0.0.1", port=9464):
+        """Serves prometheus_text over HTTP from a daemon thread.
+
+        Returns:
+            The started server; call its shutdown and then its
+            server_close method to stop it.
+        """
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = metrics.prometheus_text().encode()
+                self.send_response(200)
+                self.send_header("Content-Type",
+                                 "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name="metrics",
+                         daemon=True).start()
+        return server
@@ -1,6 +1,10 @@
 """A command parser class."""
 
+from .sampling_profiler import SamplingProfiler
+from functools import partial
+import sys
 import textwrap
+import time
 from typing import Sequence
 
 
@@ -9,155 +13,332 @@ class CommandException(Exception):
     pass
 
 
+class Command:
+    """A class used to describe a command the parser can execute."""
+
+    def __init__(self, name, handler, usage, description, arg_counts=None,
+                 error=None, local_only=False):
+        """Command constructor.
+
+        Args:
+            name: The upper case command name.
+            handler: Either the name of the VideoPlayer method to call with
+                the command arguments, or a callable taking the
+                CommandParser followed by the command arguments.
+            usage: The usage shown by HELP, e.g. "PLAY <video_id>".
+            description: What the command does, shown by HELP.
+            arg_counts: The accepted numbers of arguments. None means the
+                command takes no arguments and ignores any that are given.
+            error: The CommandException message for a wrong argument count.
+            local_only: If True the command acts on the host, e.g. starts
+                threads or writes files, and is only available to parsers
+                created with allow_files.
+        """
+        self.name = name
+        self.handler = handler
+        self.usage = usage
+        self.description = description
+        self.arg_counts = arg_counts
+        self.error = error
+        self.local_only = local_only
+
+
+_COMMANDS = {}
+
+# The argument counts of commands taking a list of video_ids.
+_MANY = range(1, sys.maxsize)
+
+
+def _read_items(parser, args):
+    """Returns args with every @file replaced by the lines of that file."""
+    items = []
+    for arg in args:
+        if not arg.startswith("@"):
+            items.append(arg)
+            continue
+        if not parser.allow_files:
+            raise CommandException(
+                "Cannot read files: @file arguments are disabled")
+        try:
+            with open(arg[1:]) as file:
+                items.extend(line.strip() for line in file if line.strip())
+        except OSError as e:
+            raise CommandException(f"Cannot read {arg[1:]}: {e.strerror}")
+    return items
+
+
+def _add_many(parser, playlist_name, *args):
+    parser._player.add_many_to_playlist(playlist_name,
+                                         _read_items(parser, args))
+
+
+def _flag_many(parser, *args):
+    # Items are "video_id" or "video_id:flag reason".
+    parser._player.flag_videos(
+        [item.split(":", 1) if ":" in item else (item, "")
+         for item in _read_items(parser, args)])
+
+
+def _allow_many(parser, *args):
+    parser._player.allow_videos(_read_items(parser, args))
+
+
+def register_command(command):
+    """Makes a command available to every CommandParser created afterwards.
+
+    Args:
+        command: The Command to register, replacing one with the same name.
+    """
+    _COMMANDS[command.name] = command
+
+
+for _command in (
+    Command("NUMBER_OF_VIDEOS", "number_of_videos", "NUMBER_OF_VIDEOS",
+            "Shows how many videos are in the library."),
+    Command("SHOW_ALL_VIDEOS", "show_all_videos", "SHOW_ALL_VIDEOS",
+            "Lists all videos from the library."),
+    Command("PLAY", "play_video", "PLAY <video_id>",
+            "Plays specified video.", (1,),
+            "Please enter PLAY command followed by video_id."),
+    Command("PLAY_RANDOM", "play_random_video", "PLAY_RANDOM",
+            "Plays a random video from the library."),
+    Command("STOP", "stop_video", "STOP", "Stop the current video."),
+    Command("PAUSE", "pause_video", "PAUSE", "Pause the current video."),
+    Command("CONTINUE", "continue_video", "CONTINUE",
+            "Resume the current paused video."),
+    Command("SHOW_PLAYING", "show_playing", "SHOW_PLAYING",
+            "Displays the title, url and paused status of the video that is "
+            "currently playing (or paused)."),
+    Command("CREATE_PLAYLIST", "create_playlist",
+            "CREATE_PLAYLIST <playlist_name>",
+            "Creates a new (empty) playlist with the provided name.", (1,),
+            "Please enter CREATE_PLAYLIST command followed by a "
+            "playlist name."),
+    Command("ADD_TO_PLAYLIST", "add_to_playlist",
+            "ADD_TO_PLAYLIST <playlist_name> <video_id>",
+            "Adds the requested video to the playlist.", (2,),
+            "Please enter ADD_TO_PLAYLIST command followed by a "
+            "playlist name and video_id to add."),
+    Command("ADD_MANY_TO_PLAYLIST", _add_many,
+            "ADD_MANY_TO_PLAYLIST <playlist_name> <video_id>... | @<file>",
+            "Adds the videos, or those listed one per line in file, to the "
+            "playlist at once.", range(2, sys.maxsize),
+            "Please enter ADD_MANY_TO_PLAYLIST command followed by a "
+            "playlist name and video_ids or @file."),
+    Command("REMOVE_FROM_PLAYLIST", "remove_from_playlist",
+            "REMOVE_FROM_PLAYLIST <playlist_name> <video_id>",
+            "Removes the specified video from the specified playlist", (2,),
+            "Please enter REMOVE_FROM_PLAYLIST command followed by a "
+            "playlist name and video_id to remove."),
+    Command("CLEAR_PLAYLIST", "clear_playlist",
+            "CLEAR_PLAYLIST <playlist_name>",
+            "Removes all the videos from the playlist.", (1,),
+            "Please enter CLEAR_PLAYLIST command followed by a "
+            "playlist name."),
+    Command("DELETE_PLAYLIST", "delete_playlist",
+            "DELETE_PLAYLIST <playlist_name>", "Deletes the playlist.", (1,),
+            "Please enter DELETE_PLAYLIST command followed by a "
+            "playlist name."),
+    Command("SHOW_PLAYLIST", "show_playlist", "SHOW_PLAYLIST <playlist_name>",
+            "List all the videos in this playlist.", (1,),
+            "Please enter SHOW_PLAYLIST command followed by a "
+            "playlist name."),
+    Command("SHOW_ALL_PLAYLISTS", "show_all_playlists", "SHOW_ALL_PLAYLISTS",
+            "Display all the available playlists."),
+    Command("SEARCH_VIDEOS", "search_videos", "SEARCH_VIDEOS <search_term>",
+            "Display all the videos whose titles contain the search_term.",
+            (1,),
+            "Please enter SEARCH_VIDEOS command followed by a "
+            "search term."),
+    Command("SEARCH_RANKED",
+            lambda parser, *words: parser._player.search_videos_ranked(
+                " ".join(words)),
+            "SEARCH_RANKED <words>",
+            "Display the 10 videos best matching the words, tolerating "
+            "typos.", range(1, 17),
+            "Please enter SEARCH_RANKED command followed by one to 16 "
+            "search words."),
+    Command("SEARCH_VIDEOS_WITH_TAG", "search_videos_tag",
+            "SEARCH_VIDEOS_WITH_TAG <tag_name>",
+            "Display all videos whose tags contains the provided tag.", (1,),
+            "Please enter SEARCH_VIDEOS_WITH_TAG command followed by a "
+            "video tag."),
+    Command("FLAG_VIDEO", "flag_video", "FLAG_VIDEO <video_id> <flag_reason>",
+            "Mark a video as flagged.", (1, 2),
+            "Please enter FLAG_VIDEO command followed by a "
+            "video_id and an optional flag reason."),
+    Command("ALLOW_VIDEO", "allow_video", "ALLOW_VIDEO <video_id>",
+            "Removes a flag from a video.", (1,),
+            "Please enter ALLOW_VIDEO command followed by a "
+            "video_id."),
+    Command("FLAG_VIDEOS", _flag_many,
+            "FLAG_VIDEOS <video_id>[:<flag_reason>]... | @<file>",
+            "Marks the videos, or those listed one per line in file, as "
+            "flagged at once.", _MANY,
+            "Please enter FLAG_VIDEOS command followed by video_ids or "
+            "@file."),
+    Command("ALLOW_VIDEOS", _allow_many,
+            "ALLOW_VIDEOS <video_id>... | @<file>",
+            "Removes the flags from the videos, or those listed one per "
+            "line in file, at once.", _MANY,
+            "Please enter ALLOW_VIDEOS command followed by video_ids or "
+            "@file."),
+    Command("STATS", lambda parser, *path: parser._show_stats(*path),
+            "STATS [<file>]",
+            "Shows the count, errors and latency of every command, or "
+            "writes them to file in the Prometheus text format.", (0, 1),
+            "Please enter STATS command optionally followed by a "
+            "file name."),
+    Command("PROFILE", lambda parser, *args: parser._profile(*args),
+            "PROFILE START|STOP [<file>]",
+            "Samples the stacks of the following commands, then writes "
+            "them per command to file (default profile.collapsed; a .json "
+            "file gets the speedscope format).", (1, 2),
+            "Please enter PROFILE START, or PROFILE STOP optionally "
+            "followed by a file name.", local_only=True),
+    Command("HELP", lambda parser: parser._get_help(), "HELP",
+            "Displays help."),
+):
+    register_command(_command)
+
+
 class CommandParser:
     """A class used to parse and execute a user Command."""
 
-    def __init__(self, video_player):
+    def __init__(self, video_player, metrics=None, profiler=None,
+                 allow_files=False):
+        """CommandParser constructor.
+
+        Args:
+            video_player: The VideoPlayer the commands are executed on.
+            metrics: Optional CommandMetrics every executed command is
+                recorded in, see STATS.
+            profiler: Optional SamplingProfiler told about every executed
+                command, see PROFILE.
+            allow_files: If True commands may read and write files named
+                in their arguments, e.g. FLAG_VIDEOS @file, and the
+                local_only commands, e.g. PROFILE, are available. Only
+                enable it for a local user, never for remote clients.
+        """
         self._player = video_player
+        self.metrics = metrics
+        self.profiler = profiler
+        self.allow_files = allow_files
+        # Command name -> (Command, bound handler), resolved once here so
+        # dispatch is a single dictionary lookup.
+        self._dispatch = {}
+        for command in _COMMANDS.values():
+            if allow_files or not command.local_only:
+                self.register(command)
+
+    def register(self, command):
+        """Makes a command available to this parser only.
+
+        Args:
+            command: The Command to register, replacing one with the same
+                name.
+        """
+        if isinstance(command.handler, str):
+            handler = getattr(self._player, command.handler)
+        else:
+            handler = partial(command.handler, self)
+        self._dispatch[command.name] = (command, handler)
 
     def execute_command(self, command: Sequence[str]):
         """Executes the user command. Expects the command to be upper case.
            Raises CommandException if a command cannot be parsed.
         """
+        if self.metrics is None and self.profiler is None:
+            self._execute(command)
+            return
+
+        name = command[0].upper() if command else ""
+        # Unknown names share one label so typos cannot grow the metrics.
+        if name not in self._dispatch:
+            name = "UNKNOWN"
+        profiler = self.profiler
+        if profiler is not None:
+            profiler.enter(name)
+        started = time.perf_counter()
+        failed = True
+        try:
+            self._execute(command)
+            failed = name == "UNKNOWN"
+        finally:
+            if profiler is not None:
+                profiler.exit()
+            if self.metrics is not None:
+                self.metrics.record(name, time.perf_counter() - started,
+                                    failed)
+
+    def _execute(self, command):
         if not command:
             raise CommandException(
                 "Please enter a valid command, "
                 "type HELP for a list of available commands.")
 
-        if command[0].upper() == "NUMBER_OF_VIDEOS":
-            self._player.number_of_videos()
-
-        elif command[0].upper() == "SHOW_ALL_VIDEOS":
-            self._player.show_all_videos()
-
-        elif command[0].upper() == "PLAY":
-            if len(command) != 2:
-                raise CommandException(
-                    "Please enter PLAY command followed by video_id.")
-            self._player.play_video(command[1])
-
-        elif command[0].upper() == "PLAY_RANDOM":
-            self._player.play_random_video()
-
-        elif command[0].upper() == "STOP":
-            self._player.stop_video()
-
-        elif command[0].upper() == "PAUSE":
-            self._player.pause_video()
-
-        elif command[0].upper() == "CONTINUE":
-            self._player.continue_video()
-
-        elif command[0].upper() == "SHOW_PLAYING":
-            self._player.show_playing()
-
-        elif command[0].upper() == "CREATE_PLAYLIST":
-            if len(command) != 2:
-                raise CommandException(
-                    "Please enter CREATE_PLAYLIST command followed by a "
-                    "playlist name.")
-            self._player.create_playlist(command[1])
-
-        elif command[0].upper() == "ADD_TO_PLAYLIST":
-            if len(command) != 3:
-                raise CommandException(
-                    "Please enter ADD_TO_PLAYLIST command followed by a "
-                    "playlist name and video_id to add.")
-            self._player.add_to_playlist(command[1], command[2])
-
-        elif command[0].upper() == "REMOVE_FROM_PLAYLIST":
-            if len(command) != 3:
-                raise CommandException(
-                    "Please enter REMOVE_FROM_PLAYLIST command followed by a "
-                    "playlist name and video_id to remove.")
-            self._player.remove_from_playlist(command[1], command[2])
-
-        elif command[0].upper() == "CLEAR_PLAYLIST":
-            if len(command) != 2:
-                raise CommandException(
-                    "Please enter CLEAR_PLAYLIST command followed by a "
-                    "playlist name.")
-            self._player.clear_playlist(command[1])
-
-        elif command[0].upper() == "DELETE_PLAYLIST":
-            if len(command) != 2:
-                raise CommandException(
-                    "Please enter DELETE_PLAYLIST command followed by a "
-                    "playlist name.")
-            self._player.delete_playlist(command[1])
-
-        elif command[0].upper() == "SHOW_PLAYLIST":
-            if len(command) != 2:
-                raise CommandException(
-                    "Please enter SHOW_PLAYLIST command followed by a "
-                    "playlist name.")
-            self._player.show_playlist(command[1])
-
-        elif command[0].upper() == "SHOW_ALL_PLAYLISTS":
-            self._player.show_all_playlists()
-
-        elif command[0].upper() == "SEARCH_VIDEOS":
-            if len(command) != 2:
-                raise CommandException(
-                    "Please enter SEARCH_VIDEOS command followed by a "
-                    "search term.")
-            self._player.search_videos(command[1])
-
-        elif command[0].upper() == "SEARCH_VIDEOS_WITH_TAG":
-            if len(command) != 2:
-                raise CommandException(
-                    "Please enter SEARCH_VIDEOS_WITH_TAG command followed by a "
-                    "video tag.")
-            self._player.search_videos_tag(command[1])
-
-        elif command[0].upper() == "FLAG_VIDEO":
-            if len(command) == 3:
-                self._player.flag_video(command[1], command[2])
-            elif len(command) == 2:
-                self._player.flag_video(command[1])
-            else:
-                raise CommandException(
-                    "Please enter FLAG_VIDEO command followed by a "
-                    "video_id and an optional flag reason.")
-
-        elif command[0].upper() == "ALLOW_VIDEO":
-            if len(command) != 2:
-                raise CommandException(
-                    "Please enter ALLOW_VIDEO command followed by a "
-                    "video_id.")
-            self._player.allow_video(command[1])
-
-        elif command[0].upper() == "HELP":
-            self._get_help()
-        else:
-            print(
+        entry = self._dispatch.get(command[0].upper())
+        if entry is None:
+            self._player.output.emit(
+                "error",
                 "Please enter a valid command, type HELP for a list of "
                 "available commands.")
+            return
+
+        spec, handler = entry
+        if spec.arg_counts is None:
+            handler()
+        elif len(command) - 1 in spec.arg_counts:
+            handler(*command[1:])
+        else:
+            raise CommandException(spec.error)
+
+    def _show_stats(self, path=None):
+        """Displays the command metrics, or writes them to path."""
+        if path is not None and not self.allow_files:
+            raise CommandException(
+                "Cannot write files: STATS <file> is disabled, "
+                "use STATS alone")
+        if self.metrics is None:
+            self._player.output.emit(
+                "error", "Command metrics are not enabled.")
+        elif path is not None:
+            self.metrics.write_prometheus(path)
+            self._player.output.emit(
+                "stats_written", "Wrote command metrics to {path}", path=path)
+        else:
+            self._player.output.emit(
+                "stats", "{text}", text=self.metrics.summary())
+
+    def _profile(self, action, path="profile.collapsed"):
+        """Starts or stops sampling the commands, see SamplingProfiler."""
+        action = action.upper()
+        if action == "START":
+            if self.profiler is None:
+                self.profiler = SamplingProfiler()
+            self.profiler.clear()
+            self.profiler.start()
+            self._player.output.emit("profile_started", "Profiling started")
+        elif action == "STOP":
+            if self.profiler is None or not self.profiler.running:
+                self._player.output.emit(
+                    "error", "Cannot stop profiling: Profiling is not started")
+                return
+            self.profiler.stop()
+            self.profiler.write(path)
+            self._player.output.emit(
+                "profile_written", "Wrote profile to {path}", path=path)
+        else:
+            raise CommandException(
+                "Please enter PROFILE START, or PROFILE STOP optionally "
+                "followed by a file name.")
 
     def _get_help(self):
         """Displays all available commands to the user."""
+        lines = [f"    {spec.usage} - {spec.description}"
+                 for spec, _ in self._dispatch.values()]
+        lines.append("    EXIT - Terminates the program execution.")
         help_text = textwrap.dedent("""
         Available commands:
-            NUMBER_OF_VIDEOS - Shows how many videos are in the library.
-            SHOW_ALL_VIDEOS - Lists all videos from the library.
-            PLAY <video_id> - Plays specified video.
-            PLAY_RANDOM - Plays a random video from the library.
-            STOP - Stop the current video.
-            PAUSE - Pause the current video.
-            CONTINUE - Resume the current paused video.
-            SHOW_PLAYING - Displays the title, url and paused status of the video that is currently playing (or paused).
-            CREATE_PLAYLIST <playlist_name> - Creates a new (empty) playlist with the provided name.
-            ADD_TO_PLAYLIST <playlist_name> <video_id> - Adds the requested video to the playlist.
-            REMOVE_FROM_PLAYLIST <playlist_name> <video_id> - Removes the specified video from the specified playlist
-            CLEAR_PLAYLIST <playlist_name> - Removes all the videos from the playlist.
-            DELETE_PLAYLIST <playlist_name> - Deletes the playlist.
-            SHOW_PLAYLIST <playlist_name> - List all the videos in this playlist.
-            SHOW_ALL_PLAYLISTS - Display all the available playlists.
-            SEARCH_VIDEOS <search_term> - Display all the videos whose titles contain the search_term.
-            SEARCH_VIDEOS_WITH_TAG <tag_name> -Display all videos whose tags contains the provided tag.
-            FLAG_VIDEO <video_id> <flag_reason> - Mark a video as flagged.
-            ALLOW_VIDEO <video_id> - Removes a flag from a video.
-            HELP - Displays help.
-            EXIT - Terminates the program execution.
-        """)
-        print(help_text)
+        """) + "\n".join(lines) + "\n"
+        self._player.output.emit("help", "{text}", text=help_text)
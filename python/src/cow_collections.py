@@ -0,0 +1,246 @@
+"""Copy-on-write collection classes shared between catalogue versions."""
+
+from collections.abc import MutableMapping, Sequence
+from itertools import accumulate, chain, islice
+import bisect
+
+# Keys per chunk of a new CowSortedList; a chunk is split at twice as many.
+_CHUNK_SIZE = 512
+
+
+class CowDict(MutableMapping):
+    """A class used to share a large dict between versions of a catalogue.
+
+    The items are spread over about the square root of their number of
+    buckets by hash. copy only copies the list of buckets, and either side
+    copies a bucket the first time it writes to it afterwards, so a write
+    costs the size of one bucket instead of the whole dict. A copy that is
+    never written after being published can be read from any thread.
+    """
+
+    __slots__ = ("_buckets", "_owned", "_len")
+
+    def __init__(self, items=()):
+        """CowDict constructor.
+
+        Args:
+            items: A mapping or (key, value) pairs to start with.
+        """
+        self._fill(dict(items))
+
+    def _fill(self, items):
+        count = 1
+        while count * count < len(items):
+            count *= 2
+        buckets = [{} for _ in range(count)]
+        mask = count - 1
+        for key, value in items.items():
+            buckets[hash(key) & mask][key] = value
+        self._buckets = buckets
+        # Indexes of the buckets only this instance refers to.
+        self._owned = set(range(count))
+        self._len = len(items)
+
+    def copy(self):
+        """Returns a copy sharing every bucket with this dict until written."""
+        clone = CowDict.__new__(CowDict)
+        clone._buckets = list(self._buckets)
+        clone._owned = set()
+        clone._len = self._len
+        self._owned = set()
+        return clone
+
+    def _bucket(self, key):
+        return self._buckets[hash(key) & (len(self._buckets) - 1)]
+
+    def _writable_bucket(self, key):
+        index = hash(key) & (len(self._buckets) - 1)
+        if index not in self._owned:
+            self._buckets[index] = dict(self._buckets[index])
+            self._owned.add(index)
+        return self._buckets[index]
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        return chain.from_iterable(self._buckets)
+
+    def __contains__(self, key):
+        return key in self._bucket(key)
+
+    def __getitem__(self, key):
+        return self._bucket(key)[key]
+
+    def get(self, key, default=None):
+        return self._bucket(key).get(key, default)
+
+    def items(self):
+        """Returns an iterator over the (key, value) pairs."""
+        return chain.from_iterable(bucket.items() for bucket in self._buckets)
+
+    def values(self):
+        """Returns an iterator over the values."""
+        return chain.from_iterable(
+            bucket.values() for bucket in self._buckets)
+
+    def __setitem__(self, key, value):
+        bucket = self._writable_bucket(key)
+        if key not in bucket:
+            self._len += 1
+        bucket[key] = value
+        if self._len > 4 * len(self._buckets) ** 2:
+            self._fill(dict(self.items()))
+
+    def __delitem__(self, key):
+        if key not in self._bucket(key):
+            raise KeyError(key)
+        del self._writable_bucket(key)[key]
+        self._len -= 1
+
+
+class CowSortedList(Sequence):
+    """A class used to share a large sorted list between catalogue versions.
+
+    The keys are kept in sorted chunks. copy only copies the lists of
+    chunks, and either side copies a chunk the first time it writes to it
+    afterwards, so adding or removing a key costs a chunk plus the list of
+    chunks instead of the whole list. A copy that is never written after
+    being published can be read from any thread.
+    """
+
+    __slots__ = ("_chunks", "_maxes", "_owned", "_len", "_offsets")
+
+    def __init__(self, keys=()):
+        """CowSortedList constructor.
+
+        Args:
+            keys: The keys to start with, in any order.
+        """
+        keys = sorted(keys)
+        self._chunks = [keys[i:i + _CHUNK_SIZE]
+                        for i in range(0, len(keys), _CHUNK_SIZE)]
+        # The last, i.e. largest, key of every chunk.
+        self._maxes = [chunk[-1] for chunk in self._chunks]
+        # Indexes of the chunks only this instance refers to.
+        self._owned = set(range(len(self._chunks)))
+        self._len = len(keys)
+        # Position of the first key of every chunk, built when needed.
+        self._offsets = None
+
+    def copy(self):
+        """Returns a copy sharing every chunk with this list until written."""
+        clone = CowSortedList.__new__(CowSortedList)
+        clone._chunks = list(self._chunks)
+        clone._maxes = list(self._maxes)
+        clone._owned = set()
+        clone._len = self._len
+        clone._offsets = self._offsets
+        self._owned = set()
+        return clone
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        return chain.from_iterable(self._chunks)
+
+    def _positions(self):
+        offsets = self._offsets
+        if offsets is None:
+            offsets = self._offsets = list(
+                accumulate(map(len, self._chunks), initial=0))
+        return offsets
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._len)
+            if step != 1:
+                return list(self)[index]
+            return list(self.islice(start, stop))
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError("list index out of range")
+        offsets = self._positions()
+        chunk = bisect.bisect_right(offsets, index) - 1
+        return self._chunks[chunk][index - offsets[chunk]]
+
+    def islice(self, start=0, stop=None):
+        """Yields the keys from position start up to, not including, stop."""
+        if stop is None or stop > self._len:
+            stop = self._len
+        if start >= stop:
+            return
+        offsets = self._positions()
+        chunk = bisect.bisect_right(offsets, start) - 1
+        skip = start - offsets[chunk]
+        remaining = stop - start
+        for keys in islice(self._chunks, chunk, None):
+            keys = keys[skip:skip + remaining]
+            yield from keys
+            remaining -= len(keys)
+            if not remaining:
+                return
+            skip = 0
+
+    def bisect_left(self, key):
+        """Returns the position of the first key not lower than key."""
+        chunk = bisect.bisect_left(self._maxes, key)
+        if chunk == len(self._chunks):
+            return self._len
+        return (self._positions()[chunk] +
+                bisect.bisect_left(self._chunks[chunk], key))
+
+    def __contains__(self, key):
+        chunk = bisect.bisect_left(self._maxes, key)
+        if chunk == len(self._chunks):
+            return False
+        keys = self._chunks[chunk]
+        return keys[bisect.bisect_left(keys, key)] == key
+
+    def _writable_chunk(self, chunk):
+        if chunk not in self._owned:
+            self._chunks[chunk] = list(self._chunks[chunk])
+            self._owned.add(chunk)
+        return self._chunks[chunk]
+
+    def add(self, key):
+        """Inserts key at its sorted position."""
+        chunks = self._chunks
+        if not chunks:
+            chunks.append([key])
+            self._maxes.append(key)
+            self._owned.add(0)
+        else:
+            chunk = bisect.bisect_left(self._maxes, key)
+            if chunk == len(chunks):
+                chunk -= 1
+            keys = self._writable_chunk(chunk)
+            bisect.insort(keys, key)
+            self._maxes[chunk] = keys[-1]
+            if len(keys) > 2 * _CHUNK_SIZE:
+                chunks[chunk:chunk + 1] = [keys[:_CHUNK_SIZE],
+                                           keys[_CHUNK_SIZE:]]
+                self._maxes[chunk:chunk + 1] = [chunks[chunk][-1], keys[-1]]
+                self._owned = {i + (i > chunk) for i in self._owned}
+                self._owned.add(chunk + 1)
+        self._len += 1
+        self._offsets = None
+
+    def remove(self, key):
+        """Removes key. Raises ValueError if it is not in the list."""
+        if key not in self:
+            raise ValueError(f"{key!r} is not in list")
+        chunk = bisect.bisect_left(self._maxes, key)
+        keys = self._writable_chunk(chunk)
+        del keys[bisect.bisect_left(keys, key)]
+        if keys:
+            self._maxes[chunk] = keys[-1]
+        else:
+            del self._chunks[chunk]
+            del self._maxes[chunk]
+            self._owned = {i - (i > chunk) for i in self._owned
+                           if i != chunk}
+        self._len -= 1
+        self._offsets = None
@@ -0,0 +1,108 @@
+"""A flag store class shared by processes on one host."""
+
+import sqlite3
+import threading
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS flags (
+    video_id TEXT PRIMARY KEY,
+    reason TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('generation', 0);
+"""
+
+
+class SqliteFlagStore:
+    """A class used to keep flagged videos in a SQLite database.
+
+    Every VideoLibrary opened on the same database file sees the same
+    flags. Each change bumps a generation counter in the same transaction,
+    so readers can tell whether anything changed by reading a single row.
+    """
+
+    def __init__(self, path):
+        """SqliteFlagStore constructor.
+
+        Args:
+            path: The database file, created if missing.
+        """
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            str(path), timeout=30, isolation_level=None,
+            check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(_SCHEMA)
+
+    def generation(self):
+        """Returns the counter that changes whenever the flags change."""
+        with self._lock:
+            return self._connection.execute(
+                "SELECT value FROM meta WHERE key = 'generation'"
+            ).fetchone()[0]
+
+    def load(self):
+        """Returns the generation and a dict of video_id to flag reason."""
+        with self._lock:
+            cursor = self._connection.cursor()
+            cursor.execute("BEGIN")
+            try:
+                generation = cursor.execute(
+                    "SELECT value FROM meta WHERE key = 'generation'"
+                ).fetchone()[0]
+                flags = dict(cursor.execute(
+                    "SELECT video_id, reason FROM flags"))
+            finally:
+                cursor.execute("COMMIT")
+        return generation, flags
+
+    def _write(self, statement, rows, require_existing=False):
+        with self._lock:
+            cursor = self._connection.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                changed = 0
+                for row in rows:
+                    changed += cursor.execute(statement, row).rowcount
+                    if require_existing and cursor.rowcount == 0:
+                        raise KeyError(row[0])
+                cursor.execute(
+                    "UPDATE meta SET value = value + 1 "
+                    "WHERE key = 'generation'")
+            except BaseException:
+                cursor.execute("ROLLBACK")
+                raise
+            cursor.execute("COMMIT")
+        return changed
+
+    def flag(self, video_id, reason=""):
+        """Flags video_id, replacing any previous reason."""
+        self._write("INSERT OR REPLACE INTO flags (video_id, reason) "
+                    "VALUES (?, ?)", [(video_id, reason)])
+
+    def unflag(self, video_id):
+        """Removes the flag of video_id. Raises KeyError if not flagged."""
+        self._write("DELETE FROM flags WHERE video_id = ?", [(video_id,)],
+                    require_existing=True)
+
+    def flag_many(self, reasons):
+        """Flags every video_id of a mapping to reasons in one transaction."""
+        self._write("INSERT OR REPLACE INTO flags (video_id, reason) "
+                    "VALUES (?, ?)", list(reasons.items()))
+
+    def unflag_many(self, video_ids):
+        """Removes the flags of video_ids in one transaction.
+
+        Raises KeyError, and changes nothing, if one of them is not
+        flagged.
+        """
+        self._write("DELETE FROM flags WHERE video_id = ?",
+                    [(video_id,) for video_id in video_ids],
+                    require_existing=True)
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
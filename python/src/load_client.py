@@ -0,0 +1,116 @@
+"""A load generator for the YouTube line-protocol server.
+
+Opens many concurrent sessions, replays a command script in each of them
+and reports latency percentiles and throughput.
+
+Run from the python directory with:
+    python -m src.load_client --port 8765 --clients 100 --repeat 50
+"""
+
+from .server import PROMPT
+import argparse
+import asyncio
+import time
+
+DEFAULT_COMMANDS = [
+    "NUMBER_OF_VIDEOS",
+    "SHOW_ALL_VIDEOS",
+    "PLAY amazing_cats_video_id",
+    "PAUSE",
+    "SHOW_PLAYING",
+    "SEARCH_VIDEOS cat",
+    "1",
+    "SEARCH_VIDEOS_WITH_TAG #dog",
+    "no",
+    "CREATE_PLAYLIST mine",
+    "ADD_TO_PLAYLIST mine funny_dogs_video_id",
+    "SHOW_PLAYLIST mine",
+    "DELETE_PLAYLIST mine",
+    "STOP",
+]
+
+_PROMPT_LINE = f"{PROMPT}\n".encode()
+
+
+async def _read_response(reader):
+    while True:
+        line = await reader.readline()
+        if not line:
+            raise ConnectionError("Server closed the connection")
+        if line == _PROMPT_LINE:
+            return
+
+
+async def run_client(connect, commands, repeat, latencies):
+    """Replays commands repeat times in one session, recording latencies."""
+    reader, writer = await connect()
+    try:
+        await _read_response(reader)
+        for _ in range(repeat):
+            for command in commands:
+                started = time.perf_counter()
+                writer.write(command.encode() + b"\n")
+                await writer.drain()
+                await _read_response(reader)
+                latencies.append(time.perf_counter() - started)
+        writer.write(b"EXIT\n")
+        await writer.drain()
+    finally:
+        writer.close()
+
+
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def run_load(connect, clients, commands, repeat):
+    """Runs the clients concurrently and returns a summary dict."""
+    latencies = []
+    started = time.perf_counter()
+    await asyncio.gather(*(run_client(connect, commands, repeat, latencies)
+                           for _ in range(clients)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "seconds": elapsed,
+        "throughput": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": _percentile(latencies, 0.50) * 1000,
+        "p99_ms": _percentile(latencies, 0.99) * 1000,
+    }
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--host", default="127.0.0.1")
+    arg_parser.add_argument("--port", type=int, default=8765)
+    arg_parser.add_argument("--unix", metavar="PATH",
+                            help="connect to a Unix socket instead of TCP")
+    arg_parser.add_argument("--clients", type=int, default=10)
+    arg_parser.add_argument("--repeat", type=int, default=10,
+                            help="times each client replays the script")
+    arg_parser.add_argument("--commands", metavar="FILE",
+                            help="command script, one command per line")
+    args = arg_parser.parse_args(argv)
+
+    commands = DEFAULT_COMMANDS
+    if args.commands:
+        with open(args.commands) as command_file:
+            commands = [line.rstrip("\n") for line in command_file]
+
+    if args.unix:
+        def connect():
+            return asyncio.open_unix_connection(args.unix)
+    else:
+        def connect():
+            return asyncio.open_connection(args.host, args.port)
+
+    summary = asyncio.run(run_load(connect, args.clients, commands,
+                                   args.repeat))
+    print(f"{summary['requests']} requests in {summary['seconds']:.3f}s "
+          f"({summary['throughput']:.0f} requests/s)")
+    print(f"p50 {summary['p50_ms']:.3f} ms  p99 {summary['p99_ms']:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Output sink classes used by the VideoPlayer."""
+
+import sys
+
+
+class OutputEvent:
+    """A class used to represent one message of the VideoPlayer.
+
+    The message text is only built when render() is called, so sinks that
+    never show it never pay for the formatting.
+    """
+
+    __slots__ = ("kind", "template", "fields")
+
+    def __init__(self, kind, template, fields):
+        self.kind = kind
+        self.template = template
+        self.fields = fields
+
+    def render(self):
+        """Returns the message text. Tuple fields are joined by spaces."""
+        fields = {name: " ".join(value) if isinstance(value, tuple) else value
+                  for name, value in self.fields.items()}
+        return self.template.format(**fields)
+
+    def __repr__(self):
+        return f"OutputEvent({self.kind!r}, {self.fields!r})"
+
+
+class OutputSink:
+    """The interface the VideoPlayer writes its messages to."""
+
+    def emit(self, kind, template, **fields):
+        """Receives one message.
+
+        Args:
+            kind: A short name identifying the message, e.g. "playing".
+            template: A str.format template rendering the message.
+            fields: The values referenced by the template.
+        """
+        raise NotImplementedError
+
+    def flush(self):
+        """Writes out anything held back by the sink."""
+
+
+class StdoutSink(OutputSink):
+    """Prints every message as soon as it is emitted."""
+
+    def emit(self, kind, template, **fields):
+        print(OutputEvent(kind, template, fields).render())
+
+
+class BufferedSink(OutputSink):
+    """Renders messages into a buffer written out in large chunks."""
+
+    def __init__(self, stream=None, max_lines=1024):
+        """BufferedSink constructor.
+
+        Args:
+            stream: The stream to write to. Defaults to sys.stdout at the
+                time of each write.
+            max_lines: The number of lines held before writing them out.
+        """
+        self._stream = stream
+        self._max_lines = max_lines
+        self._lines = []
+
+    def emit(self, kind, template, **fields):
+        self._lines.append(OutputEvent(kind, template, fields).render())
+        if len(self._lines) >= self._max_lines:
+            self.flush()
+
+    def flush(self):
+        if self._lines:
+            stream = self._stream or sys.stdout
+            stream.write("\n".join(self._lines) + "\n")
+            self._lines.clear()
+
+    def getvalue(self):
+        """Returns and clears the buffered text without writing it."""
+        text = "".join(line + "\n" for line in self._lines)
+        self._lines.clear()
+        return text
+
+
+class EventCollectorSink(OutputSink):
+    """Keeps the messages as OutputEvent objects instead of text."""
+
+    def __init__(self):
+        self.events = []
+
+    def emit(self, kind, template, **fields):
+        self.events.append(OutputEvent(kind, template, fields))
+
+    def drain(self):
+        """Returns the collected events and starts a new collection."""
+        events = self.events
+        self.events = []
+        return events
+
+
+class NullSink(OutputSink):
+    """Discards every message, for benchmarks."""
+
+    def emit(self, kind, template, **fields):
+        pass
@@ -0,0 +1,28 @@
+"""A player session class."""
+
+from .video_playlist import Playlist
+
+
+class PlayerSession:
+    """A class used to represent the state of one user of a VideoPlayer.
+
+    Everything a user can change without affecting other users lives here,
+    so many sessions can share a single VideoLibrary.
+    """
+
+    __slots__ = ("current_video", "is_playing", "is_paused", "playlists",
+                 "pending_choices")
+
+    def __init__(self, playlists=None):
+        """PlayerSession constructor.
+
+        Args:
+            playlists: The Playlist holding the user's playlists, e.g. a
+                PersistentPlaylist. Defaults to a new in-memory one.
+        """
+        self.current_video = None
+        self.is_playing = False
+        self.is_paused = False
+        self.playlists = playlists if playlists is not None else Playlist()
+        # The video_ids offered by a search waiting for an answer.
+        self.pending_choices = None
@@ -0,0 +1,206 @@
+"""A persistent playlist class."""
+
+from .video_playlist import Playlist
+from pathlib import Path
+import json
+import os
+import threading
+
+# Log operation name -> the Playlist method replaying it.
+_OPERATIONS = {
+    "create": Playlist.create_playlist,
+    "add": Playlist.add_to_playlist,
+    "add_many": Playlist.add_many_to_playlist,
+    "remove": Playlist.remove_from_playlist,
+    "insert": Playlist.insert_into_playlist,
+    "move": Playlist.move_in_playlist,
+    "clear": Playlist.clear_playlist,
+    "delete": Playlist.delete_playlist,
+}
+
+
+class PersistentPlaylist(Playlist):
+    """A Playlist whose changes survive a restart.
+
+    Every change is appended as one numbered JSON line to a write-ahead
+    log. Lines are group-committed: the log is fsynced once commit_every
+    operations are pending, or by a timer commit_interval seconds after
+    the first pending one, so a crash loses at most that window. After
+    compact_every operations the whole state is written to a snapshot and
+    the log is truncated, which keeps recovery time bounded. The snapshot
+    records the last operation number it contains, so a crash between
+    writing it and truncating the log replays nothing twice. Every change
+    is applied and logged under one lock, so the log replays changes in
+    the order they were made. Use it as a context manager, or call close.
+    """
+
+    def __init__(self, directory, commit_every=64, commit_interval=0.05,
+                 compact_every=10000):
+        """PersistentPlaylist constructor. Recovers any existing state.
+
+        Args:
+            directory: The directory holding playlists.json and
+                playlists.log. Created if missing.
+            commit_every: The number of operations per fsync.
+            commit_interval: The longest time, in seconds, an operation
+                waits for its fsync.
+            compact_every: The number of logged operations that triggers a
+                compaction into the snapshot.
+        """
+        super().__init__()
+        self._directory = Path(directory)
+        self._directory.mkdir(parents=True, exist_ok=True)
+        self._snapshot_path = self._directory / "playlists.json"
+        self._log_path = self._directory / "playlists.log"
+        self._commit_every = commit_every
+        self._commit_interval = commit_interval
+        self._compact_every = compact_every
+        self._lock = threading.Lock()
+        self._timer = None
+        self._pending = 0
+        self._sequence = 0
+        self._logged = self._recover()
+        self._log = open(self._log_path, "a", encoding="utf-8")
+
+    def _recover(self):
+        """Loads the snapshot and replays the log. Returns the ops replayed."""
+        if self._snapshot_path.exists():
+            with open(self._snapshot_path, encoding="utf-8") as snapshot:
+                state = json.load(snapshot)
+            self._sequence = state["sequence"]
+            for key, playlist in state["playlists"].items():
+                self.playlist[key] = {
+                    "name": playlist["name"],
+                    "videos": dict.fromkeys(playlist["videos"])}
+
+        replayed = 0
+        valid_bytes = 0
+        if self._log_path.exists():
+            with open(self._log_path, "rb") as log:
+                for line in log:
+                    try:
+                        if not line.endswith(b"\n"):
+                            raise ValueError("Unterminated line")
+                        sequence, operation, *args = json.loads(line)
+                    except ValueError:
+                        # A torn write from a crash: drop it and the rest.
+                        break
+                    valid_bytes += len(line)
+                    if sequence <= self._sequence:
+                        continue
+                    _OPERATIONS[operation](self, *args)
+                    self._sequence = sequence
+                    replayed += 1
+            os.truncate(self._log_path, valid_bytes)
+        return replayed
+
+    def _append(self, operation, *args):
+        """Logs one operation. Needs _lock, held since applying it."""
+        self._sequence += 1
+        self._log.write(
+            json.dumps([self._sequence, operation, *args]) + "\n")
+        self._pending += 1
+        self._logged += 1
+        if self._logged >= self._compact_every:
+            self._compact()
+        elif self._pending >= self._commit_every:
+            self._commit()
+        elif self._timer is None:
+            self._timer = threading.Timer(
+                self._commit_interval, self.commit)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def commit(self):
+        """Makes every logged operation durable with a single fsync."""
+        with self._lock:
+            if not self._log.closed:
+                self._commit()
+
+    def _commit(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._pending:
+            self._log.flush()
+            os.fsync(self._log.fileno())
+            self._pending = 0
+
+    def compact(self):
+        """Writes the current state to the snapshot and empties the log."""
+        with self._lock:
+            self._compact()
+
+    def _compact(self):
+        self._commit()
+        state = {
+            "sequence": self._sequence,
+            "playlists": {key: {"name": playlist["name"],
+                                "videos": list(playlist["videos"])}
+                          for key, playlist in self.playlist.items()},
+        }
+        tmp_path = self._snapshot_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as snapshot:
+            json.dump(state, snapshot)
+            snapshot.flush()
+            os.fsync(snapshot.fileno())
+        os.replace(tmp_path, self._snapshot_path)
+        self._log.close()
+        self._log = open(self._log_path, "w", encoding="utf-8")
+        os.fsync(self._log.fileno())
+        self._logged = 0
+
+    def close(self):
+        """Commits pending operations and closes the log."""
+        with self._lock:
+            if not self._log.closed:
+                self._commit()
+                self._log.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def create_playlist(self, playlist_name):
+        with self._lock:
+            super().create_playlist(playlist_name)
+            self._append("create", playlist_name)
+
+    def add_to_playlist(self, playlist_name, video_id):
+        with self._lock:
+            super().add_to_playlist(playlist_name, video_id)
+            self._append("add", playlist_name, video_id)
+
+    def add_many_to_playlist(self, playlist_name, video_ids):
+        # One log line, so a crash keeps either all of the videos or none.
+        video_ids = list(video_ids)
+        with self._lock:
+            super().add_many_to_playlist(playlist_name, video_ids)
+            self._append("add_many", playlist_name, video_ids)
+
+    def remove_from_playlist(self, playlist_name, video_id):
+        with self._lock:
+            super().remove_from_playlist(playlist_name, video_id)
+            self._append("remove", playlist_name, video_id)
+
+    def insert_into_playlist(self, playlist_name, video_id, position):
+        with self._lock:
+            super().insert_into_playlist(playlist_name, video_id, position)
+            self._append("insert", playlist_name, video_id, position)
+
+    def move_in_playlist(self, playlist_name, video_id, position):
+        with self._lock:
+            super().move_in_playlist(playlist_name, video_id, position)
+            self._append("move", playlist_name, video_id, position)
+
+    def clear_playlist(self, playlist_name):
+        with self._lock:
+            super().clear_playlist(playlist_name)
+            self._append("clear", playlist_name)
+
+    def delete_playlist(self, playlist_name):
+        with self._lock:
+            super().delete_playlist(playlist_name)
+            self._append("delete", playlist_name)
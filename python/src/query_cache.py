@@ -0,0 +1,113 @@
+"""A search result cache class."""
+
+from collections import OrderedDict
+import threading
+import time
+
+
+class QueryCache:
+    """A class used to cache search results by normalized query.
+
+    Entries are evicted least recently used first once max_entries is
+    reached, and expire ttl seconds after they were stored. Every entry
+    records the video_ids it depends on, so invalidate_video drops exactly
+    the entries a change to one video can affect instead of everything.
+    """
+
+    def __init__(self, max_entries=1024, ttl=60.0, clock=time.monotonic):
+        """QueryCache constructor.
+
+        Args:
+            max_entries: The largest number of cached queries.
+            ttl: The number of seconds an entry stays valid. None keeps
+                entries until they are evicted or invalidated.
+            clock: Callable returning the current time in seconds.
+        """
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        # Query key -> (expiry time, value, video_ids), oldest use first.
+        self._entries = OrderedDict()
+        # video_id -> set of query keys whose value depends on it.
+        self._dependents = {}
+        # Bumped by every invalidation, see put.
+        self._epoch = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def epoch(self):
+        """Returns a counter that changes whenever entries are invalidated."""
+        return self._epoch
+
+    def get(self, key):
+        """Returns the value cached for key, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[0] is None or
+                                      entry[0] > self._clock()):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                self._discard(key)
+            self.misses += 1
+            return None
+
+    def put(self, key, value, video_ids, epoch=None):
+        """Caches value for key.
+
+        Args:
+            key: The normalized query.
+            value: The result to cache.
+            video_ids: Every video_id whose change can alter value.
+            epoch: The epoch read before value was computed. If entries
+                were invalidated since, value may be stale and is dropped.
+        """
+        with self._lock:
+            if epoch is not None and epoch != self._epoch:
+                return
+            self._discard(key)
+            expiry = None if self._ttl is None else self._clock() + self._ttl
+            video_ids = frozenset(video_ids)
+            self._entries[key] = (expiry, value, video_ids)
+            for video_id in video_ids:
+                self._dependents.setdefault(video_id, set()).add(key)
+            while len(self._entries) > self._max_entries:
+                self._discard(next(iter(self._entries)))
+
+    def invalidate_video(self, video_id):
+        """Drops the entries depending on video_id. Returns their number."""
+        with self._lock:
+            self._epoch += 1
+            keys = self._dependents.pop(video_id, ())
+            for key in list(keys):
+                self._discard(key)
+            return len(keys)
+
+    def clear(self):
+        """Drops every entry."""
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+            self._dependents.clear()
+
+    def stats(self):
+        """Returns a dict of the "entries", "hits" and "misses" counts."""
+        return {"entries": len(self._entries), "hits": self.hits,
+                "misses": self.misses}
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for video_id in entry[2]:
+            keys = self._dependents.get(video_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._dependents[video_id]
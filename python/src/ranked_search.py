@@ -0,0 +1,230 @@
+"""A ranked, typo tolerant title search index class."""
+
+from .cow_collections import CowDict, CowSortedList
+import heapq
+import math
+import re
+
+_TOKEN = re.compile(r"\w+")
+
+# A word matched in a title of n words adds _LENGTH_SCALE /
+# (_LENGTH_SCALE + n) of its weight, so short, focused titles rank first.
+_LENGTH_SCALE = 4
+
+
+def tokenize(text):
+    """Returns the lowercased words of text, in order."""
+    return _TOKEN.findall(text.lower())
+
+
+def _token_grams(token):
+    # Padding makes the first and last letters count as much as the rest,
+    # so short words still have a few grams to compare.
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class RankedTitleIndex:
+    """A class used to answer ranked word queries over video titles.
+
+    Titles are split into words with an inverted index from every word to
+    the titles containing it. Each query word is expanded to the indexed
+    words that look like it, judged by the share of trigrams they have in
+    common, so "amazng" still finds "amazing". A video scores the rarity
+    (IDF) of every query word it matches, scaled by how close the match is
+    and lowered for long titles, plus a bonus when the title contains the
+    whole query.
+
+    The work per query is bounded whatever the number of matches: every
+    posting list is kept ordered by title length, i.e. by what the word
+    adds to a score, and only its first max_postings entries are scored.
+    For a word on more titles than that the ranking is approximate: a long
+    title that matches several query words can be missed.
+
+    copy is cheap: the copy shares its postings with the original until
+    either of them changes one, see TitleIndex.
+    """
+
+    def __init__(self, min_similarity=0.3, max_expansions=32,
+                 phrase_bonus=1.0, max_postings=1000):
+        """RankedTitleIndex constructor.
+
+        Args:
+            min_similarity: The lowest trigram similarity, in [0, 1], at
+                which an indexed word still matches a query word.
+            max_expansions: The most indexed words a query word expands
+                to, the most similar first.
+            phrase_bonus: Added to the score of titles containing the whole
+                query.
+            max_postings: The most titles scored per expanded word.
+        """
+        self._min_similarity = min_similarity
+        self._max_expansions = max_expansions
+        self._phrase_bonus = phrase_bonus
+        self._max_postings = max_postings
+        self._titles = CowDict()
+        # Word -> sorted (title length in words, video_id) of the titles
+        # containing it, the highest scoring first.
+        self._postings = CowDict()
+        # Trigram -> sorted indexed words containing it.
+        self._vocabulary = CowDict()
+        # Words and trigrams whose lists only this instance uses.
+        self._owned_words = set()
+        self._owned_grams = set()
+
+    def __len__(self):
+        return len(self._titles)
+
+    def copy(self):
+        """Returns a copy sharing its postings with this index until written."""
+        clone = RankedTitleIndex.__new__(RankedTitleIndex)
+        clone.__dict__.update(self.__dict__)
+        clone._titles = self._titles.copy()
+        clone._postings = self._postings.copy()
+        clone._vocabulary = self._vocabulary.copy()
+        clone._owned_words = set()
+        clone._owned_grams = set()
+        self._owned_words = set()
+        self._owned_grams = set()
+        return clone
+
+    @staticmethod
+    def _writable(mapping, owned, key):
+        """Returns the list of key in mapping, copied unless owned."""
+        if key not in owned:
+            keys = mapping.get(key)
+            mapping[key] = CowSortedList() if keys is None else keys.copy()
+            owned.add(key)
+        return mapping[key]
+
+    def _remove_from(self, mapping, owned, key, item):
+        keys = self._writable(mapping, owned, key)
+        keys.remove(item)
+        if not keys:
+            del mapping[key]
+            owned.discard(key)
+        return keys
+
+    def add(self, video_id, title):
+        """Adds a title to the index, replacing any previous one.
+
+        Args:
+            video_id: The video_id the title belongs to.
+            title: The title of the video.
+        """
+        if video_id in self._titles:
+            self.remove(video_id)
+        self._titles[video_id] = title.lower()
+        tokens = tokenize(title)
+        entry = (len(tokens), video_id)
+        for token in set(tokens):
+            if token not in self._postings:
+                for gram in _token_grams(token):
+                    self._writable(self._vocabulary, self._owned_grams,
+                                   gram).add(token)
+            self._writable(self._postings, self._owned_words,
+                           token).add(entry)
+
+    def add_many(self, titles):
+        """Adds many titles, sorting each posting list only once.
+
+        Args:
+            titles: (video_id, title) pairs of videos not yet indexed.
+        """
+        postings = {}
+        for video_id, title in titles:
+            self._titles[video_id] = title.lower()
+            tokens = tokenize(title)
+            entry = (len(tokens), video_id)
+            for token in set(tokens):
+                postings.setdefault(token, []).append(entry)
+        words = {}
+        for token, entries in postings.items():
+            known = self._postings.get(token)
+            if known is None:
+                for gram in _token_grams(token):
+                    words.setdefault(gram, []).append(token)
+            else:
+                entries.extend(known)
+            self._postings[token] = CowSortedList(entries)
+            self._owned_words.add(token)
+        for gram, tokens in words.items():
+            tokens.extend(self._vocabulary.get(gram, ()))
+            self._vocabulary[gram] = CowSortedList(tokens)
+            self._owned_grams.add(gram)
+
+    def remove(self, video_id):
+        """Removes a title from the index.
+
+        Args:
+            video_id: The video_id to be removed.
+        """
+        title = self._titles.pop(video_id, None)
+        if title is None:
+            return
+        tokens = tokenize(title)
+        entry = (len(tokens), video_id)
+        for token in set(tokens):
+            if not self._remove_from(self._postings, self._owned_words,
+                                     token, entry):
+                for gram in _token_grams(token):
+                    self._remove_from(self._vocabulary, self._owned_grams,
+                                      gram, token)
+
+    def _expand(self, token):
+        """Returns (similarity, word) for the indexed words like token."""
+        grams = _token_grams(token)
+        shared = {}
+        for gram in grams:
+            for word in self._vocabulary.get(gram, ()):
+                shared[word] = shared.get(word, 0) + 1
+        similar = []
+        for word, count in shared.items():
+            similarity = count / (len(grams) + len(_token_grams(word)) - count)
+            if similarity >= self._min_similarity:
+                similar.append((similarity, word))
+        return heapq.nlargest(self._max_expansions, similar)
+
+    def search(self, query, limit=10, exclude=()):
+        """Returns the best matching video_ids with their scores.
+
+        Args:
+            query: The words to look for, matched case-insensitively.
+            limit: The largest number of results.
+            exclude: A container of video_ids never to return.
+
+        Returns:
+            A list of (score, video_id) pairs, the best first.
+        """
+        tokens = tokenize(query)
+        if not tokens or limit <= 0:
+            return []
+        total = len(self._titles)
+        scores = {}
+        for token in dict.fromkeys(tokens):
+            # The best way each video matches this query word.
+            best = {}
+            for similarity, word in self._expand(token):
+                postings = self._postings[word]
+                weight = similarity * math.log(1 + total / len(postings))
+                for length, video_id in postings.islice(
+                        0, self._max_postings):
+                    score = weight * _LENGTH_SCALE / (_LENGTH_SCALE + length)
+                    if score > best.get(video_id, 0.0):
+                        best[video_id] = score
+            for video_id, score in best.items():
+                scores[video_id] = scores.get(video_id, 0.0) + score
+
+        phrase = " ".join(tokens)
+        titles = self._titles
+        bonus = self._phrase_bonus
+
+        def ranked():
+            for video_id, score in scores.items():
+                if video_id in exclude:
+                    continue
+                if phrase in titles[video_id]:
+                    score += bonus
+                yield score, video_id
+
+        return heapq.nlargest(limit, ranked(), key=lambda item: item[0])
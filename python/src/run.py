@@ -2,13 +2,85 @@
 from .video_player import VideoPlayer
 from .command_parser import CommandException
 from .command_parser import CommandParser
+from .command_metrics import CommandMetrics
+from .output_sink import BufferedSink
+from .output_sink import NullSink
+from .player_session import PlayerSession
+from .playlist_store import PersistentPlaylist
+from .sampling_profiler import SamplingProfiler
+import argparse
+import sys
+import time
 
 
-if __name__ == "__main__":
+class BatchStats:
+    """A class used to collect per-command latencies of a batch run."""
+
+    def __init__(self, metrics=None):
+        """BatchStats constructor.
+
+        Args:
+            metrics: The CommandMetrics the latencies are recorded in.
+                Defaults to a new one.
+        """
+        self.metrics = metrics if metrics is not None else CommandMetrics()
+        self.total_commands = 0
+        self.elapsed = 0.0
+
+    def summary(self):
+        """Returns a printable table of latencies and the throughput."""
+        total = self.total_commands
+        rate = total / self.elapsed if self.elapsed else 0.0
+        return (f"{self.metrics.summary()}\n{total} commands in "
+                f"{self.elapsed:.3f}s ({rate:.0f} commands/s)")
+
+
+def run_batch(command_lines, parser, sink, flush_every=1024):
+    """Executes commands without prompting and returns their BatchStats.
+
+    Output is buffered by sink and written every flush_every commands.
+    Execution stops at EXIT or at the end of command_lines. The latencies
+    go to the CommandMetrics of parser if it has one.
+
+    Args:
+        command_lines: An iterator of command lines. Answers to follow-up
+            questions are read from the same iterator, see main().
+        parser: The CommandParser to execute the commands with.
+        sink: The OutputSink of the VideoPlayer of parser, e.g. a
+            BufferedSink.
+        flush_every: The number of commands between two writes.
+    """
+    stats = BatchStats(parser.metrics)
+    # A parser with metrics records every command itself.
+    record = None if parser.metrics is not None else stats.metrics.record
+    started = time.perf_counter()
+    for line in command_lines:
+        command = line.split()
+        if command and command[0].upper() == "EXIT":
+            break
+        name = command[0].upper() if command else ""
+        begin = time.perf_counter()
+        failed = False
+        try:
+            parser.execute_command(command)
+        except CommandException as e:
+            sink.emit("error", "{message}", message=str(e))
+            failed = True
+        if record is not None:
+            record(name, time.perf_counter() - begin, failed)
+        stats.total_commands += 1
+        if stats.total_commands % flush_every == 0:
+            sink.flush()
+    sink.flush()
+    stats.elapsed = time.perf_counter() - started
+    return stats
+
+
+def run_interactive(session=None, metrics=None, profiler=None):
     print("""Hello and welcome to YouTube, what would you like to do?
     Enter HELP for list of available commands or EXIT to terminate.""")
-    video_player = VideoPlayer()
-    parser = CommandParser(video_player)
+    video_player = VideoPlayer(session=session)
+    parser = CommandParser(video_player, metrics, profiler, allow_files=True)
     while True:
         command = input("YT> ")
         if command.upper() == "EXIT":
@@ -19,3 +91,68 @@ if __name__ == "__main__":
             print(e)
     print("YouTube has now terminated its execution. "
           "Thank you and goodbye!")
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument(
+        "--batch", metavar="FILE",
+        help="execute the commands in FILE ('-' for stdin) without "
+             "prompting and report per-command latency to stderr")
+    arg_parser.add_argument(
+        "--quiet", action="store_true",
+        help="discard the video player output, for benchmarking")
+    arg_parser.add_argument(
+        "--playlist-dir", metavar="DIR",
+        help="keep playlists in DIR so they survive a restart")
+    arg_parser.add_argument(
+        "--metrics", metavar="FILE",
+        help="record per-command metrics, shown by STATS, and write them "
+             "to FILE in the Prometheus text format on exit")
+    arg_parser.add_argument(
+        "--profile", metavar="FILE",
+        help="sample the stacks of every command and write them to FILE "
+             "on exit, as collapsed stacks or, for a .json FILE, in the "
+             "speedscope format")
+    args = arg_parser.parse_args(argv)
+
+    playlists = None
+    if args.playlist_dir:
+        playlists = PersistentPlaylist(args.playlist_dir)
+    metrics = CommandMetrics() if args.metrics else None
+    profiler = None
+    if args.profile:
+        profiler = SamplingProfiler()
+        profiler.start()
+    try:
+        _run(args, PlayerSession(playlists), metrics, profiler)
+    finally:
+        if playlists is not None:
+            playlists.close()
+        if metrics is not None:
+            metrics.write_prometheus(args.metrics)
+        if profiler is not None:
+            profiler.stop()
+            profiler.write(args.profile)
+
+
+def _run(args, session, metrics=None, profiler=None):
+    if args.batch is None:
+        run_interactive(session, metrics, profiler)
+        return
+
+    source = sys.stdin if args.batch == "-" else open(args.batch)
+    with source:
+        command_lines = iter(source)
+        sink = NullSink() if args.quiet else BufferedSink()
+        video_player = VideoPlayer(
+            input_func=lambda: next(command_lines, "").rstrip("\n"),
+            output=sink, session=session)
+        stats = run_batch(command_lines,
+                          CommandParser(video_player, metrics, profiler,
+                                        allow_files=True), sink)
+    print(stats.summary(), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""A sampling profiler class for the commands of a CommandParser."""
+
+from collections import Counter
+import json
+import os
+import sys
+import threading
+
+
+def _frame_name(code):
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class SamplingProfiler:
+    """A class used to sample the stacks of the commands being executed.
+
+    A CommandParser calls enter before a command and exit after it. While
+    the profiler runs, a background thread wakes every interval seconds
+    and records the stack of each thread inside a command, from the
+    parser down, under the name of the command. Nothing is traced, so the
+    commands themselves only pay for the two calls.
+    """
+
+    def __init__(self, interval=0.001):
+        """SamplingProfiler constructor.
+
+        Args:
+            interval: The number of seconds between two samples.
+        """
+        self.interval = interval
+        # Thread id -> (command name, frame of the parser's call).
+        self._active = {}
+        # (command name, tuple of code objects, outermost first) -> count.
+        self._samples = Counter()
+        self._thread = None
+        self._stop = None
+
+    @property
+    def running(self):
+        """Returns True between start and stop."""
+        return self._thread is not None
+
+    def enter(self, name):
+        """Marks the calling thread as executing command name."""
+        self._active[threading.get_ident()] = (name, sys._getframe(1))
+
+    def exit(self):
+        """Marks the calling thread as done with its command."""
+        self._active.pop(threading.get_ident(), None)
+
+    def start(self):
+        """Starts sampling. Samples of an earlier run are kept."""
+        if self._thread is not None:
+            return
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample,
+                                        args=(self._stop,),
+                                        name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops sampling."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def clear(self):
+        """Drops every sample."""
+        self._samples.clear()
+
+    def _sample(self, stop):
+        samples = self._samples
+        while not stop.wait(self.interval):
+            frames = sys._current_frames()
+            for thread_id, (name, root) in list(self._active.items()):
+                frame = frames.get(thread_id)
+                stack = []
+                while frame is not None and frame is not root:
+                    stack.append(frame.f_code)
+                    frame = frame.f_back
+                if frame is None:
+                    # The command finished while we were looking.
+                    continue
+                stack.reverse()
+                samples[name, tuple(stack)] += 1
+
+    def collapsed(self):
+        """Returns the samples as collapsed stacks, one per line.
+
+        Every line is the command name and the frames, outermost first,
+        joined by semicolons, then a space and the number of samples, as
+        read by flamegraph.pl and speedscope.
+        """
+        lines = []
+        # Copied first, since the sampling thread may still be adding.
+        for (name, stack), count in dict(self._samples).items():
+            frames = ";".join([name] + [_frame_name(code) for code in stack])
+            lines.append(f"{frames} {count}")
+        lines.sort()
+        return "".join(line + "\n" for line in lines)
+
+    def speedscope(self):
+        """Returns the samples as a speedscope document.
+
+        Every command gets a profile of its own, so they can be compared.
+        """
+        frames = []
+        frame_indexes = {}
+        profiles = {}
+        for (name, stack), count in dict(self._samples).items():
+            indexes = []
+            for code in stack:
+                index = frame_indexes.get(code)
+                if index is None:
+                    index = frame_indexes[code] = len(frames)
+                    frames.append({"name": code.co_name,
+                                   "file": code.co_filename,
+                                   "line": code.co_firstlineno})
+                indexes.append(index)
+            profile = profiles.setdefault(name, {
+                "type": "sampled", "name": name, "unit": "seconds",
+                "startValue": 0, "endValue": 0,
+                "samples": [], "weights": []})
+            profile["samples"].append(indexes)
+            profile["weights"].append(count * self.interval)
+            profile["endValue"] += count * self.interval
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": "YouTube commands",
+            "exporter": "src.sampling_profiler",
+            "shared": {"frames": frames},
+            "profiles": [profiles[name] for name in sorted(profiles)],
+        }
+
+    def write(self, path):
+        """Writes the samples to path.
+
+        A path ending in .json gets the speedscope format, any other the
+        collapsed stacks.
+        """
+        with open(path, "w") as file:
+            if str(path).endswith(".json"):
+                json.dump(self.speedscope(), file)
+            else:
+                file.write(self.collapsed())
@@ -0,0 +1,161 @@
+"""A line-protocol YouTube server.
+
+Every client connection gets its own VideoPlayer session while all of them
+share one VideoLibrary. Clients send one command per line, exactly as they
+would type it in the REPL, and every response ends with a PROMPT line.
+Commands run on worker threads, so a slow one, such as SHOW_ALL_VIDEOS on a
+large or sharded library, never holds up the other sessions.
+
+Run from the python directory with:
+    python -m src.server --port 8765
+    python -m src.server --unix /tmp/youtube.sock
+    python -m src.server --shards 8
+    python -m src.server --metrics-port 9464
+"""
+
+from .command_parser import CommandException
+from .command_parser import CommandParser
+from .command_metrics import CommandMetrics
+from .output_sink import BufferedSink
+from .sharded_library import ShardedVideoLibrary
+from .video_library import VideoLibrary
+from .video_player import VideoPlayer
+import argparse
+import asyncio
+import logging
+
+PROMPT = "YT> "
+
+logger = logging.getLogger(__name__)
+
+
+class _WriterStream:
+    """Adapts an asyncio StreamWriter to the text stream BufferedSink uses.
+
+    Writes may come from worker threads and are handed to the event loop,
+    which runs them in the order they were made.
+    """
+
+    def __init__(self, writer, loop):
+        self._writer = writer
+        self._loop = loop
+
+    def write(self, text):
+        self._loop.call_soon_threadsafe(self._writer.write, text.encode())
+
+
+class VideoServer:
+    """A class used to serve many player sessions over one library."""
+
+    def __init__(self, library=None, metrics=None):
+        """VideoServer constructor.
+
+        Args:
+            library: The VideoLibrary shared by every session. Defaults to
+                loading a new one.
+            metrics: Optional CommandMetrics shared by every session.
+        """
+        self.library = library if library is not None else VideoLibrary()
+        self.metrics = metrics
+        self.sessions = 0
+
+    def execute_line(self, player, parser, line):
+        """Executes one client line for a session.
+
+        A line answers the session's open search question if there is one,
+        otherwise it is parsed as a command.
+        """
+        if player.awaiting_answer:
+            player.answer_prompt(line.strip())
+            return
+        try:
+            parser.execute_command(line.split())
+        except CommandException as e:
+            player.output.emit("error", "{message}", message=str(e))
+
+    def _run_line(self, player, parser, sink, line):
+        """Executes one client line on a worker thread and flushes its output."""
+        try:
+            self.execute_line(player, parser, line)
+        except Exception:
+            logger.exception("Command failed: %r", line)
+            sink.emit("error", "Internal error")
+        sink.flush()
+
+    async def handle_client(self, reader, writer):
+        """Serves one client connection until EXIT or disconnect."""
+        loop = asyncio.get_running_loop()
+        sink = BufferedSink(_WriterStream(writer, loop))
+        player = VideoPlayer(output=sink, library=self.library,
+                             defer_prompts=True)
+        # Clients are remote: they must not name files on this host.
+        parser = CommandParser(player, self.metrics, allow_files=False)
+        self.sessions += 1
+        try:
+            writer.write(f"Hello and welcome to YouTube, what would you like "
+                         f"to do?\n{PROMPT}\n".encode())
+            await writer.drain()
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                line = line.decode(errors="replace")
+                if line.strip().upper() == "EXIT" and not player.awaiting_answer:
+                    writer.write(b"YouTube has now terminated its execution. "
+                                 b"Thank you and goodbye!\n")
+                    break
+                # The library is safe to share between threads, and every
+                # session runs one line at a time.
+                await loop.run_in_executor(
+                    None, self._run_line, player, parser, sink, line)
+                writer.write(f"{PROMPT}\n".encode())
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.sessions -= 1
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8765, unix_path=None):
+        """Serves clients forever on a TCP port or a Unix socket."""
+        if unix_path is not None:
+            server = await asyncio.start_unix_server(
+                self.handle_client, path=unix_path)
+        else:
+            server = await asyncio.start_server(
+                self.handle_client, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--host", default="127.0.0.1")
+    arg_parser.add_argument("--port", type=int, default=8765)
+    arg_parser.add_argument("--unix", metavar="PATH",
+                            help="listen on a Unix socket instead of TCP")
+    arg_parser.add_argument("--shards", type=int, default=0,
+                            help="split the library across this many "
+                                 "worker processes")
+    arg_parser.add_argument("--metrics-port", type=int,
+                            help="record per-command metrics and serve them "
+                                 "to Prometheus over HTTP on this port")
+    args = arg_parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    library = ShardedVideoLibrary(shards=args.shards) if args.shards else None
+    metrics = None
+    if args.metrics_port is not None:
+        metrics = CommandMetrics()
+        metrics.serve_prometheus(port=args.metrics_port)
+    try:
+        asyncio.run(VideoServer(library, metrics).serve(
+            args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if library is not None:
+            library.close()
+
+
+if __name__ == "__main__":
+    main()
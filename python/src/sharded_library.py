@@ -0,0 +1,355 @@
+"""A video library class partitioned across worker processes."""
+
+from .video_library import VideoLibrary, shard_of
+from .video_library import _RANDOM_ATTEMPTS, _title_key
+from collections.abc import Mapping
+from itertools import islice
+from pathlib import Path
+from types import MappingProxyType
+import heapq
+import multiprocessing
+import random
+import threading
+
+# Videos fetched from a shard per round trip by iter_videos_by_title.
+_PAGE_SIZE = 1024
+
+# The VideoLibrary methods a shard answers.
+_SHARD_METHODS = frozenset({
+    "__len__", "get_video", "get_all_videos", "add_video", "reload",
+    "videos_by_title", "search_titles", "search_ranked", "search_tags",
+    "random_playable_video", "playable_count", "flag_videos",
+    "unflag_videos",
+})
+
+
+def _serve_shard(connection, video_file, shard):
+    """Loads one shard of the catalogue and answers calls until closed."""
+    try:
+        library = VideoLibrary(video_file, ingest_workers=1, shard=shard)
+    except BaseException as e:
+        connection.send((False, e))
+        return
+    connection.send((True, len(library)))
+    while True:
+        try:
+            request = connection.recv()
+        except EOFError:
+            return
+        if request is None:
+            return
+        method, args, kwargs = request
+        try:
+            if method not in _SHARD_METHODS:
+                raise AttributeError(method)
+            connection.send((True, getattr(library, method)(*args, **kwargs)))
+        except Exception as e:
+            connection.send((False, e))
+
+
+class ShardedVideoLibrary:
+    """A class used to represent a Video Library split across processes.
+
+    Videos are hash-partitioned by video_id, see shard_of, and every
+    partition lives in a VideoLibrary of its own worker process, so no
+    process holds the whole catalogue. Lookups go to the owning shard;
+    searches are sent to every shard at once and their title-ordered
+    answers are k-way merged. Every flag is also sent to the shard owning
+    the video, so shards leave flagged videos out of their answers and
+    random draws, and no answer grows with the number of flags.
+
+    It offers the VideoLibrary interface used by VideoPlayer and can be
+    shared between threads.
+    """
+
+    def __init__(self, video_file=None, shards=4):
+        """ShardedVideoLibrary constructor. Starts and loads the workers.
+
+        Args:
+            video_file: The file, directory or glob to load, see
+                VideoLibrary. Defaults to the videos.txt shipped next to
+                the video_library module.
+            shards: The number of worker processes.
+        """
+        if video_file is None:
+            video_file = Path(__file__).parent / "videos.txt"
+        self._connections = []
+        self._locks = []
+        self._workers = []
+        self._write_lock = threading.Lock()
+        self._flagged = MappingProxyType({})
+        self._generation = 0
+        for index in range(shards):
+            connection, child = multiprocessing.Pipe()
+            worker = multiprocessing.Process(
+                target=_serve_shard, args=(child, video_file, (index, shards)),
+                name=f"video-shard-{index}", daemon=True)
+            worker.start()
+            child.close()
+            self._connections.append(connection)
+            self._locks.append(threading.Lock())
+            self._workers.append(worker)
+        try:
+            self._sizes = [self._receive(connection)
+                           for connection in self._connections]
+        except BaseException:
+            self.close()
+            raise
+        # Videos each shard can draw randomly, i.e. not flagged.
+        self._playable_sizes = list(self._sizes)
+
+    @staticmethod
+    def _receive(connection):
+        ok, result = connection.recv()
+        if not ok:
+            raise result
+        return result
+
+    def _call(self, shard, method, *args, **kwargs):
+        """Calls method on one shard and returns its answer."""
+        with self._locks[shard]:
+            self._connections[shard].send((method, args, kwargs))
+            return self._receive(self._connections[shard])
+
+    def _scatter(self, method, *args, **kwargs):
+        """Calls method on every shard in parallel, returning the answers."""
+        # Locks are always taken in shard order, so callers cannot deadlock.
+        for lock in self._locks:
+            lock.acquire()
+        try:
+            for connection in self._connections:
+                connection.send((method, args, kwargs))
+            answers = []
+            error = None
+            for connection in self._connections:
+                # Drain every answer, even after an error, to keep the
+                # pipes in step with their requests.
+                try:
+                    answers.append(self._receive(connection))
+                except Exception as e:
+                    error = error or e
+            if error is not None:
+                raise error
+            return answers
+        finally:
+            for lock in self._locks:
+                lock.release()
+
+    def _gather_by_title(self, answers):
+        """Merges title-ordered shard answers, dropping flagged videos."""
+        flagged = self.flagged
+        return [video for video in heapq.merge(*answers, key=_title_key)
+                if video.video_id not in flagged]
+
+    def close(self):
+        """Stops the worker processes."""
+        for connection, lock in zip(self._connections, self._locks):
+            with lock:
+                try:
+                    connection.send(None)
+                except OSError:
+                    pass
+                connection.close()
+        for worker in self._workers:
+            worker.join()
+        self._connections = []
+        self._locks = []
+        self._workers = []
+
+    def __len__(self):
+        return sum(self._sizes)
+
+    def get_all_videos(self):
+        """Returns all available video information from the video library."""
+        return [video for videos in self._scatter("get_all_videos")
+                for video in videos]
+
+    def get_video(self, video_id):
+        """Returns the Video for video_id from its shard, or None."""
+        return self._call(self._shard_of(video_id), "get_video", video_id)
+
+    def _shard_of(self, video_id):
+        return shard_of(video_id, len(self._connections))
+
+    def add_video(self, video):
+        """Adds a video to its shard, replacing one with the same video_id."""
+        shard = self._shard_of(video.video_id)
+        with self._write_lock:
+            self._call(shard, "add_video", video)
+            self._sizes[shard] = self._call(shard, "__len__")
+            self._playable_sizes[shard] = self._call(shard, "playable_count")
+
+    def reload(self, video_file=None):
+        """Reloads every shard, see VideoLibrary.reload.
+
+        Returns:
+            The "added", "removed" and "changed" counts of all shards.
+        """
+        with self._write_lock:
+            answers = self._scatter("reload", video_file)
+            self._sizes = self._scatter("__len__")
+            self._playable_sizes = self._scatter("playable_count")
+        return {name: sum(counts[name] for counts in answers)
+                for name in ("added", "removed", "changed")}
+
+    def _iter_shard_by_title(self, shard):
+        page = 0
+        while True:
+            videos = self._call(shard, "videos_by_title", page, _PAGE_SIZE)
+            yield from videos
+            if len(videos) < _PAGE_SIZE:
+                return
+            page += 1
+
+    def iter_videos_by_title(self, start=0, stop=None):
+        """Yields videos in title order, fetching each shard page by page.
+
+        Args:
+            start: Position of the first video to yield.
+            stop: Position to stop before. None means the end.
+        """
+        merged = heapq.merge(*(self._iter_shard_by_title(shard)
+                               for shard in range(len(self._connections))),
+                             key=_title_key)
+        yield from islice(merged, start, stop)
+
+    def videos_by_title(self, page, page_size):
+        """Returns one page of videos in title order.
+
+        Args:
+            page: The zero-based page number.
+            page_size: The number of videos per page.
+        """
+        start = page * page_size
+        return list(self.iter_videos_by_title(start, start + page_size))
+
+    def search_titles(self, search_term):
+        """Returns the non-flagged videos whose titles contain search_term.
+
+        Args:
+            search_term: The query, matched case-insensitively.
+
+        Returns:
+            A list of Video objects sorted by title.
+        """
+        return self._gather_by_title(
+            self._scatter("search_titles", search_term))
+
+    def search_ranked(self, query, limit=10, with_scores=False):
+        """Returns the non-flagged videos best matching the words of query.
+
+        Every shard ranks its own non-flagged videos, scoring word rarity
+        within the shard, which hash partitioning keeps close to the
+        global one. The best answers of all shards are then merged.
+
+        Args:
+            query: See VideoLibrary.search_ranked.
+            limit: See VideoLibrary.search_ranked.
+            with_scores: See VideoLibrary.search_ranked.
+        """
+        answers = self._scatter("search_ranked", query, limit,
+                                with_scores=True)
+        ranked = heapq.nlargest(
+            limit, (item for answer in answers for item in answer),
+            key=lambda item: item[0])
+        if with_scores:
+            return ranked
+        return [video for _, video in ranked]
+
+    def search_tags(self, *video_tags, match_all=True):
+        """Returns the non-flagged videos carrying the given tags.
+
+        Args:
+            video_tags: One or more tags, matched case-insensitively.
+            match_all: If True a video must carry every tag (AND),
+                otherwise any one of them is enough (OR).
+
+        Returns:
+            A list of Video objects sorted by title.
+        """
+        return self._gather_by_title(
+            self._scatter("search_tags", *video_tags, match_all=match_all))
+
+    @property
+    def flagged(self) -> Mapping:
+        """Returns a read-only snapshot of the flagged video_ids and reasons."""
+        return self._flagged
+
+    @property
+    def generation(self) -> int:
+        """Returns a counter that changes whenever the flags change."""
+        return self._generation
+
+    def flag_video(self, video_id, reason=""):
+        """Add flagged status to video_id with optional reason"""
+        self.flag_videos({video_id: reason})
+
+    def unflag_video(self, video_id):
+        """Remove flagged status to video_id"""
+        self.unflag_videos([video_id])
+
+    def flag_videos(self, reasons):
+        """Flags many videos at once, see VideoLibrary.flag_videos."""
+        with self._write_lock:
+            flagged = dict(self._flagged)
+            flagged.update(reasons)
+            self._send_flags("flag_videos", reasons)
+            self._publish_flags(flagged)
+
+    def unflag_videos(self, video_ids):
+        """Removes many flags at once, see VideoLibrary.unflag_videos."""
+        with self._write_lock:
+            flagged = dict(self._flagged)
+            for video_id in video_ids:
+                del flagged[video_id]
+            self._send_flags("unflag_videos", dict.fromkeys(video_ids))
+            self._publish_flags(flagged)
+
+    def _send_flags(self, method, reasons):
+        """Passes flag changes on to the owning shards. Needs _write_lock."""
+        by_shard = {}
+        for video_id, reason in reasons.items():
+            by_shard.setdefault(self._shard_of(video_id), {})[video_id] = (
+                reason)
+        for shard, shard_reasons in by_shard.items():
+            if method == "flag_videos":
+                self._call(shard, method, shard_reasons)
+            else:
+                self._call(shard, method, list(shard_reasons))
+            self._playable_sizes[shard] = self._call(shard, "playable_count")
+
+    def _publish_flags(self, flagged):
+        """Makes flagged the mapping seen by readers. Needs _write_lock."""
+        self._flagged = MappingProxyType(flagged)
+        self._generation += 1
+
+    def random_playable_video(self, tag_weights=None, popularity=None):
+        """Returns a random non-flagged video.
+
+        A shard is drawn in proportion to its number of non-flagged videos
+        and asked for one of them, so every video is equally likely. Only
+        the drawn video leaves the shard.
+
+        Args:
+            tag_weights: See VideoLibrary.random_playable_video.
+            popularity: See VideoLibrary.random_playable_video.
+
+        Returns:
+            A Video object, or None if every video is flagged.
+        """
+        sizes = list(self._playable_sizes)
+        video = None
+        for _ in range(_RANDOM_ATTEMPTS):
+            if not any(sizes):
+                break
+            shard = random.choices(range(len(sizes)), sizes)[0]
+            drawn = self._call(shard, "random_playable_video", tag_weights)
+            if drawn is None:
+                # Nothing of this shard carries the tags, try the others.
+                sizes[shard] = 0
+                continue
+            video = drawn
+            if popularity is None or random.random() < popularity(
+                    video.video_id):
+                break
+        return video
@@ -0,0 +1,145 @@
+"""A title search index class."""
+
+from .cow_collections import CowDict, CowSortedList
+
+
+class TitleIndex:
+    """A class used to answer substring queries over video titles.
+
+    Every lowercased title is broken into overlapping n-grams and each
+    n-gram keeps the set of video_ids whose title contains it. A query
+    intersects the postings of its own n-grams and only the few surviving
+    candidates are checked with a real substring test.
+
+    copy is cheap: the copy shares its postings with the original until
+    either of them changes one, so a changed copy can be published while
+    readers keep searching the original.
+    """
+
+    GRAM_SIZE = 3
+
+    def __init__(self):
+        # N-gram -> sorted video_ids of the titles containing it.
+        self._grams = CowDict()
+        self._titles = CowDict()
+        # Titles shorter than GRAM_SIZE produce no n-grams at all.
+        self._short = CowSortedList()
+        # N-grams whose postings this instance is the only one to use.
+        self._owned = set()
+
+    def copy(self):
+        """Returns a copy sharing its postings with this index until written."""
+        clone = TitleIndex.__new__(TitleIndex)
+        clone._grams = self._grams.copy()
+        clone._titles = self._titles.copy()
+        clone._short = self._short.copy()
+        clone._owned = set()
+        self._owned = set()
+        return clone
+
+    def __len__(self):
+        return len(self._titles)
+
+    def _grams_of(self, text):
+        size = self.GRAM_SIZE
+        return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+    def _writable_postings(self, gram):
+        if gram not in self._owned:
+            postings = self._grams.get(gram)
+            self._grams[gram] = (CowSortedList() if postings is None
+                                 else postings.copy())
+            self._owned.add(gram)
+        return self._grams[gram]
+
+    def add(self, video_id, title):
+        """Adds a title to the index, replacing any previous one.
+
+        Args:
+            video_id: The video_id the title belongs to.
+            title: The title of the video.
+        """
+        if video_id in self._titles:
+            self.remove(video_id)
+        text = title.lower()
+        self._titles[video_id] = text
+        grams = self._grams_of(text)
+        if not grams:
+            self._short.add(video_id)
+        for gram in grams:
+            self._writable_postings(gram).add(video_id)
+
+    def add_many(self, titles):
+        """Adds many titles, sorting each posting list only once.
+
+        Args:
+            titles: (video_id, title) pairs of videos not yet indexed.
+        """
+        grams = {}
+        short = []
+        for video_id, title in titles:
+            text = title.lower()
+            self._titles[video_id] = text
+            title_grams = self._grams_of(text)
+            if not title_grams:
+                short.append(video_id)
+            for gram in title_grams:
+                grams.setdefault(gram, []).append(video_id)
+        for gram, video_ids in grams.items():
+            video_ids.extend(self._grams.get(gram, ()))
+            self._grams[gram] = CowSortedList(video_ids)
+            self._owned.add(gram)
+        if short:
+            self._short = CowSortedList(list(self._short) + short)
+
+    def remove(self, video_id):
+        """Removes a title from the index.
+
+        Args:
+            video_id: The video_id to be removed.
+        """
+        text = self._titles.pop(video_id, None)
+        if text is None:
+            return
+        if video_id in self._short:
+            self._short.remove(video_id)
+        for gram in self._grams_of(text):
+            postings = self._writable_postings(gram)
+            postings.remove(video_id)
+            if not postings:
+                del self._grams[gram]
+                self._owned.discard(gram)
+
+    def search(self, term):
+        """Returns the set of video_ids whose titles contain the term.
+
+        Args:
+            term: The search term, matched case-insensitively.
+        """
+        term = term.lower()
+        if not term:
+            return set(self._titles)
+
+        if len(term) < self.GRAM_SIZE:
+            # Any title containing a short term also contains an n-gram
+            # containing it, so scan the (bounded) n-gram vocabulary.
+            candidates = set()
+            for gram, postings in self._grams.items():
+                if term in gram:
+                    candidates.update(postings)
+            candidates.update(self._short)
+        else:
+            postings = []
+            for gram in self._grams_of(term):
+                ids = self._grams.get(gram)
+                if not ids:
+                    return set()
+                postings.append(ids)
+            postings.sort(key=len)
+            others = postings[1:]
+            candidates = [video_id for video_id in postings[0]
+                          if all(video_id in ids for ids in others)]
+
+        titles = self._titles
+        return {video_id for video_id in candidates
+                if term in titles[video_id]}
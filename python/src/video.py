@@ -1,19 +1,28 @@
 """A video class."""
 
 from typing import Sequence
+import sys
 
 
 class Video:
     """A class used to represent a Video."""
 
+    __slots__ = ("_title", "_video_id", "_tags")
+
     def __init__(self, video_title: str, video_id: str, video_tags: Sequence[str]):
         """Video constructor."""
         self._title = video_title
         self._video_id = video_id
 
         # Turn the tags into a tuple here so it's unmodifiable,
-        # in case the caller changes the 'video_tags' they passed to us
-        self._tags = tuple(video_tags)
+        # in case the caller changes the 'video_tags' they passed to us.
+        # Tags are interned since a handful of them are shared by millions
+        # of videos. Interned strings are freed with their last video.
+        self._tags = tuple(sys.intern(tag) for tag in video_tags)
+
+    def __reduce__(self):
+        # Rebuild through the constructor so unpickled tags are interned.
+        return Video, (self._title, self._video_id, self._tags)
 
     @property
     def title(self) -> str:
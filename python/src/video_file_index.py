@@ -0,0 +1,118 @@
+"""A lazily loaded video table class."""
+
+from collections import OrderedDict
+from collections.abc import Mapping
+import mmap
+import os
+import threading
+
+# Bytes read at a time while looking for the end of a row.
+_READ_SIZE = 512
+
+
+class VideoFileIndex(Mapping):
+    """A read-only mapping of video_id to Video backed by videos.txt.
+
+    Opening the file only records the byte offset of every row, keyed by
+    video_id. A Video object is parsed from its row the first time it is
+    requested and kept in a bounded LRU cache, so memory use depends on
+    cache_size rather than on the size of the catalogue.
+
+    Rows are read back through a file descriptor held open, never from a
+    long-lived mapping, so a file shortened in place cannot crash the
+    process. A file changed in place since it was indexed is detected and
+    refused with ValueError; one replaced by a rename keeps being read
+    from the original.
+    """
+
+    def __init__(self, path, parse_line, cache_size=1024):
+        """VideoFileIndex constructor.
+
+        Args:
+            path: The pipe-delimited video file.
+            parse_line: Callable turning one decoded line into a Video.
+            cache_size: The maximum number of Video objects kept alive.
+        """
+        self._fd = None
+        self._path = path
+        self._parse_line = parse_line
+        self._cache_size = cache_size
+        self._cache = OrderedDict()
+        # Guards the cache and the position of the file descriptor.
+        self._lock = threading.Lock()
+        self._offsets = {}
+
+        self._fd = os.open(path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+        stat = os.fstat(self._fd)
+        # What changes when the file is edited in place.
+        self._version = (stat.st_size, stat.st_mtime_ns)
+        if stat.st_size == 0:
+            return
+        with mmap.mmap(self._fd, 0, access=mmap.ACCESS_READ) as data:
+            start = 0
+            end = len(data)
+            while start < end:
+                stop = data.find(b"\n", start)
+                if stop == -1:
+                    stop = end
+                fields = data[start:stop].split(b"|")
+                if len(fields) > 1:
+                    self._offsets[fields[1].strip().decode()] = start
+                start = stop + 1
+
+    def close(self):
+        """Closes the video file. Videos not cached can no longer be read."""
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def __del__(self):
+        self.close()
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __iter__(self):
+        return iter(self._offsets)
+
+    def __contains__(self, video_id):
+        return video_id in self._offsets
+
+    def __getitem__(self, video_id):
+        start = self._offsets[video_id]
+        with self._lock:
+            video = self._cache.get(video_id)
+            if video is not None:
+                self._cache.move_to_end(video_id)
+                return video
+
+            video = self._parse_line(self._read_row(start).decode())
+            if video.video_id != video_id:
+                raise ValueError(f"{self._path} changed since it was indexed")
+            self._cache[video_id] = video
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+            return video
+
+    def _read_row(self, start):
+        """Returns the row starting at byte start. Needs _lock."""
+        stat = os.fstat(self._fd)
+        if (stat.st_size, stat.st_mtime_ns) != self._version:
+            raise ValueError(f"{self._path} changed since it was indexed")
+        os.lseek(self._fd, start, os.SEEK_SET)
+        chunks = []
+        while True:
+            chunk = os.read(self._fd, _READ_SIZE)
+            stop = chunk.find(b"\n")
+            if stop != -1:
+                chunks.append(chunk[:stop])
+                break
+            chunks.append(chunk)
+            if len(chunk) < _READ_SIZE:
+                break
+        return b"".join(chunks)
+
+    @property
+    def cached(self):
+        """Returns the number of Video objects currently materialized."""
+        return len(self._cache)
@@ -1,8 +1,26 @@
 """A video library class."""
 
 from .video import Video
+from .catalogue_ingest import ingest, is_sharded, shard_paths
+from collections.abc import Mapping
+from .cow_collections import CowDict, CowSortedList
+from .ranked_search import RankedTitleIndex
+from .title_index import TitleIndex
+from .video_file_index import VideoFileIndex
+from .video_snapshot import VideoSnapshot, is_fresh
+from functools import partial
 from pathlib import Path
+from types import MappingProxyType
 import csv
+import heapq
+import random
+import logging
+import threading
+import time
+import zlib
+
+
+logger = logging.getLogger(__name__)
 
 
 # Helper Wrapper around CSV reader to strip whitespace from around
@@ -11,27 +29,326 @@ def _csv_reader_with_strip(reader):
     yield from ((item.strip() for item in line) for line in reader)
 
 
+def _video_from_row(row):
+    title, url, tags = row
+    return Video(
+        title,
+        url,
+        [tag.strip() for tag in tags.split(",")] if tags else [],
+    )
+
+
+def shard_of(video_id, shards):
+    """Returns the shard, in range(shards), that owns video_id."""
+    return zlib.crc32(video_id.encode()) % shards
+
+
+def _read_video_file(video_file, shard=None):
+    """Parses a pipe-delimited video file into a dict keyed by video_id.
+
+    Args:
+        video_file: The file to parse.
+        shard: Optional (index, count) pair. Only the rows whose video_id
+            belongs to shard index out of count are kept.
+
+    Returns:
+        The dict and the number of rows kept, which is larger than the
+        dict when a video_id is repeated.
+    """
+    videos = {}
+    rows = 0
+    with open(video_file) as file:
+        reader = _csv_reader_with_strip(csv.reader(file, delimiter="|"))
+        for video_info in reader:
+            if shard is not None:
+                video_info = list(video_info)
+                if shard_of(video_info[1], shard[1]) != shard[0]:
+                    continue
+            video = _video_from_row(video_info)
+            videos[video.video_id] = video
+            rows += 1
+    return videos, rows
+
+
+def _parse_video_line(line):
+    """Parses a single line of the video file into a Video."""
+    reader = _csv_reader_with_strip(csv.reader([line], delimiter="|"))
+    return _video_from_row(next(reader))
+
+
+def _title_key(video):
+    """Sort key used for every title-ordered listing."""
+    return video.title, video.video_id
+
+
+def _normalize_tag(tag):
+    """Key used for the tag posting lists."""
+    return tag.strip().lower()
+
+
+def _intersect_postings(postings):
+    """Yields the keys present in every sorted posting list, in order."""
+    postings = sorted(postings, key=len)
+    smallest, others = postings[0], postings[1:]
+    for key in smallest:
+        if all(key in other for other in others):
+            yield key
+
+
+def _union_postings(postings):
+    """Yields the keys present in any sorted posting list, in order."""
+    last = None
+    for key in heapq.merge(*postings):
+        if key != last:
+            yield key
+            last = key
+
+
+# Draws made by random_playable_video before settling for the last one.
+_RANDOM_ATTEMPTS = 32
+
+
+class _LayeredVideos(Mapping):
+    """The videos of a file-backed mapping plus those added since loading.
+
+    The file-backed mapping, a VideoSnapshot or VideoFileIndex, is never
+    written. Added videos go to a CowDict instead, so every copy of the
+    catalogue keeps its own.
+    """
+
+    __slots__ = ("base", "_added", "_extra")
+
+    def __init__(self, base, added=None, extra=0):
+        self.base = base
+        self._added = CowDict() if added is None else added
+        # The number of added video_ids base does not have.
+        self._extra = extra
+
+    def copy(self):
+        """Returns a copy sharing the added videos until written."""
+        return _LayeredVideos(self.base, self._added.copy(), self._extra)
+
+    def __len__(self):
+        return len(self.base) + self._extra
+
+    def __iter__(self):
+        yield from self.base
+        for video_id in self._added:
+            if video_id not in self.base:
+                yield video_id
+
+    def __contains__(self, video_id):
+        return video_id in self._added or video_id in self.base
+
+    def __getitem__(self, video_id):
+        video = self._added.get(video_id)
+        if video is None:
+            return self.base[video_id]
+        return video
+
+    def __setitem__(self, video_id, video):
+        if video_id not in self:
+            self._extra += 1
+        self._added[video_id] = video
+
+
+class _Catalogue:
+    """The videos of a library and every index over them.
+
+    Readers take a single reference to it, and use only what it holds, so
+    the videos and indexes always agree with each other. Writers change a
+    copy and publish it instead of editing it; the copy shares everything
+    it did not change with the original.
+    """
+
+    __slots__ = ("videos", "by_title", "tag_postings", "title_index",
+                 "ranked_index", "_owned_tags")
+
+    def __init__(self, videos):
+        self.videos = videos
+        # Title keys of every video, kept sorted so listings never re-sort.
+        self.by_title = CowSortedList()
+        # Normalized tag -> title keys, kept sorted by title.
+        self.tag_postings = CowDict()
+        self.title_index = TitleIndex()
+        # Built by the first search_ranked, then kept up to date.
+        self.ranked_index = None
+        # Tags whose postings only this catalogue uses.
+        self._owned_tags = set()
+
+    def build(self):
+        """Indexes every video of a new catalogue, sorting lists only once."""
+        keys = []
+        postings = {}
+        for video in self.videos.values():
+            key = _title_key(video)
+            keys.append(key)
+            for tag in {_normalize_tag(tag) for tag in video.tags}:
+                postings.setdefault(tag, []).append(key)
+        self.by_title = CowSortedList(keys)
+        self.tag_postings = CowDict(
+            (tag, CowSortedList(keys)) for tag, keys in postings.items())
+        self._owned_tags = set(postings)
+        self.title_index.add_many((video.video_id, video.title)
+                                  for video in self.videos.values())
+
+    def copy(self):
+        """Returns a copy sharing everything with this one until written."""
+        clone = _Catalogue(self.videos.copy())
+        clone.by_title = self.by_title.copy()
+        clone.tag_postings = self.tag_postings.copy()
+        clone.title_index = self.title_index.copy()
+        if self.ranked_index is not None:
+            clone.ranked_index = self.ranked_index.copy()
+        self._owned_tags = set()
+        return clone
+
+    def _writable_postings(self, tag):
+        if tag not in self._owned_tags:
+            keys = self.tag_postings.get(tag)
+            self.tag_postings[tag] = (CowSortedList() if keys is None
+                                      else keys.copy())
+            self._owned_tags.add(tag)
+        return self.tag_postings[tag]
+
+    def index(self, video):
+        """Adds video to every index. The catalogue must be unpublished."""
+        key = _title_key(video)
+        self.by_title.add(key)
+        for tag in {_normalize_tag(tag) for tag in video.tags}:
+            self._writable_postings(tag).add(key)
+        self.title_index.add(video.video_id, video.title)
+        if self.ranked_index is not None:
+            self.ranked_index.add(video.video_id, video.title)
+
+    def unindex(self, video):
+        """Drops video from every index. The catalogue must be unpublished."""
+        key = _title_key(video)
+        self.by_title.remove(key)
+        for tag in {_normalize_tag(tag) for tag in video.tags}:
+            keys = self._writable_postings(tag)
+            keys.remove(key)
+            if not keys:
+                del self.tag_postings[tag]
+                self._owned_tags.discard(tag)
+        self.title_index.remove(video.video_id)
+        if self.ranked_index is not None:
+            self.ranked_index.remove(video.video_id)
+
+
 class VideoLibrary:
-    """A class used to represent a Video Library."""
-
-    def __init__(self):
-        """The VideoLibrary class is initialized."""
-        self._videos = {}
-        self._flagged = {}
-        with open(Path(__file__).parent / "videos.txt") as video_file:
-            reader = _csv_reader_with_strip(
-                csv.reader(video_file, delimiter="|"))
-            for video_info in reader:
-                title, url, tags = video_info
-                self._videos[url] = Video(
-                    title,
-                    url,
-                    [tag.strip() for tag in tags.split(",")] if tags else [],
-                )
+    """A class used to represent a Video Library.
+
+    The library is safe to share between threads. Flags are published
+    copy-on-write: readers take the current immutable flagged mapping
+    without locking and keep a consistent view for as long as they hold
+    it, while writers serialize on a lock and swap in a new mapping.
+    reload and add_video publish the catalogue the same way.
+    """
+
+    def __init__(self, video_file=None, lazy=False, cache_size=1024,
+                 use_snapshot=True, flag_store=None, flag_poll_interval=0.1,
+                 ingest_workers=None, shard=None, query_cache=None):
+        """The VideoLibrary class is initialized.
+
+        Args:
+            video_file: The pipe-delimited file to load. Defaults to the
+                videos.txt shipped next to this module. A directory or a
+                glob pattern loads every matching file in parallel, see
+                catalogue_ingest.ingest; lazy and use_snapshot then do not
+                apply.
+            lazy: If True only an offset index of the file is built and
+                Video objects are parsed on demand, see VideoFileIndex.
+                The search indexes are then built on first use.
+            cache_size: The number of parsed videos kept in lazy mode.
+            use_snapshot: If True and a binary snapshot (same name with a
+                .snap suffix) is at least as new as video_file, it is
+                mapped instead of parsing the text, see VideoSnapshot.
+            flag_store: Optional store, e.g. a SqliteFlagStore, the flags
+                are kept in and shared through with other libraries.
+            flag_poll_interval: The minimum number of seconds between two
+                checks of the flag store's generation counter.
+            ingest_workers: The number of processes parsing a directory or
+                glob. None uses one per CPU.
+            shard: Optional (index, count) pair. Only the videos owned by
+                that shard, see shard_of, are loaded; lazy and
+                use_snapshot then do not apply.
+            query_cache: Optional QueryCache the results of search_titles
+                and search_tags are kept in. Flag changes drop only the
+                results showing or hiding the video; catalogue changes
+                drop all of them.
+        """
+        if video_file is None:
+            video_file = Path(__file__).parent / "videos.txt"
+        video_file = Path(video_file)
+        self._video_file = video_file
+        self._lazy = lazy and shard is None and not is_sharded(video_file)
+        self._ingest_workers = ingest_workers
+        self._shard = shard
+        self._query_cache = query_cache
+        # Statistics of the last full parse, see catalogue_ingest.ingest.
+        self.ingest_stats = None
+        self._watcher = None
+        self._write_lock = threading.RLock()
+        self._flagged = MappingProxyType({})
+        # Incremented every time a new flagged mapping is published.
+        self._generation = 0
+        # Dense array of the non-flagged video_ids plus the position of
+        # each one in it, so random picks and removals are O(1).
+        self._playable = []
+        self._playable_positions = {}
+
+        self._flag_store = flag_store
+        self._flag_poll_interval = flag_poll_interval
+        self._next_flag_poll = time.monotonic() + flag_poll_interval
+        if flag_store is not None:
+            self._store_generation, flagged = flag_store.load()
+            self._flagged = MappingProxyType(flagged)
+
+        if shard is not None or is_sharded(video_file):
+            self._catalogue = _Catalogue(CowDict(self._load_source()))
+            self._build_indexes()
+            return
+
+        snapshot_file = video_file.with_suffix(".snap")
+        if use_snapshot and not lazy and is_fresh(snapshot_file, video_file):
+            try:
+                self._catalogue = _Catalogue(
+                    _LayeredVideos(VideoSnapshot(snapshot_file)))
+            except ValueError:
+                pass
+            else:
+                self._indexed = False
+                return
+
+        if lazy:
+            self._catalogue = _Catalogue(_LayeredVideos(VideoFileIndex(
+                video_file, _parse_video_line, cache_size)))
+            self._indexed = False
+            return
+
+        self._catalogue = _Catalogue(CowDict(self._load_source()))
+        self._build_indexes()
+
+    def _load_source(self):
+        """Parses every video file of the library into one dict."""
+        if is_sharded(self._video_file):
+            paths = shard_paths(self._video_file)
+        else:
+            paths = [self._video_file]
+        parse_file = _read_video_file
+        if self._shard is not None:
+            parse_file = partial(_read_video_file, shard=self._shard)
+        videos, self.ingest_stats = ingest(paths, parse_file,
+                                           self._ingest_workers)
+        return videos
+
+    def __len__(self):
+        return len(self._catalogue.videos)
 
     def get_all_videos(self):
         """Returns all available video information from the video library."""
-        return list(self._videos.values())
+        return list(self._catalogue.videos.values())
 
     def get_video(self, video_id):
         """Returns the video object (title, url, tags) from the video library.
@@ -43,17 +360,497 @@ class VideoLibrary:
             The Video object for the requested video_id. None if the video
             does not exist.
         """
-        return self._videos.get(video_id, None)
+        return self._catalogue.videos.get(video_id, None)
+
+    def add_video(self, video):
+        """Adds a video to the library, replacing one with the same video_id.
+
+        Args:
+            video: The Video object to be added.
+        """
+        with self._write_lock:
+            self._ensure_indexed()
+            catalogue = self._catalogue.copy()
+            previous = catalogue.videos.get(video.video_id)
+            if previous is not None:
+                catalogue.unindex(previous)
+            catalogue.videos[video.video_id] = video
+            catalogue.index(video)
+            self._catalogue = catalogue
+            if video.video_id not in self._flagged:
+                self._mark_playable(video.video_id)
+            if self._query_cache is not None:
+                self._query_cache.clear()
+
+    def reload(self, video_file=None):
+        """Re-reads the video file and applies only the rows that changed.
+
+        The file is parsed without holding the lock. The changes are then
+        applied to a copy of the catalogue and its indexes, which is
+        published at once, so readers that already took the old catalogue
+        keep a consistent view of it. Lazy libraries cannot be reloaded:
+        their rows are read back from the file, so the old state is gone
+        once it is rewritten.
+
+        Args:
+            video_file: The file to read from now on. Defaults to the file
+                the library was loaded from.
+
+        Returns:
+            A dict with the number of "added", "removed" and "changed"
+            videos.
+        """
+        if self._lazy:
+            raise ValueError("A lazy library cannot be reloaded")
+        if video_file is not None:
+            self._video_file = Path(video_file)
+        fresh = self._load_source()
+
+        with self._write_lock:
+            self._ensure_indexed()
+            current = self._catalogue
+            removed = [video for video_id, video in current.videos.items()
+                       if video_id not in fresh]
+            added = []
+            changed = []
+            for video_id, video in fresh.items():
+                previous = current.videos.get(video_id)
+                if previous is None:
+                    added.append(video)
+                elif (previous.title != video.title or
+                      tuple(previous.tags) != tuple(video.tags)):
+                    changed.append((previous, video))
+            counts = {"added": len(added), "removed": len(removed),
+                      "changed": len(changed)}
+            if not (added or removed or changed):
+                return counts
+
+            catalogue = current.copy()
+            for video in removed + [old for old, _ in changed]:
+                catalogue.unindex(video)
+            for video in added + [new for _, new in changed]:
+                catalogue.index(video)
+            if isinstance(catalogue.videos, CowDict):
+                for video in removed:
+                    del catalogue.videos[video.video_id]
+                for video in added + [new for _, new in changed]:
+                    catalogue.videos[video.video_id] = video
+            else:
+                # A mapped snapshot cannot drop rows, so the parsed videos
+                # replace it.
+                catalogue.videos = CowDict(fresh)
+
+            self._catalogue = catalogue
+            if self._query_cache is not None:
+                self._query_cache.clear()
+            for video in removed:
+                self._mark_unplayable(video.video_id)
+            for video in added:
+                if video.video_id not in self._flagged:
+                    self._mark_playable(video.video_id)
+            return counts
+
+    def start_watching(self, interval=1.0):
+        """Reloads the video file from a background thread when it changes.
+
+        Args:
+            interval: The number of seconds between two checks of the
+                file's modification time.
+        """
+        if self._lazy:
+            raise ValueError("A lazy library cannot be reloaded")
+        if self._watcher is not None:
+            return
+        stop = threading.Event()
+        last_seen = self._source_mtime()
+        thread = threading.Thread(target=self._watch,
+                                  args=(interval, stop, last_seen),
+                                  name="video-file-watcher", daemon=True)
+        self._watcher = (thread, stop)
+        thread.start()
+
+    def stop_watching(self):
+        """Stops the thread started by start_watching."""
+        if self._watcher is not None:
+            thread, stop = self._watcher
+            self._watcher = None
+            stop.set()
+            thread.join()
+
+    def _watch(self, interval, stop, last_seen):
+        while not stop.wait(interval):
+            try:
+                modified = self._source_mtime()
+                if modified != last_seen:
+                    last_seen = modified
+                    self.reload()
+            except (OSError, ValueError):
+                logger.exception("Could not reload %s", self._video_file)
+
+    def _source_mtime(self):
+        """Returns what changes when any file of the library changes."""
+        if not is_sharded(self._video_file):
+            return self._video_file.stat().st_mtime_ns
+        return tuple((path, path.stat().st_mtime_ns)
+                     for path in shard_paths(self._video_file))
+
+    def _ensure_indexed(self):
+        """Builds the search indexes of a lazily loaded library."""
+        if not self._indexed:
+            with self._write_lock:
+                if not self._indexed:
+                    self._build_indexes()
+
+    def _build_indexes(self):
+        """Publishes a fully indexed catalogue of the loaded videos."""
+        catalogue = _Catalogue(self._catalogue.videos)
+        catalogue.build()
+        for video_id in catalogue.videos:
+            if video_id not in self._flagged:
+                self._mark_playable(video_id)
+        self._catalogue = catalogue
+        self._indexed = True
+
+    def iter_videos_by_title(self, start=0, stop=None):
+        """Yields videos in title order without copying the catalogue.
+
+        Args:
+            start: Position of the first video to yield.
+            stop: Position to stop before. None means the end.
+        """
+        self._ensure_indexed()
+        catalogue = self._catalogue
+        videos = catalogue.videos
+        for _, video_id in catalogue.by_title.islice(start, stop):
+            yield videos[video_id]
+
+    def videos_by_title(self, page, page_size):
+        """Returns one page of videos in title order.
+
+        Args:
+            page: The zero-based page number.
+            page_size: The number of videos per page.
+        """
+        start = page * page_size
+        return list(self.iter_videos_by_title(start, start + page_size))
+
+    def videos_in_title_range(self, first, last):
+        """Returns the videos with first <= title < last, in title order.
+
+        Args:
+            first: The lower bound, inclusive.
+            last: The upper bound, exclusive.
+        """
+        self._ensure_indexed()
+        catalogue = self._catalogue
+        keys = catalogue.by_title
+        start = keys.bisect_left((first,))
+        stop = keys.bisect_left((last,))
+        return [catalogue.videos[video_id]
+                for _, video_id in keys.islice(start, stop)]
+
+    def search_titles(self, search_term):
+        """Returns the non-flagged videos whose titles contain search_term.
+
+        Args:
+            search_term: The query, matched case-insensitively.
+
+        Returns:
+            A list of Video objects sorted by title.
+        """
+        self._ensure_indexed()
+        cache = self._query_cache
+        if cache is not None:
+            epoch = cache.epoch
+        # Read before the cache, since reading polls the flag store and
+        # that drops the entries other processes' flags made stale.
+        flagged = self.flagged
+        if cache is not None:
+            key = ("titles", search_term.lower())
+            cached = cache.get(key)
+            if cached is not None:
+                return list(cached)
+        catalogue = self._catalogue
+        videos = catalogue.videos
+        found = list(catalogue.title_index.search(search_term))
+        shown = {video_id for video_id in found if video_id not in flagged}
+        keys = catalogue.by_title
+        if len(shown) * len(shown).bit_length() > len(keys):
+            # Sorting would cost more than filtering the title order.
+            matched = [videos[video_id] for _, video_id in keys
+                       if video_id in shown]
+        else:
+            matched = [videos[video_id] for _, video_id in
+                       sorted(_title_key(videos[video_id])
+                              for video_id in shown)]
+        if cache is not None:
+            # Flagged matches are dependencies too: unflagging shows them.
+            cache.put(key, tuple(matched), found, epoch)
+        return matched
+
+    def search_ranked(self, query, limit=10, with_scores=False):
+        """Returns the non-flagged videos best matching the words of query.
+
+        Unlike search_titles, words may appear in any order and with
+        typos, and only the limit most relevant videos are returned, see
+        RankedTitleIndex.
+
+        Args:
+            query: The words to look for, matched case-insensitively.
+            limit: The largest number of videos returned.
+            with_scores: If True (score, Video) pairs are returned instead.
+
+        Returns:
+            A list of Video objects, the most relevant first.
+        """
+        self._ensure_indexed()
+        catalogue = self._catalogue
+        if catalogue.ranked_index is None:
+            with self._write_lock:
+                catalogue = self._catalogue
+                if catalogue.ranked_index is None:
+                    index = RankedTitleIndex()
+                    index.add_many((video.video_id, video.title) for video
+                                   in catalogue.videos.values())
+                    # Published whole: readers of this catalogue either
+                    # see no index or a complete one.
+                    catalogue.ranked_index = index
+        videos = catalogue.videos
+        ranked = [(score, videos[video_id]) for score, video_id in
+                  catalogue.ranked_index.search(query, limit, self.flagged)]
+        if with_scores:
+            return ranked
+        return [video for _, video in ranked]
+
+    def search_tags(self, *video_tags, match_all=True):
+        """Returns the non-flagged videos carrying the given tags.
+
+        Args:
+            video_tags: One or more tags, matched case-insensitively.
+            match_all: If True a video must carry every tag (AND),
+                otherwise any one of them is enough (OR).
+
+        Returns:
+            A list of Video objects sorted by title.
+        """
+        self._ensure_indexed()
+        cache = self._query_cache
+        if cache is not None:
+            epoch = cache.epoch
+        # Read before the cache, see search_titles.
+        flagged = self.flagged
+        if cache is not None:
+            key = ("tags", tuple(_normalize_tag(tag) for tag in video_tags),
+                   match_all)
+            cached = cache.get(key)
+            if cached is not None:
+                return list(cached)
+        catalogue = self._catalogue
+        postings = [catalogue.tag_postings.get(_normalize_tag(tag), [])
+                    for tag in video_tags]
+        if not postings:
+            return []
+        if match_all:
+            keys = _intersect_postings(postings)
+        else:
+            keys = _union_postings(postings)
+
+        videos = catalogue.videos
+        found = [video_id for _, video_id in keys]
+        matched = [videos[video_id] for video_id in found
+                   if video_id not in flagged]
+        if cache is not None:
+            cache.put(key, tuple(matched), found, epoch)
+        return matched
 
     @property
-    def flagged(self) -> dict:
-        """Returns a dictionary of flagged video_ids"""
+    def flagged(self) -> Mapping:
+        """Returns a read-only snapshot of the flagged video_ids and reasons.
+
+        The snapshot never changes; flag_video and unflag_video publish a
+        new one instead. With a flag store, changes made by other libraries
+        are picked up once its generation counter is seen to move.
+        """
+        if (self._flag_store is not None and
+                time.monotonic() >= self._next_flag_poll):
+            self._next_flag_poll = time.monotonic() + self._flag_poll_interval
+            if self._flag_store.generation() != self._store_generation:
+                with self._write_lock:
+                    self._reload_flags()
         return self._flagged
 
+    @property
+    def generation(self) -> int:
+        """Returns a counter that changes whenever the flags change."""
+        return self._generation
+
     def flag_video(self, video_id, reason=""):
         """Add flagged status to video_id with optional reason"""
-        self._flagged[video_id] = reason
+        with self._write_lock:
+            if self._flag_store is not None:
+                self._flag_store.flag(video_id, reason)
+                self._reload_flags()
+                return
+            flagged = dict(self._flagged)
+            flagged[video_id] = reason
+            self._publish_flags(flagged)
+            self._mark_unplayable(video_id)
 
     def unflag_video(self, video_id):
         """Remove flagged status to video_id"""
-        self._flagged.pop(video_id)
+        with self._write_lock:
+            if self._flag_store is not None:
+                self._flag_store.unflag(video_id)
+                self._reload_flags()
+                return
+            flagged = dict(self._flagged)
+            flagged.pop(video_id)
+            self._publish_flags(flagged)
+            if video_id in self._catalogue.videos:
+                self._mark_playable(video_id)
+
+    def flag_videos(self, reasons):
+        """Flags many videos at once, publishing the flags a single time.
+
+        Args:
+            reasons: A mapping of video_id to flag reason.
+        """
+        with self._write_lock:
+            if self._flag_store is not None:
+                self._flag_store.flag_many(reasons)
+                self._reload_flags()
+                return
+            flagged = dict(self._flagged)
+            flagged.update(reasons)
+            self._publish_flags(flagged)
+            for video_id in reasons:
+                self._mark_unplayable(video_id)
+
+    def unflag_videos(self, video_ids):
+        """Removes the flags of many videos at once.
+
+        Raises KeyError, and changes nothing, if one of them is not
+        flagged.
+
+        Args:
+            video_ids: The video_ids to be allowed again.
+        """
+        with self._write_lock:
+            if self._flag_store is not None:
+                self._flag_store.unflag_many(video_ids)
+                self._reload_flags()
+                return
+            flagged = dict(self._flagged)
+            for video_id in video_ids:
+                del flagged[video_id]
+            self._publish_flags(flagged)
+            for video_id in video_ids:
+                if video_id in self._catalogue.videos:
+                    self._mark_playable(video_id)
+
+    def _publish_flags(self, flagged):
+        """Makes flagged the mapping seen by readers. Needs _write_lock."""
+        previous = self._flagged
+        self._flagged = MappingProxyType(flagged)
+        self._generation += 1
+        # Only after publishing, so a search cannot cache the old flags
+        # once the invalidation is done.
+        if self._query_cache is not None:
+            for video_id in previous.keys() ^ flagged.keys():
+                self._query_cache.invalidate_video(video_id)
+
+    def _reload_flags(self):
+        """Publishes the flag store's flags. Needs _write_lock."""
+        self._store_generation, flagged = self._flag_store.load()
+        previous = self._flagged
+        for video_id in previous:
+            if video_id not in flagged and video_id in self._catalogue.videos:
+                self._mark_playable(video_id)
+        for video_id in flagged:
+            if video_id not in previous:
+                self._mark_unplayable(video_id)
+        self._publish_flags(flagged)
+
+    def _mark_playable(self, video_id):
+        if video_id not in self._playable_positions:
+            self._playable_positions[video_id] = len(self._playable)
+            self._playable.append(video_id)
+
+    def _mark_unplayable(self, video_id):
+        # Move the last video_id into the freed slot instead of shifting.
+        position = self._playable_positions.pop(video_id, None)
+        if position is None:
+            return
+        last = self._playable.pop()
+        if last != video_id:
+            self._playable[position] = last
+            self._playable_positions[last] = position
+
+    def playable_count(self):
+        """Returns the number of videos random_playable_video draws from."""
+        self._ensure_indexed()
+        return len(self._playable)
+
+    def random_playable_video(self, tag_weights=None, popularity=None):
+        """Returns a random non-flagged video in O(1) expected time.
+
+        Args:
+            tag_weights: Optional mapping of tag to weight. A tag is first
+                drawn by weight, then a video carrying it uniformly.
+            popularity: Optional callable returning, for a video_id, the
+                probability in [0, 1] of keeping a uniform draw. Draws are
+                repeated until one is kept or a retry limit is reached.
+
+        Returns:
+            A Video object, or None if every video is flagged.
+        """
+        self._ensure_indexed()
+        catalogue = self._catalogue
+        if tag_weights:
+            return self._random_tagged_video(catalogue, tag_weights)
+        for _ in range(_RANDOM_ATTEMPTS):
+            video_id = self._random_playable_id(catalogue.videos)
+            if video_id is None:
+                return None
+            if popularity is None or random.random() < popularity(video_id):
+                return catalogue.videos[video_id]
+        return catalogue.videos[video_id]
+
+    def _random_playable_id(self, videos):
+        while True:
+            playable = self._playable
+            if not playable:
+                return None
+            try:
+                video_id = playable[random.randrange(len(playable))]
+            except (IndexError, ValueError):
+                # A concurrent flag shrank the array under us, try again.
+                continue
+            # Also skip videos a concurrent reload is adding or removing.
+            if video_id not in self.flagged and video_id in videos:
+                return video_id
+
+    def _random_tagged_video(self, catalogue, tag_weights):
+        postings = []
+        weights = []
+        for tag, weight in tag_weights.items():
+            keys = catalogue.tag_postings.get(_normalize_tag(tag))
+            if keys and weight > 0:
+                postings.append(keys)
+                weights.append(weight)
+        if not postings:
+            return None
+
+        flagged = self.flagged
+        for _ in range(_RANDOM_ATTEMPTS):
+            keys = random.choices(postings, weights)[0]
+            _, video_id = random.choice(keys)
+            if video_id not in flagged:
+                return catalogue.videos[video_id]
+
+        # Mostly flagged tags: fall back to drawing among what is left.
+        candidates = [video_id for _, video_id in _union_postings(postings)
+                      if video_id not in flagged]
+        if not candidates:
+            return None
+        return catalogue.videos[random.choice(candidates)]
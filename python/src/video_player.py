@@ -2,40 +2,107 @@
 
 from os import putenv
 from .video_library import VideoLibrary
-from .video_playlist import Playlist
-import random
+from .player_session import PlayerSession
+from .output_sink import StdoutSink
+
+# Templates shared by every message that lists a video.
+_VIDEO_LINE = " {title} ({video_id}) [{tags}]"
+_FLAGGED = " - FLAGGED (reason: {reason})"
+
 
 class VideoPlayer:
     """A class used to represent a Video Player."""
 
-    def __init__(self):
-        self.video_library = VideoLibrary()
-        self.video_playlist = Playlist()
-        self.current_video = None
-        self.isPlaying = False
-        self.isPaused = False
+    __slots__ = ("input_func", "output", "video_library", "session",
+                 "defer_prompts")
+
+    def __init__(self, input_func=None, output=None, library=None,
+                 session=None, defer_prompts=False):
+        """VideoPlayer constructor.
+
+        Args:
+            input_func: Callable returning the answer to a follow-up
+                question. Defaults to reading stdin with input().
+            output: The OutputSink messages are emitted to. Defaults to a
+                StdoutSink.
+            library: The VideoLibrary to play from, possibly shared with
+                other players. Defaults to loading a new one.
+            session: The PlayerSession holding the playback state and
+                playlists. Defaults to a new, empty one.
+            defer_prompts: If True searches never block for an answer, see
+                answer_prompt.
+        """
+        self.input_func = input_func
+        self.output = output or StdoutSink()
+        self.video_library = library if library is not None else VideoLibrary()
+        self.session = session or PlayerSession()
+        self.defer_prompts = defer_prompts
+
+    def new_session(self, input_func=None, output=None, defer_prompts=False):
+        """Returns a player for a new user sharing this player's library.
+
+        Args:
+            input_func: See VideoPlayer.
+            output: See VideoPlayer.
+            defer_prompts: See VideoPlayer.
+        """
+        return VideoPlayer(input_func, output, self.video_library,
+                           defer_prompts=defer_prompts)
+
+    @property
+    def video_playlist(self):
+        """Returns the playlists of this player's session."""
+        return self.session.playlists
+
+    @property
+    def current_video(self):
+        """Returns the video of this player's session, or None."""
+        return self.session.current_video
+
+    @current_video.setter
+    def current_video(self, video):
+        self.session.current_video = video
+
+    @property
+    def isPlaying(self):
+        """Returns True if this player's session is playing a video."""
+        return self.session.is_playing
+
+    @isPlaying.setter
+    def isPlaying(self, value):
+        self.session.is_playing = value
+
+    @property
+    def isPaused(self):
+        """Returns True if this player's session is paused."""
+        return self.session.is_paused
+
+    @isPaused.setter
+    def isPaused(self, value):
+        self.session.is_paused = value
 
     def number_of_videos(self):
     
-        num_videos = len(self.video_library.get_all_videos())
-        print(f"{num_videos} videos in the library")
+        num_videos = len(self.video_library)
+        self.output.emit("video_count", "{count} videos in the library",
+                         count=num_videos)
 
     
     def show_all_videos(self):
         """Returns all videos."""
 
-        videos = self.video_library.get_all_videos()
-        videos.sort(key=lambda x:x.title)
         flagged = self.video_library.flagged
+        emit = self.output.emit
         
-        print("Here's a list of all available videos: ")
-        for video in videos:
-            tag = " ".join(video.tags)
-            output = f" {video.title} ({video.video_id}) [{tag}]"
+        emit("video_list", "Here's a list of all available videos: ")
+        for video in self.video_library.iter_videos_by_title():
             if video.video_id in flagged:
-                id = video.video_id
-                output = output + f" - FLAGGED (reason: {flagged[id] if flagged[id] else 'Not supplied'})"
-            print(output)
+                emit("video", _VIDEO_LINE + _FLAGGED, title=video.title,
+                     video_id=video.video_id, tags=video.tags,
+                     reason=flagged[video.video_id] or 'Not supplied')
+            else:
+                emit("video", _VIDEO_LINE, title=video.title,
+                     video_id=video.video_id, tags=video.tags)
 
 
     def play_video(self, video_id):
@@ -49,15 +116,16 @@ class VideoPlayer:
         flagged = self.video_library.flagged
         
         if video is None:
-            print("Cannot play video: Video does not exist")       
+            self.output.emit("error", "Cannot play video: Video does not exist")       
         elif video_id in flagged:
-                print(f"Cannot play video: Video is currently flagged (reason: {flagged[video_id] if flagged[video_id] else 'Not supplied'})")
+                self.output.emit("error", "Cannot play video: Video is currently flagged (reason: {reason})",
+                                 reason=flagged[video_id] or 'Not supplied')
         else:
             if self.isPlaying:
-                print(f"Stopping video: {self.current_video.title}")
+                self.output.emit("stopping", "Stopping video: {title}", title=self.current_video.title)
                 self.isPaused = False
             
-            print(f"Playing video: {video.title}")
+            self.output.emit("playing", "Playing video: {title}", title=video.title)
             self.isPlaying = True
             self.current_video = video
 
@@ -66,29 +134,27 @@ class VideoPlayer:
         """Stops the current video."""
 
         if self.isPlaying is True:
-            print(f"Stopping video: {self.current_video.title}")
+            self.output.emit("stopping", "Stopping video: {title}", title=self.current_video.title)
             self.isPlaying = False
             self.isPaused = False
             self.current_video = None
         else:
-            print("Cannot stop video: No video is currently playing")
+            self.output.emit("error", "Cannot stop video: No video is currently playing")
 
 
     def play_random_video(self):
         """Plays a random video from the video library."""
 
-        videos = list(filter(lambda x: (x.video_id not in self.video_library.flagged),self.video_library.get_all_videos()))
-        number_of_videos = len(videos)
+        pick_video = self.video_library.random_playable_video()
         
-        if number_of_videos < 1:
-            print("No videos available")
+        if pick_video is None:
+            self.output.emit("error", "No videos available")
         else:
             if self.isPlaying is True:
-                print(f"Stopping video: {self.current_video.title}")
+                self.output.emit("stopping", "Stopping video: {title}", title=self.current_video.title)
                 self.isPaused = False
         
-            pick_video = random.choice(videos)
-            print(f"Playing video: {pick_video.title}")
+            self.output.emit("playing", "Playing video: {title}", title=pick_video.title)
             self.isPlaying = True
             self.current_video = pick_video
 
@@ -97,11 +163,11 @@ class VideoPlayer:
         """Pauses the current video."""
 
         if self.isPaused:
-            print(f"Video already paused: {self.current_video.title}")
+            self.output.emit("error", "Video already paused: {title}", title=self.current_video.title)
         elif self.current_video is None:
-            print("Cannot pause video: No video is currently playing")
+            self.output.emit("error", "Cannot pause video: No video is currently playing")
         else:
-            print(f"Pausing video: {self.current_video.title}")
+            self.output.emit("pausing", "Pausing video: {title}", title=self.current_video.title)
             self.isPaused = True
             
 
@@ -110,27 +176,29 @@ class VideoPlayer:
 
         if self.current_video is not None:
             if not self.isPaused:
-                print(f"Cannot continue video: Video is not paused")
+                self.output.emit("error", "Cannot continue video: Video is not paused")
             else:
-                print(f"Continuing video: {self.current_video.title}")
+                self.output.emit("continuing", "Continuing video: {title}", title=self.current_video.title)
         else:
-            print("Cannot continue video: No video is currently playing")
+            self.output.emit("error", "Cannot continue video: No video is currently playing")
 
 
     def show_playing(self):
         """Displays video currently playing."""
 
         if self.current_video == None:
-            print("No video is currently playing")
+            self.output.emit("error", "No video is currently playing")
         else:
-            tag = " ".join(self.current_video.tags)
-            output = f"Currently playing: {self.current_video.title} ({self.current_video.video_id}) [{tag}]"
+            video = self.current_video
+            template = "Currently playing:" + _VIDEO_LINE
             if self.isPaused == False:
-                print(output)
+                self.output.emit("now_playing", template, title=video.title,
+                                 video_id=video.video_id, tags=video.tags)
             elif self.isPaused == True:
-                print(f"{output} - PAUSED")
+                self.output.emit("now_playing", template + " - PAUSED", title=video.title,
+                                 video_id=video.video_id, tags=video.tags)
             else:
-                print("No video is currently playing")
+                self.output.emit("error", "No video is currently playing")
 
 
     def create_playlist(self, playlist_name):
@@ -143,10 +211,10 @@ class VideoPlayer:
         playlists = self.video_playlist.playlist
         
         if playlist_name.lower() in playlists:
-            print("Cannot create playlist: A playlist with the same name already exists")
+            self.output.emit("error", "Cannot create playlist: A playlist with the same name already exists")
         else:
             self.video_playlist.create_playlist(playlist_name)
-            print(f"Successfully created new playlist: {playlist_name}")
+            self.output.emit("playlist_created", "Successfully created new playlist: {name}", name=playlist_name)
 
 
     def add_to_playlist(self, playlist_name, video_id):
@@ -162,16 +230,63 @@ class VideoPlayer:
         flagged = self.video_library.flagged
         
         if playlist_name.lower() not in playlists:
-            print(f"Cannot add video to {playlist_name}: Playlist does not exist")
+            self.output.emit("error", "Cannot add video to {name}: Playlist does not exist", name=playlist_name)
         elif video is None:
-            print(f"Cannot add video to {playlist_name}: Video does not exist")
+            self.output.emit("error", "Cannot add video to {name}: Video does not exist", name=playlist_name)
         elif video_id in flagged:
-            print(f"Cannot add video to {playlist_name}: Video is currently flagged (reason: {flagged[video_id] if flagged[video_id] else 'Not supplied'})")
+            self.output.emit("error", "Cannot add video to {name}: Video is currently flagged (reason: {reason})",
+                             name=playlist_name, reason=flagged[video_id] or 'Not supplied')
         elif video_id in playlists[playlist_name.lower()]["videos"]:
-            print(f"Cannot add video to {playlist_name}: Video already added")
+            self.output.emit("error", "Cannot add video to {name}: Video already added", name=playlist_name)
         else:
             self.video_playlist.add_to_playlist(playlist_name.lower(), video_id)
-            print(f"Added video to {playlist_name}: {video.title}")
+            self.output.emit("playlist_added", "Added video to {name}: {title}", name=playlist_name, title=video.title)
+
+
+    def add_many_to_playlist(self, playlist_name, video_ids, all_or_nothing=False):
+        """Adds many videos to a playlist with a given name.
+
+        Every video is validated first, then the valid ones are added in
+        a single operation.
+
+        Args:
+            playlist_name: The playlist name.
+            video_ids: The video_ids to be added, in order.
+            all_or_nothing: If True nothing is added unless every video
+                is valid.
+
+        Returns:
+            A list of (video_id, error) pairs in the order of video_ids,
+            error being None for the videos added.
+        """
+
+        playlist = self.video_playlist.playlist.get(playlist_name.lower())
+        if playlist is None:
+            self.output.emit("error", "Cannot add videos to {name}: Playlist does not exist", name=playlist_name)
+            return [(video_id, "Playlist does not exist") for video_id in video_ids]
+
+        library = self.video_library
+        flagged = library.flagged
+        present = playlist["videos"]
+        added = {}
+        results = []
+        for video_id in video_ids:
+            if library.get_video(video_id) is None:
+                error = "Video does not exist"
+            elif video_id in flagged:
+                error = f"Video is currently flagged (reason: {flagged[video_id] or 'Not supplied'})"
+            elif video_id in present or video_id in added:
+                error = "Video already added"
+            else:
+                error = None
+                added[video_id] = None
+            results.append((video_id, error))
+        self._apply_batch(results, all_or_nothing,
+                          lambda: self.video_playlist.add_many_to_playlist(playlist_name, added),
+                          "Cannot add {video_id} to {name}: {reason}",
+                          "playlist_added_many", "Added {count} of {total} videos to {name}",
+                          name=playlist_name)
+        return results
 
 
     def show_all_playlists(self):
@@ -181,11 +296,11 @@ class VideoPlayer:
         playlists.sort(key=lambda x: x["name"])
 
         if len(playlists) <= 0:
-            print("No playlists exist yet")
+            self.output.emit("playlist_list", "No playlists exist yet")
         else:
-            print("Showing all playlists:")
+            self.output.emit("playlist_list", "Showing all playlists:")
             for playlist in playlists:
-                print(playlist["name"])
+                self.output.emit("playlist", "{name}", name=playlist["name"])
 
 
     def show_playlist(self, playlist_name):
@@ -198,18 +313,21 @@ class VideoPlayer:
         flagged = self.video_library.flagged
 
         if playlist_name.lower() not in playlists:
-            print(f"Cannot show playlist {playlist_name}: Playlist does not exist")
+            self.output.emit("error", "Cannot show playlist {name}: Playlist does not exist", name=playlist_name)
         else:    
-            print(f"Showing playlist: {playlist_name}")
+            self.output.emit("playlist_videos", "Showing playlist: {name}", name=playlist_name)
             if len(playlists[playlist_name.lower()]["videos"]) <= 0:
-                print("No videos here yet")
+                self.output.emit("playlist_empty", "No videos here yet")
             else:
                 for video_id in playlists[playlist_name.lower()]["videos"]:
                     video = self.video_library.get_video(video_id)
-                    output = f" {video.title} ({video.video_id}) [{' '.join(video.tags)}]"
                     if video_id in flagged:
-                        output = output + f" - FLAGGED (reason: {flagged[video_id] if flagged[video_id] else 'Not supplied'})"
-                    print(output)
+                        self.output.emit("video", _VIDEO_LINE + _FLAGGED, title=video.title,
+                                         video_id=video.video_id, tags=video.tags,
+                                         reason=flagged[video_id] or 'Not supplied')
+                    else:
+                        self.output.emit("video", _VIDEO_LINE, title=video.title,
+                                         video_id=video.video_id, tags=video.tags)
 
 
     def remove_from_playlist(self, playlist_name, video_id):
@@ -224,14 +342,14 @@ class VideoPlayer:
         video = self.video_library.get_video(video_id)
         
         if playlist_name.lower() not in playlists:
-            print(f"Cannot remove video from {playlist_name}: Playlist does not exist")
+            self.output.emit("error", "Cannot remove video from {name}: Playlist does not exist", name=playlist_name)
         elif video is None:
-            print(f"Cannot remove video from {playlist_name}: Video does not exist")
+            self.output.emit("error", "Cannot remove video from {name}: Video does not exist", name=playlist_name)
         elif video_id not in playlists[playlist_name.lower()]["videos"]:
-            print(f"Cannot remove video from {playlist_name}: Video is not in playlist")
+            self.output.emit("error", "Cannot remove video from {name}: Video is not in playlist", name=playlist_name)
         else:
             self.video_playlist.remove_from_playlist(playlist_name.lower(), video_id)
-            print(f"Removed video from {playlist_name}: {video.title}")
+            self.output.emit("playlist_removed", "Removed video from {name}: {title}", name=playlist_name, title=video.title)
 
 
     def clear_playlist(self, playlist_name):
@@ -244,10 +362,10 @@ class VideoPlayer:
         playlists = self.video_playlist.playlist
 
         if playlist_name.lower() not in playlists:
-            print(f"Cannot clear playlist {playlist_name}: Playlist does not exist")
+            self.output.emit("error", "Cannot clear playlist {name}: Playlist does not exist", name=playlist_name)
         else:
             self.video_playlist.clear_playlist(playlist_name.lower())
-            print(f"Successfully removed all videos from {playlist_name}")
+            self.output.emit("playlist_cleared", "Successfully removed all videos from {name}", name=playlist_name)
 
 
     def delete_playlist(self, playlist_name):
@@ -260,10 +378,10 @@ class VideoPlayer:
         playlists = self.video_playlist.playlist
 
         if playlist_name.lower() not in playlists:
-            print(f"Cannot delete playlist {playlist_name}: Playlist does not exist")
+            self.output.emit("error", "Cannot delete playlist {name}: Playlist does not exist", name=playlist_name)
         else:
             self.video_playlist.delete_playlist(playlist_name.lower())
-            print(f"Deleted playlist: {playlist_name}")
+            self.output.emit("playlist_deleted", "Deleted playlist: {name}", name=playlist_name)
     
 
     def search_videos(self, search_term):
@@ -273,29 +391,20 @@ class VideoPlayer:
             search_term: The query to be used in search.
         """
         
-        videos = list(filter(lambda x: (x.video_id not in self.video_library.flagged),self.video_library.get_all_videos()))
-        videos.sort(key=lambda x: x.title)
-        matched = []
+        matched = self.video_library.search_titles(search_term.strip())
+        self._show_search_results(search_term, matched)
 
-        for video in videos:
-            if search_term.strip().lower() in video.title.lower():
-                matched.append(video)
+    def search_videos_ranked(self, search_term, limit=10):
+        """Display the videos best matching the words of search_term.
 
-        if len(matched) < 1:
-            print(f"No search results for {search_term}")
-        else:
-            print(f"Here are the results for {search_term}:")
-            for i, video in enumerate(matched):
-                print(f"{i + 1}) {video.title} ({video.video_id}) [{' '.join(video.tags)}]")
-            print("Would you like to play any of the above? If yes, specify the number of the video.")
-            print("If your answer is not a valid number, we will assume it's a no.")
-            try:
-                x = int(input())
-                if x < 1 or x > len(matched):
-                    raise ValueError()
-            except ValueError:
-                return
-            self.play_video(matched[int(x) - 1].video_id)
+        Args:
+            search_term: The words to look for, in any order and with
+                typos tolerated.
+            limit: The largest number of videos displayed.
+        """
+
+        matched = self.video_library.search_ranked(search_term.strip(), limit)
+        self._show_search_results(search_term, matched)
             
 
     def search_videos_tag(self, video_tag):
@@ -305,29 +414,60 @@ class VideoPlayer:
             video_tag: The video tag to be used in search.
         """
         
-        videos = list(filter(lambda x: (x.video_id not in self.video_library.flagged),self.video_library.get_all_videos()))
-        videos.sort(key=lambda x: x.title)
-        matched = []
-
-        for video in videos:
-            if video_tag.strip().lower() in video.tags:
-                matched.append(video)
+        matched = self.video_library.search_tags(video_tag)
+        self._show_search_results(video_tag, matched)
 
+    def _show_search_results(self, query, matched):
+        """Lists the matched videos and asks which one should be played."""
         if len(matched) < 1:
-            print(f"No search results for {video_tag}")
+            self.output.emit("no_results", "No search results for {query}", query=query)
         else:
-            print(f"Here are the results for {video_tag}:")
+            self.output.emit("results", "Here are the results for {query}:", query=query)
             for i, video in enumerate(matched):
-                print(f"{i + 1}) {video.title} ({video.video_id}) [{' '.join(video.tags)}]")
-            print("Would you like to play any of the above? If yes, specify the number of the video.")
-            print("If your answer is not a valid number, we will assume it's a no.")
-            try:
-                x = int(input())
-                if x < 1 or x > len(matched):
-                    raise ValueError()
-            except ValueError:
-                return
-            self.play_video(matched[int(x) - 1].video_id)
+                self.output.emit("result", "{number})" + _VIDEO_LINE, number=i + 1, title=video.title,
+                                 video_id=video.video_id, tags=video.tags)
+            self._ask_to_play(matched)
+
+
+    def _ask_to_play(self, matched):
+        """Asks which of the matched videos should be played.
+
+        With defer_prompts the question is left open in the session and
+        answered later through answer_prompt instead of blocking here.
+        """
+        self.output.emit("prompt", "Would you like to play any of the above? If yes, specify the number of the video.")
+        self.output.emit("prompt", "If your answer is not a valid number, we will assume it's a no.")
+        self.output.flush()
+        choices = [video.video_id for video in matched]
+        if self.defer_prompts:
+            self.session.pending_choices = choices
+        else:
+            self._play_choice(choices, (self.input_func or input)())
+
+    @property
+    def awaiting_answer(self):
+        """Returns True if a search is waiting for answer_prompt."""
+        return self.session.pending_choices is not None
+
+    def answer_prompt(self, answer):
+        """Answers the question left open by a search.
+        
+        Args:
+            answer: The number of the video to play. Anything else is a no.
+        """
+        choices = self.session.pending_choices
+        self.session.pending_choices = None
+        if choices:
+            self._play_choice(choices, answer)
+
+    def _play_choice(self, choices, answer):
+        try:
+            x = int(answer)
+            if x < 1 or x > len(choices):
+                raise ValueError()
+        except ValueError:
+            return
+        self.play_video(choices[x - 1])
 
 
     def flag_video(self, video_id, flag_reason=""):
@@ -342,14 +482,56 @@ class VideoPlayer:
         flagged = self.video_library.flagged
 
         if video is None:
-            print("Cannot flag video: Video does not exist")
+            self.output.emit("error", "Cannot flag video: Video does not exist")
         elif video_id in flagged:
-            print("Cannot flag video: Video is already flagged")
+            self.output.emit("error", "Cannot flag video: Video is already flagged")
         else:
             if self.current_video and self.current_video.video_id == video_id:
                 self.stop_video()
             self.video_library.flag_video(video_id, flag_reason.strip())
-            print(f"Successfully flagged video: {video.title} (reason: {flag_reason if flag_reason else 'Not supplied'})")
+            self.output.emit("flagged", "Successfully flagged video: {title} (reason: {reason})",
+                             title=video.title, reason=flag_reason or 'Not supplied')
+
+
+    def flag_videos(self, items, all_or_nothing=False):
+        """Marks many videos as flagged.
+
+        Every video is validated first, then the valid ones are flagged
+        in a single library operation.
+
+        Args:
+            items: (video_id, flag_reason) pairs.
+            all_or_nothing: If True nothing is flagged unless every video
+                is valid.
+
+        Returns:
+            A list of (video_id, error) pairs in the order of items,
+            error being None for the videos flagged.
+        """
+
+        library = self.video_library
+        flagged = library.flagged
+        reasons = {}
+        results = []
+        for video_id, flag_reason in items:
+            if library.get_video(video_id) is None:
+                error = "Video does not exist"
+            elif video_id in flagged or video_id in reasons:
+                error = "Video is already flagged"
+            else:
+                error = None
+                reasons[video_id] = flag_reason.strip()
+            results.append((video_id, error))
+
+        def apply():
+            if self.current_video and self.current_video.video_id in reasons:
+                self.stop_video()
+            library.flag_videos(reasons)
+
+        self._apply_batch(results, all_or_nothing, apply,
+                          "Cannot flag {video_id}: {reason}",
+                          "flagged_many", "Successfully flagged {count} of {total} videos")
+        return results
 
 
     def allow_video(self, video_id):
@@ -363,9 +545,72 @@ class VideoPlayer:
         flagged = self.video_library.flagged
 
         if video is None:
-            print("Cannot remove flag from video: Video does not exist")
+            self.output.emit("error", "Cannot remove flag from video: Video does not exist")
         elif video_id not in flagged:
-            print("Cannot remove flag from video: Video is not flagged")
+            self.output.emit("error", "Cannot remove flag from video: Video is not flagged")
         else:
             self.video_library.unflag_video(video_id)
-            print(f"Successfully removed flag from video: {video.title}")
+            self.output.emit("allowed", "Successfully removed flag from video: {title}", title=video.title)
+
+
+    def allow_videos(self, video_ids, all_or_nothing=False):
+        """Removes the flags of many videos.
+
+        Every video is validated first, then the valid ones are allowed
+        in a single library operation.
+
+        Args:
+            video_ids: The video_ids to be allowed again.
+            all_or_nothing: If True nothing is allowed unless every video
+                is valid.
+
+        Returns:
+            A list of (video_id, error) pairs in the order of video_ids,
+            error being None for the videos allowed.
+        """
+
+        library = self.video_library
+        flagged = library.flagged
+        allowed = {}
+        results = []
+        for video_id in video_ids:
+            if library.get_video(video_id) is None:
+                error = "Video does not exist"
+            elif video_id not in flagged or video_id in allowed:
+                error = "Video is not flagged"
+            else:
+                error = None
+                allowed[video_id] = None
+            results.append((video_id, error))
+        self._apply_batch(results, all_or_nothing, lambda: library.unflag_videos(list(allowed)),
+                          "Cannot remove flag from {video_id}: {reason}",
+                          "allowed_many", "Successfully removed flag from {count} of {total} videos")
+        return results
+
+
+    def _apply_batch(self, results, all_or_nothing, apply, error_template, kind, summary_template, **fields):
+        """Reports the failures of a validated batch and applies the rest.
+
+        Args:
+            results: The (video_id, error) pairs of the validation.
+            all_or_nothing: If True apply is skipped when anything failed.
+            apply: Callable applying every valid item at once.
+            error_template: The message of one failed item.
+            kind: The kind of the summary message.
+            summary_template: The summary message, given count and total.
+            fields: Extra fields of both messages.
+        """
+        failed = 0
+        for video_id, error in results:
+            if error is not None:
+                failed += 1
+                self.output.emit("error", error_template, video_id=video_id, reason=error, **fields)
+        count = len(results) - failed
+        if all_or_nothing and failed:
+            count = 0
+            for i, (video_id, error) in enumerate(results):
+                if error is None:
+                    results[i] = (video_id, "Batch not applied")
+        if count:
+            apply()
+        self.output.emit(kind, summary_template, count=count, total=len(results), **fields)
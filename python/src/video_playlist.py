@@ -1,5 +1,13 @@
 """A video playlist class."""
 
+
+def _insert(videos, video_id, position):
+    order = list(videos)
+    order.insert(position, video_id)
+    videos.clear()
+    videos.update(dict.fromkeys(order))
+
+
 class Playlist:
     
     """A class used to represent a Playlist."""
@@ -12,7 +20,9 @@ class Playlist:
         Args:
             playlist_name: The playlist name.
         """
-        self.playlist[playlist_name.lower()] = {"name": playlist_name, "videos": []}
+        # The videos are the keys of a dict: insertion ordered like a list,
+        # but with O(1) membership tests and removals.
+        self.playlist[playlist_name.lower()] = {"name": playlist_name, "videos": {}}
 
     def add_to_playlist(self, playlist_name, video_id):
         """Add video to an existing playlist
@@ -21,7 +31,16 @@ class Playlist:
             playlist_name: The playlist name
             video_id: The video_id to be added
         """
-        self.playlist[playlist_name.lower()]["videos"].append(video_id)
+        self.playlist[playlist_name.lower()]["videos"][video_id] = None
+
+    def add_many_to_playlist(self, playlist_name, video_ids):
+        """Add videos to an existing playlist, looking it up only once
+
+        Args:
+            playlist_name: The playlist name
+            video_ids: The video_ids to be added, in order
+        """
+        self.playlist[playlist_name.lower()]["videos"].update(dict.fromkeys(video_ids))
 
     def remove_from_playlist(self, playlist_name, video_id):
         """Remove video from playlist
@@ -30,7 +49,38 @@ class Playlist:
             playlist_name: The playlist name
             video_id: The video_id to be removed
         """
-        self.playlist[playlist_name.lower()]["videos"].remove(video_id)
+        del self.playlist[playlist_name.lower()]["videos"][video_id]
+
+    def insert_into_playlist(self, playlist_name, video_id, position):
+        """Insert video into playlist at a given position
+
+        Takes time linear in the playlist length.
+
+        Args:
+            playlist_name: The playlist name
+            video_id: The video_id to be inserted, not yet in the playlist
+            position: The zero-based position the video will have
+        """
+        _insert(self.playlist[playlist_name.lower()]["videos"], video_id, position)
+
+    def move_in_playlist(self, playlist_name, video_id, position):
+        """Move a video of a playlist to a given position
+
+        Takes time linear in the playlist length.
+
+        Args:
+            playlist_name: The playlist name
+            video_id: The video_id to be moved
+            position: The zero-based position the video will have
+        """
+        videos = self.playlist[playlist_name.lower()]["videos"]
+        if position >= len(videos) - 1:
+            # Moving to the end needs no reordering of the other videos.
+            del videos[video_id]
+            videos[video_id] = None
+            return
+        del videos[video_id]
+        _insert(videos, video_id, position)
 
     def clear_playlist(self, playlist_name):
         """Removes all videos from a playlist
@@ -0,0 +1,186 @@
+"""A binary snapshot of the video catalogue.
+
+The snapshot is a columnar file meant to be memory-mapped:
+
+    header        magic, version, video count, tag count, tag ref count
+    string ends   uint32[2 * videos + tags]: end offset of every string
+    tag starts    uint32[videos + 1]: slice of the tag refs for each video
+    tag refs      uint32[tag ref count]: tag ids
+    strings       utf-8 blob: video ids, then titles, then tag names
+
+Rows are sorted by video_id so lookups binary-search the string table
+directly instead of building a dict. All integers are little-endian.
+
+Build one next to videos.txt with:
+    python -m src.video_snapshot [videos.txt] [videos.snap]
+"""
+
+from array import array
+from collections.abc import Mapping
+from pathlib import Path
+import mmap
+import os
+import struct
+import sys
+
+from .video import Video
+
+_HEADER = struct.Struct("<4sIIII")
+_MAGIC = b"YTVS"
+_VERSION = 1
+
+
+def _uint32_array(values):
+    values = array("I", values)
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values.tobytes()
+
+
+def write_snapshot(videos, path):
+    """Writes videos to a snapshot file, replacing it atomically.
+
+    Args:
+        videos: An iterable of Video objects with unique video_ids.
+        path: The snapshot file to write.
+    """
+    videos = sorted(videos, key=lambda video: video.video_id)
+    tag_ids = {}
+    tag_starts = [0]
+    tag_refs = []
+    for video in videos:
+        for tag in video.tags:
+            tag_refs.append(tag_ids.setdefault(tag, len(tag_ids)))
+        tag_starts.append(len(tag_refs))
+
+    strings = [video.video_id.encode() for video in videos]
+    strings += [video.title.encode() for video in videos]
+    strings += [tag.encode() for tag in tag_ids]
+    string_ends = []
+    end = 0
+    for string in strings:
+        end += len(string)
+        string_ends.append(end)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as snapshot_file:
+        snapshot_file.write(_HEADER.pack(
+            _MAGIC, _VERSION, len(videos), len(tag_ids), len(tag_refs)))
+        snapshot_file.write(_uint32_array(string_ends))
+        snapshot_file.write(_uint32_array(tag_starts))
+        snapshot_file.write(_uint32_array(tag_refs))
+        snapshot_file.write(b"".join(strings))
+    os.replace(tmp_path, path)
+
+
+def is_fresh(snapshot_path, source_path):
+    """Returns True if the snapshot exists and is not older than source."""
+    try:
+        snapshot_mtime = os.stat(snapshot_path).st_mtime_ns
+    except FileNotFoundError:
+        return False
+    return snapshot_mtime >= os.stat(source_path).st_mtime_ns
+
+
+class VideoSnapshot(Mapping):
+    """A read-only mapping of video_id to Video over a snapshot file.
+
+    Nothing is parsed when the file is opened: the columns are memoryviews
+    into the mapped file and Video objects are built on access.
+    """
+
+    def __init__(self, path):
+        """VideoSnapshot constructor.
+
+        Raises ValueError if the file is not a snapshot this code can read.
+        """
+        if sys.byteorder != "little":
+            raise ValueError("Snapshots can only be mapped on little-endian "
+                             "hosts")
+        with open(path, "rb") as snapshot_file:
+            self._data = mmap.mmap(
+                snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._data) < _HEADER.size:
+            raise ValueError(f"{path} is not a video snapshot")
+        magic, version, count, tag_count, ref_count = _HEADER.unpack_from(
+            self._data)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"{path} is not a version {_VERSION} snapshot")
+
+        view = memoryview(self._data)
+        position = _HEADER.size
+
+        def column(length):
+            nonlocal position
+            end = position + 4 * length
+            if end > len(view):
+                raise ValueError(f"{path} is truncated")
+            values = view[position:end].cast("I")
+            position = end
+            return values
+
+        self._count = count
+        self._string_ends = column(2 * count + tag_count)
+        self._tag_starts = column(count + 1)
+        self._tag_refs = column(ref_count)
+        self._strings = view[position:]
+
+    def _string_bytes(self, index):
+        start = self._string_ends[index - 1] if index else 0
+        return bytes(self._strings[start:self._string_ends[index]])
+
+    def _string(self, index):
+        return self._string_bytes(index).decode()
+
+    def _find_row(self, video_id):
+        key = video_id.encode()
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._string_bytes(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self._count and self._string_bytes(low) == key:
+            return low
+        return None
+
+    def _video_at(self, row):
+        count = self._count
+        tags = [self._string(2 * count + self._tag_refs[ref])
+                for ref in range(self._tag_starts[row],
+                                 self._tag_starts[row + 1])]
+        return Video(self._string(count + row), self._string(row), tags)
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        for row in range(self._count):
+            yield self._string(row)
+
+    def __contains__(self, video_id):
+        return self._find_row(video_id) is not None
+
+    def __getitem__(self, video_id):
+        row = self._find_row(video_id)
+        if row is None:
+            raise KeyError(video_id)
+        return self._video_at(row)
+
+
+def main(source=None, target=None):
+    """Builds a snapshot from a pipe-delimited video file."""
+    from .video_library import VideoLibrary
+
+    if source is None:
+        source = Path(__file__).parent / "videos.txt"
+    if target is None:
+        target = Path(source).with_suffix(".snap")
+    library = VideoLibrary(source, use_snapshot=False)
+    write_snapshot(library.get_all_videos(), target)
+    print(f"Wrote {len(library)} videos to {target}")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
@@ -0,0 +1,46 @@
+from benchmarks.catalogue import write_catalogue
+from benchmarks.hot_paths import find_regressions
+
+
+def _result(seconds, peak_bytes):
+    return {"seconds": seconds, "peak_bytes": peak_bytes}
+
+
+def test_regressions_beyond_the_tolerance_are_reported():
+    baselines = {"1000": {"load": _result(1.0, 1000)}}
+    assert find_regressions({"1000": {"load": _result(1.2, 1050)}},
+                            baselines) == []
+
+    regressions = find_regressions(
+        {"1000": {"load": _result(1.3, 1200)}}, baselines)
+    assert len(regressions) == 2
+    assert regressions[0].startswith("1000 videos load: seconds")
+    assert regressions[1].startswith("1000 videos load: peak_bytes")
+
+
+def test_results_without_a_baseline_are_regressions():
+    results = {"1000": {"load": _result(1.0, 1000)},
+               "5000": {"load": _result(1.0, 1000)}}
+    assert find_regressions(results, {}) == [
+        "1000 videos load: no baseline", "5000 videos load: no baseline"]
+    assert find_regressions(results, {"1000": {"other": _result(1, 1)},
+                                      "5000": {"load": _result(1, 1000)}}) \
+        == ["1000 videos load: no baseline"]
+
+
+def test_catalogue_depends_only_on_count_and_seed(tmp_path):
+    write_catalogue(50, tmp_path / "a.txt")
+    write_catalogue(50, tmp_path / "b.txt")
+    write_catalogue(50, tmp_path / "c.txt", seed=1)
+    first = (tmp_path / "a.txt").read_text()
+    assert first == (tmp_path / "b.txt").read_text()
+    assert first != (tmp_path / "c.txt").read_text()
+
+    lines = first.splitlines()
+    assert len(lines) == 50
+    for i, line in enumerate(lines):
+        title, video_id, tags = line.split(" | ")
+        assert video_id == f"video_{i}_id"
+        assert title.endswith(f" {i}") and 3 <= len(title.split()) <= 7
+        tags = tags.split(" , ") if tags else []
+        assert len(tags) <= 4 and all(t.startswith("#tag") for t in tags)
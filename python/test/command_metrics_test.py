@@ -0,0 +1,64 @@
+import urllib.request
+
+import pytest
+
+from src.command_metrics import CommandMetrics, LatencyHistogram
+from src.command_parser import CommandException, CommandParser
+from src.video_player import VideoPlayer
+
+
+def test_histogram_percentiles_are_within_bucket_precision():
+    histogram = LatencyHistogram()
+    for micros in range(1, 1001):
+        histogram.record(micros / 1e6)
+
+    assert histogram.count == 1000
+    assert histogram.percentile(0.5) == pytest.approx(500e-6, rel=0.125)
+    assert histogram.percentile(0.99) == pytest.approx(990e-6, rel=0.125)
+    assert list(histogram.buckets())[-1][1] == 1000
+
+
+def test_parser_records_counts_and_errors(capfd):
+    metrics = CommandMetrics()
+    parser = CommandParser(VideoPlayer(), metrics)
+    parser.execute_command(["play", "amazing_cats_video_id"])
+    parser.execute_command(["PLAY", "funny_dogs_video_id"])
+    parser.execute_command(["NOT_A_COMMAND"])
+    with pytest.raises(CommandException):
+        parser.execute_command(["PLAY"])
+    parser.execute_command(["STATS"])
+    out, _ = capfd.readouterr()
+
+    rows = {line.split()[0]: line.split()[1:3]
+            for line in out.splitlines()[-3:]}
+    assert rows == {"PLAY": ["3", "1"], "UNKNOWN": ["1", "1"],
+                    "command": ["count", "errors"]}
+
+
+def test_prometheus_text_is_written_and_served(tmp_path, capfd):
+    metrics = CommandMetrics()
+    parser = CommandParser(VideoPlayer(), metrics, allow_files=True)
+    parser.execute_command(["NUMBER_OF_VIDEOS"])
+    path = tmp_path / "metrics.prom"
+    parser.execute_command(["STATS", str(path)])
+
+    text = path.read_text()
+    assert 'youtube_commands_total{command="NUMBER_OF_VIDEOS"} 1' in text
+    assert ('youtube_command_seconds_bucket{command="NUMBER_OF_VIDEOS",'
+            'le="+Inf"} 1') in text
+
+    server = metrics.serve_prometheus(port=0)
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        with urllib.request.urlopen(url) as response:
+            served = response.read().decode()
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert 'youtube_commands_total{command="STATS"} 1' in served
+
+
+def test_stats_without_metrics_reports_an_error(capfd):
+    CommandParser(VideoPlayer()).execute_command(["STATS"])
+    out, _ = capfd.readouterr()
+    assert out == "Command metrics are not enabled.\n"
@@ -0,0 +1,95 @@
+import pytest
+
+from src.command_parser import Command, CommandException, CommandParser
+from src.video_player import VideoPlayer
+
+
+def test_execute_command_is_case_insensitive(capfd):
+    parser = CommandParser(VideoPlayer())
+    parser.execute_command(["play", "amazing_cats_video_id"])
+    out, err = capfd.readouterr()
+    assert "Playing video: Amazing Cats" in out
+
+
+def test_execute_command_wrong_argument_count():
+    parser = CommandParser(VideoPlayer())
+    with pytest.raises(CommandException) as e:
+        parser.execute_command(["FLAG_VIDEO"])
+    assert "FLAG_VIDEO command followed by a video_id" in str(e.value)
+
+
+def test_registered_command_is_dispatched_and_documented(capfd):
+    parser = CommandParser(VideoPlayer())
+    parser.register(Command(
+        "ECHO", lambda parser, text: print(text), "ECHO <text>",
+        "Prints the text.", (1,), "Please enter ECHO followed by text."))
+    parser.execute_command(["echo", "hello"])
+    parser.execute_command(["HELP"])
+    out, err = capfd.readouterr()
+    lines = out.splitlines()
+    assert lines[0] == "hello"
+    assert "    ECHO <text> - Prints the text." in lines
+    assert "    EXIT - Terminates the program execution." in lines
+
+
+def test_search_ranked_joins_its_words(capfd):
+    parser = CommandParser(VideoPlayer(input_func=lambda: "no"))
+    parser.execute_command(["SEARCH_RANKED", "Amazng", "cats"])
+    out, err = capfd.readouterr()
+    lines = out.splitlines()
+    assert lines[0] == "Here are the results for Amazng cats:"
+    assert lines[1] == ("1) Amazing Cats (amazing_cats_video_id) "
+                        "[#cat #animal]")
+
+
+def test_bulk_commands_accept_lists_and_files(tmp_path, capfd):
+    player = VideoPlayer()
+    parser = CommandParser(player, allow_files=True)
+    ids = tmp_path / "ids.txt"
+    ids.write_text("funny_dogs_video_id\n\nmissing_id\n")
+    reasons = tmp_path / "reasons.txt"
+    reasons.write_text("amazing_cats_video_id:too many cats\n")
+    parser.execute_command(["CREATE_PLAYLIST", "Mine"])
+    parser.execute_command(["ADD_MANY_TO_PLAYLIST", "mine",
+                            "nothing_video_id", f"@{ids}",
+                            "nothing_video_id"])
+    parser.execute_command(["FLAG_VIDEOS", f"@{reasons}",
+                            "funny_dogs_video_id", "funny_dogs_video_id"])
+    parser.execute_command(["ALLOW_VIDEOS", "funny_dogs_video_id",
+                            "nothing_video_id"])
+    out, _ = capfd.readouterr()
+
+    assert out.splitlines() == [
+        "Successfully created new playlist: Mine",
+        "Cannot add missing_id to mine: Video does not exist",
+        "Cannot add nothing_video_id to mine: Video already added",
+        "Added 2 of 4 videos to mine",
+        "Cannot flag funny_dogs_video_id: Video is already flagged",
+        "Successfully flagged 2 of 3 videos",
+        "Cannot remove flag from nothing_video_id: Video is not flagged",
+        "Successfully removed flag from 1 of 2 videos",
+    ]
+    assert list(player.video_playlist.playlist["mine"]["videos"]) == [
+        "nothing_video_id", "funny_dogs_video_id"]
+    assert player.video_library.flagged == {
+        "amazing_cats_video_id": "too many cats"}
+
+
+def test_bulk_results_and_all_or_nothing(capfd):
+    player = VideoPlayer()
+    player.play_video("funny_dogs_video_id")
+    results = player.flag_videos(
+        [("funny_dogs_video_id", "dogs"), ("missing_id", "")],
+        all_or_nothing=True)
+    assert results == [("funny_dogs_video_id", "Batch not applied"),
+                       ("missing_id", "Video does not exist")]
+    assert dict(player.video_library.flagged) == {}
+
+    results = player.flag_videos([("funny_dogs_video_id", "dogs")])
+    assert results == [("funny_dogs_video_id", None)]
+    assert player.current_video is None
+
+    with pytest.raises(CommandException) as e:
+        CommandParser(player, allow_files=True).execute_command(
+            ["ALLOW_VIDEOS", "@/missing"])
+    assert "Cannot read /missing" in str(e.value)
@@ -0,0 +1,51 @@
+import random
+
+import pytest
+
+from src import cow_collections
+from src.cow_collections import CowDict, CowSortedList
+
+
+def test_copies_of_a_dict_do_not_see_each_others_writes():
+    original = CowDict((str(i), i) for i in range(1000))
+    copy = original.copy()
+    copy["new"] = -1
+    copy["5"] = 50
+    del copy["6"]
+
+    assert len(original) == 1000 and len(copy) == 1000
+    assert "new" not in original and original["5"] == 5 and "6" in original
+    assert copy["new"] == -1 and copy["5"] == 50 and "6" not in copy
+    assert dict(original.items()) == {str(i): i for i in range(1000)}
+    with pytest.raises(KeyError):
+        del copy["6"]
+
+
+def test_sorted_list_matches_a_list_across_copies(monkeypatch):
+    monkeypatch.setattr(cow_collections, "_CHUNK_SIZE", 4)
+    rng = random.Random(0)
+    versions = [(CowSortedList(), [])]
+    for _ in range(200):
+        base, keys = rng.choice(versions)
+        copy, keys = base.copy(), list(keys)
+        for _ in range(rng.randint(1, 20)):
+            if keys and rng.random() < 0.4:
+                key = rng.choice(keys)
+                copy.remove(key)
+                keys.remove(key)
+            else:
+                key = rng.randrange(500)
+                copy.add(key)
+                keys.append(key)
+                keys.sort()
+        versions.append((copy, keys))
+
+    for sorted_list, keys in versions:
+        assert list(sorted_list) == keys and len(sorted_list) == len(keys)
+        assert [sorted_list[i] for i in range(len(keys))] == keys
+        assert list(sorted_list.islice(3, 17)) == keys[3:17]
+        assert sorted_list.bisect_left(250) == len(
+            [key for key in keys if key < 250])
+        assert all(key in sorted_list for key in keys)
+    with pytest.raises(ValueError):
+        CowSortedList([1, 3]).remove(2)
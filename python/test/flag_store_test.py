@@ -0,0 +1,53 @@
+import pytest
+
+from src.flag_store import SqliteFlagStore
+from src.video_library import VideoLibrary
+
+
+def test_flags_propagate_between_libraries(tmp_path):
+    path = tmp_path / "flags.db"
+    first = VideoLibrary(flag_store=SqliteFlagStore(path),
+                         flag_poll_interval=0)
+    second = VideoLibrary(flag_store=SqliteFlagStore(path),
+                          flag_poll_interval=0)
+
+    first.flag_video("funny_dogs_video_id", "dont_like_dogs")
+    assert second.flagged == {"funny_dogs_video_id": "dont_like_dogs"}
+    assert [v.video_id for v in second.search_tags("#dog")] == []
+
+    second.unflag_video("funny_dogs_video_id")
+    assert dict(first.flagged) == {}
+    assert [v.video_id for v in first.search_tags("#dog")] == [
+        "funny_dogs_video_id"]
+    with pytest.raises(KeyError):
+        first.unflag_video("funny_dogs_video_id")
+
+
+def test_flags_are_loaded_at_startup_and_polled_lazily(tmp_path):
+    store = SqliteFlagStore(tmp_path / "flags.db")
+    for video_id in ["funny_dogs_video_id", "amazing_cats_video_id",
+                     "another_cat_video_id", "life_at_google_video_id"]:
+        store.flag(video_id)
+    library = VideoLibrary(flag_store=SqliteFlagStore(tmp_path / "flags.db"),
+                           flag_poll_interval=3600)
+
+    assert library.random_playable_video().video_id == "nothing_video_id"
+    store.flag("nothing_video_id")
+    assert "nothing_video_id" not in library.flagged
+    assert store.generation() == 5
+
+
+def test_bulk_flags_are_applied_in_one_transaction(tmp_path):
+    path = tmp_path / "flags.db"
+    library = VideoLibrary(flag_store=SqliteFlagStore(path),
+                           flag_poll_interval=0)
+    library.flag_videos({"funny_dogs_video_id": "dogs",
+                         "amazing_cats_video_id": ""})
+    assert library.flagged == {"funny_dogs_video_id": "dogs",
+                               "amazing_cats_video_id": ""}
+
+    with pytest.raises(KeyError):
+        library.unflag_videos(["funny_dogs_video_id", "nothing_video_id"])
+    assert len(library.flagged) == 2
+    library.unflag_videos(["funny_dogs_video_id", "amazing_cats_video_id"])
+    assert dict(library.flagged) == {}
@@ -0,0 +1,39 @@
+import io
+
+from src.output_sink import BufferedSink, EventCollectorSink, NullSink
+from src.video_player import VideoPlayer
+
+
+def test_event_collector_returns_structured_events():
+    sink = EventCollectorSink()
+    player = VideoPlayer(output=sink)
+    player.play_video("amazing_cats_video_id")
+    player.play_video("does_not_exist")
+    events = sink.drain()
+
+    assert [event.kind for event in events] == ["playing", "error"]
+    assert events[0].fields == {"title": "Amazing Cats"}
+    assert events[1].render() == "Cannot play video: Video does not exist"
+    assert sink.events == []
+
+
+def test_buffered_sink_writes_on_flush():
+    stream = io.StringIO()
+    player = VideoPlayer(output=BufferedSink(stream))
+    player.show_all_videos()
+
+    assert stream.getvalue() == ""
+    player.output.flush()
+    lines = stream.getvalue().splitlines()
+    assert len(lines) == 6
+    assert "Amazing Cats (amazing_cats_video_id) [#cat #animal]" in lines[1]
+
+
+def test_null_sink_discards_output(capfd):
+    player = VideoPlayer(output=NullSink())
+    player.show_all_videos()
+    player.play_video("amazing_cats_video_id")
+    out, err = capfd.readouterr()
+
+    assert out == ""
+    assert player.current_video.video_id == "amazing_cats_video_id"
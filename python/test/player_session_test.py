@@ -0,0 +1,30 @@
+from src.output_sink import NullSink
+from src.video_player import VideoPlayer
+
+
+def test_sessions_share_the_library_but_not_their_state(capfd):
+    first = VideoPlayer()
+    second = first.new_session()
+    first.play_video("amazing_cats_video_id")
+    first.create_playlist("mine")
+    second.show_playing()
+    second.show_all_playlists()
+    out, err = capfd.readouterr()
+    lines = out.splitlines()
+
+    assert second.video_library is first.video_library
+    assert lines == ["Playing video: Amazing Cats",
+                     "Successfully created new playlist: mine",
+                     "No video is currently playing",
+                     "No playlists exist yet"]
+
+
+def test_flags_are_visible_to_every_session(capfd):
+    first = VideoPlayer(output=NullSink())
+    second = first.new_session()
+    first.flag_video("funny_dogs_video_id", "dont_like_dogs")
+    second.play_video("funny_dogs_video_id")
+    out, err = capfd.readouterr()
+
+    assert ("Cannot play video: Video is currently flagged "
+            "(reason: dont_like_dogs)") in out
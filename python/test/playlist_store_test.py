@@ -0,0 +1,72 @@
+from src.playlist_store import PersistentPlaylist
+
+
+def _state(playlists):
+    return {key: (playlist["name"], list(playlist["videos"]))
+            for key, playlist in playlists.playlist.items()}
+
+
+def _edit(playlists):
+    playlists.create_playlist("Mine")
+    playlists.add_to_playlist("mine", "a")
+    playlists.add_to_playlist("mine", "b")
+    playlists.insert_into_playlist("mine", "c", 0)
+    playlists.move_in_playlist("mine", "b", 0)
+    playlists.remove_from_playlist("mine", "a")
+    playlists.create_playlist("Other")
+    playlists.add_to_playlist("other", "a")
+    playlists.clear_playlist("other")
+    playlists.create_playlist("Gone")
+    playlists.delete_playlist("gone")
+
+
+def test_playlists_are_recovered_from_the_log(tmp_path):
+    playlists = PersistentPlaylist(tmp_path)
+    _edit(playlists)
+    playlists.close()
+
+    with PersistentPlaylist(tmp_path) as recovered:
+        assert _state(recovered) == {"mine": ("Mine", ["b", "c"]),
+                                     "other": ("Other", [])}
+        assert _state(recovered) == _state(playlists)
+
+
+def test_compaction_and_torn_log_tail(tmp_path):
+    playlists = PersistentPlaylist(tmp_path, compact_every=4)
+    _edit(playlists)
+    playlists.add_to_playlist("other", "z")
+    playlists.close()
+    with open(tmp_path / "playlists.log", "a") as log:
+        log.write('[99, "add", "mine"')
+
+    with PersistentPlaylist(tmp_path, compact_every=4) as recovered:
+        assert _state(recovered) == {"mine": ("Mine", ["b", "c"]),
+                                     "other": ("Other", ["z"])}
+        recovered.add_to_playlist("mine", "d")
+    with PersistentPlaylist(tmp_path) as recovered:
+        assert _state(recovered)["mine"] == ("Mine", ["b", "c", "d"])
+
+
+def test_snapshot_and_stale_log_do_not_replay_twice(tmp_path):
+    playlists = PersistentPlaylist(tmp_path)
+    _edit(playlists)
+    playlists.commit()
+    stale_log = (tmp_path / "playlists.log").read_bytes()
+    playlists.compact()
+    playlists.close()
+    # Simulate a crash between writing the snapshot and truncating the log.
+    (tmp_path / "playlists.log").write_bytes(stale_log)
+
+    with PersistentPlaylist(tmp_path) as recovered:
+        assert _state(recovered) == _state(playlists)
+
+
+def test_bulk_add_is_logged_as_one_operation(tmp_path):
+    playlists = PersistentPlaylist(tmp_path)
+    playlists.create_playlist("Mine")
+    playlists.add_many_to_playlist("MINE", iter(["a", "b", "c"]))
+    playlists.close()
+
+    assert len((tmp_path / "playlists.log").read_text().splitlines()) == 2
+    with PersistentPlaylist(tmp_path) as recovered:
+        assert _state(recovered) == {"mine": ("Mine", ["a", "b", "c"])}
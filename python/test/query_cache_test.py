@@ -0,0 +1,76 @@
+from src.flag_store import SqliteFlagStore
+from src.query_cache import QueryCache
+from src.video import Video
+from src.video_library import VideoLibrary
+
+
+def test_entries_expire_and_are_evicted_least_recently_used():
+    now = [0.0]
+    cache = QueryCache(max_entries=2, ttl=10, clock=lambda: now[0])
+    cache.put("a", 1, ["x"])
+    cache.put("b", 2, ["y"])
+    assert cache.get("a") == 1
+    cache.put("c", 3, ["z"])
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    now[0] = 11
+    assert cache.get("a") is None
+    assert cache.stats() == {"entries": 1, "hits": 2, "misses": 2}
+
+
+def test_invalidate_video_drops_only_dependent_entries():
+    cache = QueryCache()
+    cache.put("cats", 1, ["cat1", "cat2"])
+    cache.put("dogs", 2, ["dog1"])
+
+    assert cache.invalidate_video("cat2") == 1
+    assert cache.get("cats") is None
+    assert cache.get("dogs") == 2
+
+
+def test_stale_put_is_dropped():
+    cache = QueryCache()
+    epoch = cache.epoch
+    cache.invalidate_video("cat1")
+    cache.put("cats", 1, ["cat1"], epoch)
+    assert cache.get("cats") is None
+
+
+def test_library_invalidates_on_flag_changes():
+    cache = QueryCache()
+    library = VideoLibrary(query_cache=cache)
+    assert len(library.search_titles("CAT")) == 2
+    assert len(library.search_tags("#dog")) == 1
+    assert len(library.search_titles("cat")) == 2
+    assert cache.hits == 1
+
+    library.flag_video("amazing_cats_video_id")
+    assert [v.video_id for v in library.search_titles("cat")] == [
+        "another_cat_video_id"]
+    # The tag query never matched the flagged video and is still cached.
+    assert len(library.search_tags("#dog")) == 1
+    assert cache.hits == 2
+
+    library.unflag_video("amazing_cats_video_id")
+    assert len(library.search_titles("cat")) == 2
+
+    library.add_video(Video("Cat Palace", "palace_id", ["#dog"]))
+    assert len(library.search_titles("cat")) == 3
+    assert len(library.search_tags("#dog")) == 2
+
+
+def test_cached_results_see_flags_from_other_libraries(tmp_path):
+    path = tmp_path / "flags.db"
+    cached = VideoLibrary(flag_store=SqliteFlagStore(path),
+                          flag_poll_interval=0, query_cache=QueryCache())
+    other = VideoLibrary(flag_store=SqliteFlagStore(path),
+                         flag_poll_interval=0)
+    assert len(cached.search_titles("cat")) == 2
+    assert len(cached.search_tags("#cat")) == 2
+
+    other.flag_video("amazing_cats_video_id")
+    assert [v.video_id for v in cached.search_titles("cat")] == [
+        "another_cat_video_id"]
+    assert [v.video_id for v in cached.search_tags("#cat")] == [
+        "another_cat_video_id"]
@@ -0,0 +1,58 @@
+from src.ranked_search import RankedTitleIndex, tokenize
+
+
+def _index(*titles):
+    index = RankedTitleIndex()
+    for i, title in enumerate(titles):
+        index.add(f"id{i}", title)
+    return index
+
+
+def test_tokenize_lowercases_words():
+    assert tokenize("Amazing Cats, part-2!") == ["amazing", "cats", "part", "2"]
+
+
+def test_words_match_in_any_order():
+    index = _index("Amazing Cats", "Cats are amazing", "Funny Dogs")
+    ids = {video_id for _, video_id in index.search("cats amazing")}
+    assert ids == {"id0", "id1"}
+
+
+def test_typos_are_tolerated():
+    index = _index("Amazing Cats", "Funny Dogs")
+    assert [video_id for _, video_id in index.search("amazng")] == ["id0"]
+    assert index.search("xylophone") == []
+
+
+def test_rare_words_and_phrases_rank_higher():
+    index = _index("cat video", "cat show", "cat rare", "rare cat gem")
+    ranked = [video_id for _, video_id in index.search("cat rare")]
+    # Both titles hold the rare word; only the first holds the phrase.
+    assert ranked[:2] == ["id2", "id3"]
+
+
+def test_limit_and_exclude_bound_the_results():
+    index = _index(*[f"cat number {i}" for i in range(100)])
+    results = index.search("cat", limit=5, exclude={"id0", "id1"})
+    assert len(results) == 5
+    assert not {"id0", "id1"} & {video_id for _, video_id in results}
+
+
+def test_removed_titles_are_not_found():
+    index = _index("Amazing Cats")
+    index.remove("id0")
+    assert index.search("cats") == []
+    assert len(index) == 0
+
+
+def test_popular_words_score_only_the_shortest_titles():
+    index = RankedTitleIndex(max_postings=10)
+    index.add_many((f"long{i}", f"cat with a very long title {i}")
+                   for i in range(90))
+    index.add_many((f"short{i}", f"cat {i}") for i in range(10))
+
+    ids = [video_id for _, video_id in index.search("cat", limit=20)]
+    assert sorted(ids) == sorted(f"short{i}" for i in range(10))
+    index.remove("short0")
+    ids = [video_id for _, video_id in index.search("cat", limit=20)]
+    assert len(ids) == 10 and "short0" not in ids and "long0" in ids
@@ -0,0 +1,39 @@
+import io
+
+from src.command_parser import CommandParser
+from src.command_metrics import CommandMetrics
+from src.output_sink import BufferedSink
+from src.run import run_batch
+from src.video_player import VideoPlayer
+
+
+def test_run_batch_answers_follow_up_from_script():
+    command_lines = iter(["SEARCH_VIDEOS cat\n", "1\n", "SHOW_PLAYING\n",
+                          "PLAY\n", "EXIT\n", "STOP\n"])
+    output = io.StringIO()
+    sink = BufferedSink(output)
+    player = VideoPlayer(input_func=lambda: next(command_lines, ""),
+                         output=sink)
+    stats = run_batch(command_lines, CommandParser(player), sink,
+                      flush_every=1)
+    lines = output.getvalue().splitlines()
+
+    assert len(lines) == 8
+    assert "Playing video: Amazing Cats" in lines[5]
+    assert "Currently playing: Amazing Cats" in lines[6]
+    assert "Please enter PLAY command followed by video_id." in lines[7]
+    assert stats.total_commands == 3
+    rows = [line.split()[:3] for line in stats.summary().splitlines()]
+    assert ["PLAY", "1", "1"] in rows
+    assert ["SEARCH_VIDEOS", "1", "0"] in rows
+
+
+def test_run_batch_records_into_the_parser_metrics():
+    metrics = CommandMetrics()
+    sink = BufferedSink(io.StringIO())
+    parser = CommandParser(VideoPlayer(output=sink), metrics)
+    stats = run_batch(iter(["NUMBER_OF_VIDEOS\n", "HELP\n"]), parser, sink)
+
+    assert stats.metrics is metrics
+    assert stats.summary().count("NUMBER_OF_VIDEOS") == 1
+    assert "2 commands in" in stats.summary()
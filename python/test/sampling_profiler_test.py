@@ -0,0 +1,69 @@
+import json
+import time
+
+from src.command_parser import Command, CommandParser
+from src.run import main
+from src.sampling_profiler import SamplingProfiler
+from src.video_player import VideoPlayer
+
+
+def _spin(parser):
+    deadline = time.perf_counter() + 0.05
+    while time.perf_counter() < deadline:
+        pass
+
+
+def _spinning_parser(profiler=None):
+    parser = CommandParser(VideoPlayer(), profiler=profiler, allow_files=True)
+    parser.register(Command("SPIN", _spin, "SPIN", "Burns CPU."))
+    return parser
+
+
+def test_samples_are_grouped_by_command():
+    profiler = SamplingProfiler()
+    parser = _spinning_parser(profiler)
+    profiler.start()
+    parser.execute_command(["SPIN"])
+    parser.execute_command(["NUMBER_OF_VIDEOS"])
+    profiler.stop()
+
+    lines = profiler.collapsed().splitlines()
+    spin = [line for line in lines if line.startswith("SPIN;")]
+    assert spin
+    assert all("sampling_profiler_test.py:_spin" in line for line in spin)
+    # Nothing above the parser is sampled.
+    assert not any("run_test" in line or "pytest" in line for line in lines)
+
+    document = profiler.speedscope()
+    assert "SPIN" in [profile["name"] for profile in document["profiles"]]
+    names = {frame["name"] for frame in document["shared"]["frames"]}
+    assert "_spin" in names
+
+
+def test_profile_commands_write_a_file(tmp_path, capfd):
+    parser = _spinning_parser()
+    path = tmp_path / "profile.json"
+    parser.execute_command(["PROFILE", "start"])
+    parser.execute_command(["SPIN"])
+    parser.execute_command(["PROFILE", "STOP", str(path)])
+    out, _ = capfd.readouterr()
+
+    assert out.splitlines() == ["Profiling started",
+                                f"Wrote profile to {path}"]
+    profiles = json.loads(path.read_text())["profiles"]
+    assert "SPIN" in [profile["name"] for profile in profiles]
+
+    parser.execute_command(["PROFILE", "STOP"])
+    out, _ = capfd.readouterr()
+    assert out == "Cannot stop profiling: Profiling is not started\n"
+
+
+def test_run_profile_option_writes_collapsed_stacks(tmp_path, capfd):
+    script = tmp_path / "commands.txt"
+    script.write_text("SHOW_ALL_VIDEOS\n" * 200)
+    path = tmp_path / "run.collapsed"
+    main(["--batch", str(script), "--quiet", "--profile", str(path)])
+
+    assert path.exists()
+    for line in path.read_text().splitlines():
+        assert line.startswith("SHOW_ALL_VIDEOS;")
@@ -0,0 +1,160 @@
+import asyncio
+import threading
+
+from src.command_metrics import CommandMetrics
+from src.load_client import DEFAULT_COMMANDS, run_load
+from src.server import PROMPT, VideoServer
+from src.video_library import VideoLibrary
+
+
+async def _request(reader, writer, line=None):
+    if line is not None:
+        writer.write(line.encode() + b"\n")
+    lines = []
+    while True:
+        response = (await reader.readline()).decode().rstrip("\n")
+        if response == PROMPT:
+            return lines
+        lines.append(response)
+
+
+def test_sessions_are_independent_and_prompts_do_not_block(tmp_path):
+    path = str(tmp_path / "youtube.sock")
+    video_server = VideoServer()
+
+    async def scenario():
+        server = await asyncio.start_unix_server(
+            video_server.handle_client, path=path)
+        first = await asyncio.open_unix_connection(path)
+        second = await asyncio.open_unix_connection(path)
+        await _request(*first)
+        await _request(*second)
+
+        results = await _request(*first, "SEARCH_VIDEOS cat")
+        playing = await _request(*second, "PLAY funny_dogs_video_id")
+        answer = await _request(*first, "2")
+        shown = await _request(*second, "SHOW_PLAYING")
+        wrong = await _request(*first, "PLAY")
+        for _, writer in (first, second):
+            writer.close()
+        server.close()
+        await server.wait_closed()
+        return results, playing, answer, shown, wrong
+
+    results, playing, answer, shown, wrong = asyncio.run(scenario())
+    assert "2) Another Cat Video (another_cat_video_id) [#cat #animal]" in results
+    assert playing == ["Playing video: Funny Dogs"]
+    assert answer == ["Playing video: Another Cat Video"]
+    assert shown == [
+        "Currently playing: Funny Dogs (funny_dogs_video_id) [#dog #animal]"]
+    assert wrong == ["Please enter PLAY command followed by video_id."]
+
+
+def test_slow_command_does_not_block_other_sessions(tmp_path):
+    path = str(tmp_path / "youtube.sock")
+    release = threading.Event()
+
+    class SlowLibrary(VideoLibrary):
+        def iter_videos_by_title(self, *args, **kwargs):
+            assert release.wait(5)
+            return super().iter_videos_by_title(*args, **kwargs)
+
+    video_server = VideoServer(SlowLibrary())
+
+    async def scenario():
+        server = await asyncio.start_unix_server(
+            video_server.handle_client, path=path)
+        first = await asyncio.open_unix_connection(path)
+        second = await asyncio.open_unix_connection(path)
+        await _request(*first)
+        await _request(*second)
+
+        listing = asyncio.ensure_future(
+            _request(*first, "SHOW_ALL_VIDEOS"))
+        count = await _request(*second, "NUMBER_OF_VIDEOS")
+        release.set()
+        shown = await listing
+        for _, writer in (first, second):
+            writer.close()
+        server.close()
+        await server.wait_closed()
+        return count, shown
+
+    count, shown = asyncio.run(scenario())
+    assert count == ["5 videos in the library"]
+    assert len(shown) == 6
+
+
+def test_load_client_reports_percentiles(tmp_path):
+    path = str(tmp_path / "youtube.sock")
+
+    async def scenario():
+        server = await asyncio.start_unix_server(
+            VideoServer().handle_client, path=path)
+        summary = await run_load(
+            lambda: asyncio.open_unix_connection(path), 3, DEFAULT_COMMANDS, 2)
+        server.close()
+        await server.wait_closed()
+        return summary
+
+    summary = asyncio.run(scenario())
+    assert summary["requests"] == 3 * 2 * len(DEFAULT_COMMANDS)
+    assert summary["p50_ms"] <= summary["p99_ms"]
+
+
+
+def _serve_lines(video_server, lines):
+    """Runs one client session over in-memory streams, returning its output."""
+    output = []
+
+    class Writer:
+        def write(self, data):
+            output.append(data.decode())
+
+        async def drain(self):
+            pass
+
+        def close(self):
+            pass
+
+    async def scenario():
+        reader = asyncio.StreamReader()
+        for line in lines:
+            reader.feed_data(f"{line}\n".encode())
+        reader.feed_eof()
+        await video_server.handle_client(reader, Writer())
+
+    asyncio.run(scenario())
+    return "".join(output)
+
+
+def test_clients_cannot_read_server_files(tmp_path):
+    secret = tmp_path / "secret.txt"
+    secret.write_text("top_secret_line\n")
+    video_server = VideoServer()
+    text = _serve_lines(video_server, [f"FLAG_VIDEOS @{secret}",
+                                       f"ADD_MANY_TO_PLAYLIST x @{secret}"])
+
+    assert "top_secret_line" not in text
+    assert text.count("Cannot read files: @file arguments are disabled") == 2
+    assert video_server.library.flagged == {}
+
+
+def test_clients_cannot_profile_the_server(tmp_path):
+    target = tmp_path / "clobbered"
+    text = _serve_lines(VideoServer(), ["PROFILE START",
+                                        f"PROFILE STOP {target}", "HELP"])
+
+    assert not target.exists()
+    assert text.count("Please enter a valid command") == 2
+    assert "PROFILE" not in text
+
+
+def test_clients_can_read_but_not_write_stats(tmp_path):
+    target = tmp_path / "clobbered"
+    text = _serve_lines(VideoServer(metrics=CommandMetrics()),
+                        ["NUMBER_OF_VIDEOS", f"STATS {target}", "STATS"])
+
+    assert not target.exists()
+    assert "Cannot write files: STATS <file> is disabled" in text
+    assert "NUMBER_OF_VIDEOS" in text.split("command")[-1]
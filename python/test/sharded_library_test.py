@@ -0,0 +1,97 @@
+import pytest
+
+from src.command_parser import CommandParser
+from src.sharded_library import ShardedVideoLibrary
+from src.video import Video
+from src.video_library import VideoLibrary
+from src.video_player import VideoPlayer
+
+
+@pytest.fixture
+def sharded():
+    library = ShardedVideoLibrary(shards=3)
+    yield library
+    library.close()
+
+
+def test_matches_single_process_library(sharded):
+    library = VideoLibrary()
+
+    assert len(sharded) == len(library)
+    assert sorted(v.video_id for v in sharded.get_all_videos()) == sorted(
+        v.video_id for v in library.get_all_videos())
+    assert sharded.get_video("amazing_cats_video_id").title == "Amazing Cats"
+    assert sharded.get_video("missing_id") is None
+    assert [v.video_id for v in sharded.iter_videos_by_title()] == [
+        v.video_id for v in library.iter_videos_by_title()]
+    assert [v.video_id for v in sharded.videos_by_title(1, 2)] == [
+        v.video_id for v in library.videos_by_title(1, 2)]
+    assert [v.video_id for v in sharded.search_titles("cat")] == [
+        v.video_id for v in library.search_titles("cat")]
+    assert [v.video_id for v in sharded.search_tags("#CAT")] == [
+        v.video_id for v in library.search_tags("#cat")]
+
+
+def test_flags_are_applied_by_the_shards(sharded):
+    sharded.flag_video("amazing_cats_video_id", "dont_like_cats")
+
+    assert sharded.flagged == {"amazing_cats_video_id": "dont_like_cats"}
+    assert [v.video_id for v in sharded.search_titles("cat")] == [
+        "another_cat_video_id"]
+    for _ in range(20):
+        assert sharded.random_playable_video().video_id != (
+            "amazing_cats_video_id")
+
+    sharded.unflag_video("amazing_cats_video_id")
+    assert len(sharded.search_titles("cat")) == 2
+    with pytest.raises(KeyError):
+        sharded.unflag_video("amazing_cats_video_id")
+
+
+def test_random_draws_only_the_unflagged_video_from_its_shard(sharded):
+    video_ids = sorted(v.video_id for v in VideoLibrary().get_all_videos())
+    assert video_ids[0] == "amazing_cats_video_id"
+    sharded.flag_videos({video_id: "" for video_id in video_ids[1:]})
+    sharded.get_all_videos = None  # The draw must not pull the catalogue.
+
+    assert sum(sharded._playable_sizes) == 1
+    for _ in range(10):
+        assert sharded.random_playable_video().video_id == video_ids[0]
+    assert sharded.random_playable_video({"#dog": 1.0}) is None
+
+    sharded.flag_video(video_ids[0])
+    assert sharded.random_playable_video() is None
+    sharded.unflag_videos(video_ids)
+    assert sum(sharded._playable_sizes) == len(video_ids)
+
+
+def test_add_video_routes_to_one_shard(sharded):
+    sharded.add_video(Video("Zebra", "zebra_id", ["#animal"]))
+
+    assert len(sharded) == 6
+    assert sharded.get_video("zebra_id").tags == ("#animal",)
+    assert [v.title for v in sharded.search_tags("#animal")][-1] == "Zebra"
+
+
+def test_player_runs_on_sharded_library(sharded, capfd):
+    player = VideoPlayer(library=sharded)
+    parser = CommandParser(player)
+    parser.execute_command(["NUMBER_OF_VIDEOS"])
+    parser.execute_command(["SHOW_ALL_VIDEOS"])
+    out, _ = capfd.readouterr()
+
+    reference = VideoPlayer()
+    reference_parser = CommandParser(reference)
+    reference_parser.execute_command(["NUMBER_OF_VIDEOS"])
+    reference_parser.execute_command(["SHOW_ALL_VIDEOS"])
+    expected, _ = capfd.readouterr()
+    assert out == expected
+
+
+def test_search_ranked_merges_shard_scores(sharded):
+    sharded.flag_video("another_cat_video_id")
+    library = VideoLibrary()
+    library.flag_video("another_cat_video_id")
+
+    assert [v.video_id for v in sharded.search_ranked("cat", limit=3)] == [
+        v.video_id for v in library.search_ranked("cat", limit=3)]
@@ -0,0 +1,31 @@
+from src.video_playlist import Playlist
+
+
+def _videos(playlists, name):
+    return list(playlists.playlist[name.lower()]["videos"])
+
+
+def test_playlist_keeps_insertion_order():
+    playlists = Playlist()
+    playlists.create_playlist("Mine")
+    for video_id in ["a", "b", "c"]:
+        playlists.add_to_playlist("Mine", video_id)
+    playlists.remove_from_playlist("mine", "b")
+    playlists.add_to_playlist("mine", "b")
+
+    assert _videos(playlists, "mine") == ["a", "c", "b"]
+    assert "c" in playlists.playlist["mine"]["videos"]
+
+
+def test_insert_and_move_in_playlist():
+    playlists = Playlist()
+    playlists.create_playlist("mine")
+    for video_id in ["a", "b", "c"]:
+        playlists.add_to_playlist("mine", video_id)
+    playlists.insert_into_playlist("mine", "d", 1)
+    assert _videos(playlists, "mine") == ["a", "d", "b", "c"]
+
+    playlists.move_in_playlist("mine", "c", 0)
+    assert _videos(playlists, "mine") == ["c", "a", "d", "b"]
+    playlists.move_in_playlist("mine", "a", 10)
+    assert _videos(playlists, "mine") == ["c", "d", "b", "a"]
@@ -1,4 +1,12 @@
+import os
+import threading
+import time
+
+import pytest
+
 from src.video_library import VideoLibrary
+from src.video import Video
+from src.video_snapshot import VideoSnapshot, write_snapshot
 
 
 def test_library_has_all_videos():
@@ -24,3 +32,424 @@ def test_parses_video_correctly_without_tags():
     assert video.title == "Video about nothing"
     assert video.video_id == "nothing_video_id"
     assert video.tags == ()
+
+
+def test_search_titles_is_case_insensitive_and_sorted():
+    library = VideoLibrary()
+    videos = library.search_titles("CAT")
+
+    assert [video.video_id for video in videos] == [
+        "amazing_cats_video_id", "another_cat_video_id"]
+
+
+def test_search_titles_short_term():
+    library = VideoLibrary()
+    videos = library.search_titles("g")
+
+    assert [video.video_id for video in videos] == [
+        "amazing_cats_video_id", "funny_dogs_video_id",
+        "life_at_google_video_id", "nothing_video_id"]
+
+
+def test_search_titles_skips_flagged_and_sees_added_videos():
+    library = VideoLibrary()
+    library.flag_video("amazing_cats_video_id")
+    library.add_video(Video("Cat Nap", "cat_nap_video_id", ["#cat"]))
+    videos = library.search_titles("cat")
+
+    assert [video.video_id for video in videos] == [
+        "another_cat_video_id", "cat_nap_video_id"]
+
+
+def test_searches_during_add_video_do_not_fail():
+    library = VideoLibrary()
+    errors = []
+    done = threading.Event()
+
+    def read():
+        try:
+            while not done.is_set():
+                library.search_titles("zq")
+                library.search_titles("video")
+                library.search_ranked("added video")
+        except Exception as e:
+            errors.append(e)
+
+    readers = [threading.Thread(target=read) for _ in range(3)]
+    for reader in readers:
+        reader.start()
+    try:
+        for i in range(300):
+            library.add_video(Video(f"Added Video zq{i}", f"added_{i}", []))
+    finally:
+        done.set()
+        for reader in readers:
+            reader.join()
+    assert errors == []
+    assert len(library.search_titles("zq")) == 300
+
+
+def test_listing_is_not_disturbed_by_added_videos():
+    library = VideoLibrary()
+    before = [video.video_id for video in library.iter_videos_by_title()]
+    listing = library.iter_videos_by_title()
+    first = next(listing)
+    # Both sort before every video already listed.
+    library.add_video(Video("Aardvark", "aardvark_id", ["#animal"]))
+    library.add_video(Video("Aardwolf", "aardwolf_id", ["#animal"]))
+
+    assert [first.video_id] + [video.video_id for video in listing] == before
+    assert [video.video_id for video in library.iter_videos_by_title()] == [
+        "aardvark_id", "aardwolf_id"] + before
+    assert [video.video_id for video in library.search_tags("#animal")][:2] \
+        == ["aardvark_id", "aardwolf_id"]
+
+
+def test_search_tags_single_tag():
+    library = VideoLibrary()
+    library.flag_video("funny_dogs_video_id")
+    videos = library.search_tags("#ANIMAL")
+
+    assert [video.video_id for video in videos] == [
+        "amazing_cats_video_id", "another_cat_video_id"]
+
+
+def test_search_tags_match_all_and_any():
+    library = VideoLibrary()
+    library.add_video(Video("Dog and Cat", "dog_cat_video_id",
+                            ["#dog", "#cat"]))
+
+    match_all = library.search_tags("#dog", "#cat")
+    match_any = library.search_tags("#dog", "#google", match_all=False)
+
+    assert [video.video_id for video in match_all] == ["dog_cat_video_id"]
+    assert [video.video_id for video in match_any] == [
+        "dog_cat_video_id", "funny_dogs_video_id", "life_at_google_video_id"]
+
+
+def test_iter_videos_by_title():
+    library = VideoLibrary()
+    library.add_video(Video("Amazing Cats", "amazing_cats_video_id",
+                            ["#cat"]))
+    titles = [video.title for video in library.iter_videos_by_title()]
+
+    assert len(library) == 5
+    assert titles == sorted(titles)
+
+
+def test_videos_by_title_pages_and_ranges():
+    library = VideoLibrary()
+
+    assert [v.title for v in library.videos_by_title(1, 2)] == [
+        "Funny Dogs", "Life at Google"]
+    assert [v.title for v in library.videos_by_title(2, 2)] == [
+        "Video about nothing"]
+    assert [v.title for v in library.videos_in_title_range("A", "G")] == [
+        "Amazing Cats", "Another Cat Video", "Funny Dogs"]
+
+
+def test_lazy_library_parses_videos_on_demand():
+    library = VideoLibrary(lazy=True, cache_size=2)
+
+    assert len(library) == 5
+    assert library.get_video("does_not_exist") is None
+    video = library.get_video("amazing_cats_video_id")
+    assert video.title == "Amazing Cats"
+    assert set(video.tags) == {"#cat", "#animal"}
+    assert [v.video_id for v in library.search_tags("#dog")] == [
+        "funny_dogs_video_id"]
+
+
+def test_lazy_library_refuses_a_file_changed_in_place(tmp_path):
+    source = tmp_path / "videos.txt"
+    source.write_text("Cat | cat_id | #cat\nDog | dog_id | #dog\n"
+                      "Cow | cow_id | #cow\n")
+    library = VideoLibrary(source, lazy=True, use_snapshot=False)
+    assert library.get_video("cat_id").title == "Cat"
+
+    # Shorter than the indexed rows, which used to crash the process.
+    with open(source, "w") as file:
+        file.write("Cat | cat_id | #cat\n")
+    with pytest.raises(ValueError, match="changed since it was indexed"):
+        library.get_video("cow_id")
+    # Videos already parsed are still served.
+    assert library.get_video("cat_id").title == "Cat"
+
+
+def test_videos_share_interned_tags():
+    library = VideoLibrary()
+    cats = library.get_video("amazing_cats_video_id")
+    other_cats = library.get_video("another_cat_video_id")
+
+    assert cats.tags == other_cats.tags
+    assert all(tag is other_tag
+               for tag, other_tag in zip(cats.tags, other_cats.tags))
+    assert not hasattr(cats, "__dict__")
+
+
+def test_snapshot_is_used_when_fresh(tmp_path):
+    source = tmp_path / "videos.txt"
+    source.write_text("Cat | cat_id | #cat\nDog | dog_id | #dog , #animal\n")
+    write_snapshot(VideoLibrary(source).get_all_videos(),
+                   tmp_path / "videos.snap")
+    library = VideoLibrary(source)
+
+    assert isinstance(library._catalogue.videos.base, VideoSnapshot)
+    assert len(library) == 2
+    assert library.get_video("dog_id").tags == ("#dog", "#animal")
+    assert library.get_video("missing_id") is None
+    assert [v.video_id for v in library.search_tags("#animal")] == ["dog_id"]
+
+
+def test_snapshot_listing_is_not_disturbed_by_added_videos(tmp_path):
+    source = tmp_path / "videos.txt"
+    source.write_text("Cat | cat_id | #cat\nDog | dog_id | #dog\n")
+    write_snapshot(VideoLibrary(source).get_all_videos(),
+                   tmp_path / "videos.snap")
+    library = VideoLibrary(source)
+    listing = library.iter_videos_by_title()
+    first = next(listing)
+    library.add_video(Video("Zebra", "dog_id", ["#zebra"]))
+    library.add_video(Video("Ant", "ant_id", []))
+
+    assert [first.title] + [v.title for v in listing] == ["Cat", "Dog"]
+    assert [v.title for v in library.iter_videos_by_title()] == [
+        "Ant", "Cat", "Zebra"]
+    assert len(library) == 3
+
+
+def test_snapshot_is_ignored_when_source_is_newer(tmp_path):
+    source = tmp_path / "videos.txt"
+    source.write_text("Cat | cat_id | #cat\n")
+    write_snapshot(VideoLibrary(source).get_all_videos(),
+                   tmp_path / "videos.snap")
+    source.write_text("Cat | cat_id | #cat\nDog | dog_id | #dog\n")
+    os.utime(source, ns=(1 << 62, 1 << 62))
+    library = VideoLibrary(source)
+
+    assert not hasattr(library._catalogue.videos, "base")
+    assert len(library) == 2
+
+
+def test_flagged_is_an_immutable_snapshot():
+    library = VideoLibrary()
+    before = library.flagged
+    generation = library.generation
+    library.flag_video("funny_dogs_video_id", "dont_like_dogs")
+
+    assert "funny_dogs_video_id" not in before
+    assert library.flagged["funny_dogs_video_id"] == "dont_like_dogs"
+    assert library.generation == generation + 1
+    with pytest.raises(TypeError):
+        library.flagged["nothing_video_id"] = ""
+
+
+def test_concurrent_flagging_and_reading():
+    library = VideoLibrary()
+    video_ids = [video.video_id for video in library.get_all_videos()]
+    errors = []
+
+    def flip(video_id):
+        for _ in range(200):
+            library.flag_video(video_id)
+            library.unflag_video(video_id)
+
+    def read():
+        try:
+            for _ in range(200):
+                flagged = library.flagged
+                assert len(flagged) == len(list(flagged.items()))
+                library.search_titles("")
+                library.search_tags("#animal")
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=flip, args=(video_id,))
+               for video_id in video_ids]
+    threads += [threading.Thread(target=read) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert dict(library.flagged) == {}
+    assert library.generation == 2 * 200 * len(video_ids)
+
+
+def test_random_playable_video_skips_flagged_videos():
+    library = VideoLibrary()
+    for video_id in ["funny_dogs_video_id", "amazing_cats_video_id",
+                     "life_at_google_video_id", "nothing_video_id"]:
+        library.flag_video(video_id)
+
+    picks = {library.random_playable_video().video_id for _ in range(20)}
+    assert picks == {"another_cat_video_id"}
+
+    library.flag_video("another_cat_video_id")
+    assert library.random_playable_video() is None
+    library.unflag_video("nothing_video_id")
+    assert library.random_playable_video().video_id == "nothing_video_id"
+
+
+def test_random_playable_video_weighted_by_tag_and_popularity():
+    library = VideoLibrary()
+    library.flag_video("amazing_cats_video_id")
+
+    by_tag = {library.random_playable_video({"#cat": 1, "#dog": 0}).video_id
+              for _ in range(20)}
+    popular = library.random_playable_video(
+        popularity=lambda video_id: video_id == "funny_dogs_video_id")
+
+    assert by_tag == {"another_cat_video_id"}
+    assert popular is not None
+    assert library.random_playable_video({"#unknown": 1}) is None
+
+
+def test_reload_applies_only_the_changes(tmp_path):
+    source = tmp_path / "videos.txt"
+    source.write_text("Cat | cat_id | #cat\nDog | dog_id | #dog\n"
+                      "Cow | cow_id | #cow\n")
+    library = VideoLibrary(source)
+    cat = library.get_video("cat_id")
+    listing = library.iter_videos_by_title()
+    assert next(listing).title == "Cat"
+
+    source.write_text("Cat | cat_id | #cat\nBig Dog | dog_id | #dog , #big\n"
+                      "Ant | ant_id | #bug\n")
+    counts = library.reload()
+
+    assert counts == {"added": 1, "removed": 1, "changed": 1}
+    assert library.get_video("cat_id") is cat
+    assert library.get_video("cow_id") is None
+    assert [v.title for v in library.iter_videos_by_title()] == [
+        "Ant", "Big Dog", "Cat"]
+    assert [v.video_id for v in library.search_tags("#big")] == ["dog_id"]
+    assert library.search_tags("#cow") == []
+    assert [v.video_id for v in library.search_titles("dog")] == ["dog_id"]
+    # A listing started before the reload keeps seeing the old catalogue.
+    assert [v.title for v in listing] == ["Cow", "Dog"]
+    assert library.reload() == {"added": 0, "removed": 0, "changed": 0}
+
+
+def test_watcher_reloads_modified_file(tmp_path):
+    source = tmp_path / "videos.txt"
+    source.write_text("Cat | cat_id | #cat\n")
+    library = VideoLibrary(source)
+    library.start_watching(interval=0.01)
+    try:
+        source.write_text("Cat | cat_id | #cat\nDog | dog_id | #dog\n")
+        os.utime(source, ns=(1 << 62, 1 << 62))
+        deadline = time.monotonic() + 5
+        while library.get_video("dog_id") is None:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+    finally:
+        library.stop_watching()
+    assert len(library) == 2
+
+
+def test_searches_during_reloads_see_one_catalogue(tmp_path):
+    first = tmp_path / "first.txt"
+    second = tmp_path / "second.txt"
+    first.write_text("".join(f"Video {i} | d{i} | #tag{i % 3}\n"
+                             for i in range(200)))
+    second.write_text("".join(f"Video {i} | d{i} | #tag{i % 3}\n"
+                              for i in range(100, 300)))
+    library = VideoLibrary(first)
+    library.search_ranked("video")
+    errors = []
+    done = threading.Event()
+
+    def read():
+        try:
+            while not done.is_set():
+                assert len(library.search_titles("video")) == 200
+                assert len(library.search_ranked("video d1", 300)) == 200
+                assert len(list(library.iter_videos_by_title())) == 200
+                assert len(library.search_tags("#tag0", "#tag1",
+                                               match_all=False)) in (133, 134)
+        except Exception as e:
+            errors.append(e)
+
+    readers = [threading.Thread(target=read) for _ in range(3)]
+    for reader in readers:
+        reader.start()
+    try:
+        for i in range(20):
+            library.reload(second if i % 2 == 0 else first)
+    finally:
+        done.set()
+        for reader in readers:
+            reader.join()
+    assert errors == []
+
+
+def test_lazy_library_cannot_be_reloaded(tmp_path):
+    source = tmp_path / "videos.txt"
+    source.write_text("Dog | dog_id | #dog\n")
+    library = VideoLibrary(source, lazy=True)
+
+    with pytest.raises(ValueError, match="lazy"):
+        library.reload()
+    with pytest.raises(ValueError, match="lazy"):
+        library.start_watching()
+
+
+def test_loads_sharded_directory_in_parallel(tmp_path):
+    (tmp_path / "b.txt").write_text(
+        "Dog | dog_id | #old\nCat | cat_id | #new\nDog | dog_id | #dog\n")
+    (tmp_path / "a.txt").write_text("Cat | cat_id | #cat\nCow | cow_id |\n")
+    (tmp_path / "notes.md").write_text("not | a | shard\n")
+    library = VideoLibrary(tmp_path, ingest_workers=2)
+
+    assert len(library) == 3
+    # Shards merge in path order, so b.txt overrides a.txt.
+    assert library.get_video("cat_id").tags == ("#new",)
+    assert library.get_video("dog_id").tags == ("#dog",)
+    assert library.ingest_stats["files"] == 2
+    # Rows repeated within one file are counted too.
+    assert library.ingest_stats["rows"] == 5
+    assert library.ingest_stats["duplicates"] == 2
+    assert library.ingest_stats["rows_per_second"] > 0
+    assert [v.title for v in library.iter_videos_by_title()] == [
+        "Cat", "Cow", "Dog"]
+
+
+def test_loads_glob_and_reloads_it(tmp_path):
+    (tmp_path / "part1.txt").write_text("Cat | cat_id | #cat\n")
+    (tmp_path / "part2.txt").write_text("Dog | dog_id | #dog\n")
+    library = VideoLibrary(tmp_path / "part*.txt", ingest_workers=1)
+    assert len(library) == 2
+
+    (tmp_path / "part3.txt").write_text("Ant | ant_id | #bug\n")
+    assert library.reload() == {"added": 1, "removed": 0, "changed": 0}
+    assert [v.video_id for v in library.search_tags("#bug")] == ["ant_id"]
+
+
+def test_search_ranked_skips_flagged_and_follows_changes():
+    library = VideoLibrary()
+    assert [v.video_id for v in library.search_ranked("amazng cats")][0] == (
+        "amazing_cats_video_id")
+
+    library.flag_video("amazing_cats_video_id")
+    library.add_video(Video("Cat Palace", "palace_id", []))
+    ids = [v.video_id for v in library.search_ranked("cat", limit=10)]
+    assert "amazing_cats_video_id" not in ids
+    assert set(ids) == {"another_cat_video_id", "palace_id"}
+
+
+def test_bulk_flags_publish_once_and_unflag_atomically():
+    library = VideoLibrary()
+    generation = library.generation
+    library.flag_videos({"funny_dogs_video_id": "dogs",
+                         "amazing_cats_video_id": "cats"})
+    assert library.generation == generation + 1
+    assert [v.video_id for v in library.search_tags("#animal")] == [
+        "another_cat_video_id"]
+
+    with pytest.raises(KeyError):
+        library.unflag_videos(["funny_dogs_video_id", "nothing_video_id"])
+    assert len(library.flagged) == 2
+    library.unflag_videos(["funny_dogs_video_id", "amazing_cats_video_id"])
+    assert len(library.search_tags("#animal")) == 3